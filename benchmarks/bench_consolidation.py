@@ -0,0 +1,65 @@
+"""
+Benchmark for incremental memory consolidation.
+
+Builds stores of increasing size, marks a varying number of notes as changed
+and times consolidate_memories(). Consolidation cost should track the number
+of changed notes and stay flat as the store grows.
+
+Usage:
+    python benchmarks/bench_consolidation.py --sizes 1000 5000 --dirty 10 100 1000
+"""
+import os
+import sys
+import time
+import uuid
+import argparse
+
+# Skip LLM calls so notes are created with the fallback analysis and no evolution
+os.environ.setdefault("DISABLE_LLM", "true")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_system import AgenticMemorySystem
+from retrievers import ChromaRetriever
+
+
+def build_system(size: int) -> AgenticMemorySystem:
+    """Create a memory system with `size` notes in an isolated ChromaDB collection"""
+    system = AgenticMemorySystem(llm_controller=object())
+    system.chroma_retriever = ChromaRetriever(collection_name=f"bench_consolidation_{uuid.uuid4().hex[:8]}")
+    for i in range(size):
+        system.create(f"Benchmark note {i} about topic {i % 97} and subject {i % 13}")
+    return system
+
+
+def run(sizes, dirty_counts):
+    print(f"{'notes':>8} {'dirty':>8} {'seconds':>10} {'ms/note':>10}")
+    for size in sizes:
+        system = build_system(size)
+        memory_ids = list(system.memories)
+        for dirty in dirty_counts:
+            if dirty > size:
+                continue
+            for memory_id in memory_ids[:dirty]:
+                note = system.memories[memory_id]
+                note.context = f"Updated context {uuid.uuid4().hex[:6]}"
+            with system._state_lock:
+                system._dirty_ids.update(memory_ids[:dirty])
+
+            start = time.perf_counter()
+            system.consolidate_memories()
+            elapsed = time.perf_counter() - start
+            print(f"{size:>8} {dirty:>8} {elapsed:>10.3f} {1000 * elapsed / dirty:>10.2f}")
+
+        try:
+            system.chroma_retriever.client.delete_collection(system.chroma_retriever.collection_name)
+        except Exception as e:
+            print(f"Failed to delete benchmark collection: {e}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark incremental consolidation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--dirty", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+    run(args.sizes, args.dirty)
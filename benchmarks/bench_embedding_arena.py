@@ -0,0 +1,76 @@
+"""
+Benchmark for the SimpleEmbeddingRetriever embedding arena.
+
+Runs N sequential create() calls and reports the time of each window of
+inserts. With the capacity-doubling arena the per-window time stays flat;
+with the old np.vstack append it grew linearly with the store size.
+
+The legacy vstack append is replayed on the same vectors for comparison,
+up to --legacy-limit rows since it is quadratic.
+
+Usage:
+    python benchmarks/bench_embedding_arena.py --notes 100000 --window 10000
+"""
+import os
+import sys
+import time
+import uuid
+import argparse
+import numpy as np
+
+# Skip LLM calls so notes are created with the fallback analysis and no evolution
+os.environ.setdefault("DISABLE_LLM", "true")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_system import AgenticMemorySystem
+from retrievers import ChromaRetriever
+
+
+def bench_create(notes: int, window: int):
+    """Time sequential create() calls, reporting per-window throughput"""
+    system = AgenticMemorySystem(llm_controller=object())
+    system.chroma_retriever = ChromaRetriever(collection_name=f"bench_arena_{uuid.uuid4().hex[:8]}")
+
+    print(f"{'notes':>10} {'window s':>10} {'creates/s':>10} {'arena rows':>11}")
+    start = time.perf_counter()
+    for i in range(notes):
+        system.create(f"Arena benchmark note {i} about topic {i % 97} and subject {i % 13}")
+        if (i + 1) % window == 0:
+            elapsed = time.perf_counter() - start
+            capacity = system.retriever._matrix.shape[0]
+            print(f"{i + 1:>10} {elapsed:>10.2f} {window / elapsed:>10.0f} {capacity:>11}")
+            start = time.perf_counter()
+
+    try:
+        system.chroma_retriever.client.delete_collection(system.chroma_retriever.collection_name)
+    except Exception as e:
+        print(f"Failed to delete benchmark collection: {e}", file=sys.stderr)
+    return system.retriever
+
+
+def bench_legacy_append(vectors: np.ndarray, window: int):
+    """Replay the old np.vstack append on precomputed vectors"""
+    print(f"\nLegacy np.vstack append on {len(vectors)} rows")
+    print(f"{'rows':>10} {'window s':>10}")
+    embeddings = None
+    start = time.perf_counter()
+    for i, vector in enumerate(vectors):
+        row = vector[np.newaxis, :]
+        embeddings = row if embeddings is None else np.vstack([embeddings, row])
+        if (i + 1) % window == 0:
+            print(f"{i + 1:>10} {time.perf_counter() - start:>10.2f}")
+            start = time.perf_counter()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark embedding arena appends")
+    parser.add_argument("--notes", type=int, default=100000)
+    parser.add_argument("--window", type=int, default=10000)
+    parser.add_argument("--legacy-limit", type=int, default=30000,
+                        help="Rows to replay with the legacy vstack append (0 to skip)")
+    args = parser.parse_args()
+
+    retriever = bench_create(args.notes, args.window)
+    if args.legacy_limit > 0 and retriever.embeddings is not None:
+        bench_legacy_append(retriever.embeddings[:args.legacy_limit].copy(), args.window)
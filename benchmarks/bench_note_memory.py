@@ -0,0 +1,102 @@
+"""
+Benchmark for the memory footprint of MemoryNote.
+
+Loads N notes from JSON, the way persisted notes are restored, and reports
+the bytes retained per note, measured with tracemalloc. The legacy note
+layout (a plain class with a per-instance __dict__, string timestamps and a
+list of strings per keyword/tag/link field) is replayed on the same records
+for comparison.
+
+Note content is the same in both layouts, so the overhead excluding content
+is reported as well.
+
+Usage:
+    python benchmarks/bench_note_memory.py --notes 200000
+"""
+import gc
+import os
+import sys
+import json
+import uuid
+import random
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_system import MemoryNote
+
+
+class LegacyMemoryNote:
+    """The previous note layout: one __dict__ and fresh lists/strings per note"""
+
+    def __init__(self, content, id=None, keywords=None, links=None, retrieval_count=None,
+                 timestamp=None, last_accessed=None, context=None, evolution_history=None,
+                 category=None, tags=None):
+        self.content = content
+        self.id = id or str(uuid.uuid4())
+        self.keywords = keywords or []
+        self.links = links or []
+        self.context = context or "General"
+        self.category = category or "Uncategorized"
+        self.tags = tags or []
+        self.timestamp = timestamp
+        self.last_accessed = last_accessed
+        self.retrieval_count = retrieval_count or 0
+        self.evolution_history = evolution_history or []
+
+
+def make_records(notes: int, seed: int = 0):
+    """Serialized notes with a realistic mix of repeated keywords, tags and links"""
+    rng = random.Random(seed)
+    words = [f"term{i}" for i in range(5000)]
+    tags = [f"tag-{i}" for i in range(300)]
+    contexts = [f"Discussion of subject {i}" for i in range(200)]
+    ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(notes)]
+    records = []
+    for i, memory_id in enumerate(ids):
+        records.append(json.dumps({
+            "id": memory_id,
+            "content": " ".join(rng.choices(words, k=30)),
+            "keywords": rng.sample(words, 5),
+            "links": [ids[rng.randrange(notes)] for _ in range(rng.randint(0, 4))],
+            "retrieval_count": rng.randint(0, 10),
+            "timestamp": f"2024{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}{rng.randint(0, 23):02d}{rng.randint(0, 59):02d}",
+            "last_accessed": "202501011200",
+            "context": rng.choice(contexts),
+            "evolution_history": [],
+            "category": rng.choice(["Work", "Personal", "Research", "Uncategorized"]),
+            "tags": rng.sample(tags, 3),
+        }))
+    return records
+
+
+def measure(note_class, records, include_content: bool = True) -> float:
+    """Bytes retained per note after loading every record"""
+    gc.collect()
+    tracemalloc.start()
+    store = {}
+    for record in records:
+        data = json.loads(record)
+        if not include_content:
+            data["content"] = ""
+        note = note_class(**data)
+        store[note.id] = note
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return retained / len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark MemoryNote bytes per note")
+    parser.add_argument("--notes", type=int, default=200000)
+    args = parser.parse_args()
+
+    records = make_records(args.notes)
+    print(f"{'layout':>10} {'bytes/note':>12} {'excl. content':>14}")
+    for name, note_class in (("legacy", LegacyMemoryNote), ("compact", MemoryNote)):
+        total = measure(note_class, records)
+        overhead = measure(note_class, records, include_content=False)
+        print(f"{name:>10} {total:>12.0f} {overhead:>14.0f}")
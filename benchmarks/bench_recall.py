@@ -0,0 +1,193 @@
+"""
+Benchmark for retrieval quality against latency.
+
+Fills a memory system with a synthetic corpus and computes the exact k
+nearest notes of each query by brute force, using the same embeddings
+the retrievers index. Each retrieval configuration is then scored by its
+recall@k against that ground truth and by its per-query latency:
+- SimpleEmbeddingRetriever with the exact index
+- SimpleEmbeddingRetriever with the IVF index at several nprobe values
+- ChromaRetriever
+- fused search (ChromaDB, embedding and BM25 retrievers) with RRF and weighted fusion
+
+Fused search also ranks by exact terms, so its recall measures how far
+fusion moves results away from the pure vector neighbors rather than an
+index error.
+
+The results are printed as a table. Configurations on the Pareto frontier
+are marked with "*": no other configuration has both higher recall and
+lower p50 latency. Score ties count as hits, so recall is not understated
+for notes whose embeddings are equally similar to the query.
+
+The run is offline: the default embedder is the deterministic hashed
+bag-of-words encoder, and --model selects a locally cached sentence
+transformer instead.
+
+Usage:
+    python benchmarks/bench_recall.py --notes 50000 --queries 200 --k 10 --nprobe 1 2 4 8 16 32
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from harness import SyntheticCorpus, BenchmarkLLMController, latency_summary
+from embedding_service import HASHING_MODEL
+from memory_system import AgenticMemorySystem
+from retrievers import ChromaRetriever, SimpleEmbeddingRetriever
+from vector_index import IVFIndex
+
+# Scores this close to the k-th best count as ties
+TIE_EPSILON = 1e-5
+
+
+def build_system(args) -> AgenticMemorySystem:
+    """Memory system with the synthetic notes, an IVF embedding index and an isolated ChromaDB collection"""
+    system = AgenticMemorySystem(
+        model_name=args.model,
+        llm_controller=BenchmarkLLMController(evolve_rate=0.0),
+        vector_index=IVFIndex(nprobe=args.fused_nprobe, train_threshold=args.train_threshold, seed=args.seed)
+    )
+    system.chroma_retriever = ChromaRetriever(collection_name=f"bench_recall_{uuid.uuid4().hex[:8]}",
+                                              model_name=args.model)
+    corpus = SyntheticCorpus(seed=args.seed)
+    for start in range(0, args.notes, args.batch_size):
+        system.create_many(list(corpus.notes(start, min(start + args.batch_size, args.notes))), evolve=False)
+    # Measure the trained buckets rather than a training still running in the background
+    system.retriever.index.wait_for_training()
+    return system
+
+
+def ground_truth(query_vectors: np.ndarray, vectors: np.ndarray, k: int):
+    """Exact scores of every note per query and the k-th best score per query"""
+    scores = query_vectors @ vectors.T
+    kth = -np.partition(-scores, k - 1, axis=1)[:, k - 1]
+    return scores, kth
+
+
+def recall_at_k(result_ids, row_of, scores: np.ndarray, kth: np.ndarray, k: int) -> float:
+    """Mean fraction of the k results scoring at least the exact k-th best score"""
+    recalls = []
+    for query, ids in enumerate(result_ids):
+        rows = [row_of[memory_id] for memory_id in ids[:k] if memory_id in row_of]
+        hits = sum(1 for row in rows if scores[query, row] >= kth[query] - TIE_EPSILON)
+        recalls.append(min(hits, k) / k)
+    return float(np.mean(recalls))
+
+
+def measure(search, queries, k: int):
+    """Result IDs and latency in milliseconds of each query, searched one at a time"""
+    search(queries[0], k)  # Warm up
+    result_ids, latencies = [], []
+    for query in queries:
+        began = time.perf_counter()
+        ids = search(query, k)
+        latencies.append(1000 * (time.perf_counter() - began))
+        result_ids.append(ids)
+    return result_ids, latencies
+
+
+def configurations(system: AgenticMemorySystem, exact: SimpleEmbeddingRetriever, nprobes):
+    """(name, setup, search) per configuration; search returns the ranked memory IDs"""
+    def embedding_search(retriever):
+        return lambda query, k: [result["id"] for result in retriever.search(query, k)]
+
+    def set_nprobe(nprobe):
+        def setup():
+            system.retriever.index.nprobe = nprobe
+        return setup
+
+    def chroma_search(query, k):
+        return system.chroma_retriever.search_many([query], k)["ids"][0]
+
+    def fused_search(fusion):
+        return lambda query, k: [result["id"] for result in system.search_many([query], k, fusion=fusion)[0]]
+
+    fused_nprobe = system.retriever.index.nprobe
+    yield "embedding exact", None, embedding_search(exact)
+    for nprobe in nprobes:
+        yield f"embedding ivf nprobe={nprobe}", set_nprobe(nprobe), embedding_search(system.retriever)
+    yield "chroma", None, chroma_search
+    for fusion in ("rrf", "weighted"):
+        yield f"fused {fusion} nprobe={fused_nprobe}", set_nprobe(fused_nprobe), fused_search(fusion)
+
+
+def pareto(rows):
+    """Mark the rows that no other row beats on both recall and p50 latency"""
+    for row in rows:
+        row["pareto"] = not any(
+            other["recall"] >= row["recall"] and other["latency_ms"]["p50"] <= row["latency_ms"]["p50"]
+            and (other["recall"] > row["recall"] or other["latency_ms"]["p50"] < row["latency_ms"]["p50"])
+            for other in rows
+        )
+    return rows
+
+
+def run(args):
+    system = build_system(args)
+    try:
+        notes = list(system.memories.values())
+        vectors = system.embedder.encode([system._index_document(note) for note in notes])
+        row_of = {note.id: row for row, note in enumerate(notes)}
+        queries = SyntheticCorpus(seed=args.seed).queries(args.queries)
+        scores, kth = ground_truth(system.embedder.encode(queries), vectors, args.k)
+
+        exact = SimpleEmbeddingRetriever(args.model, initial_capacity=len(notes), index="exact")
+        exact.add_documents([system._index_document(note) for note in notes], [note.id for note in notes],
+                            embeddings=vectors)
+
+        rows = []
+        for name, setup, search in configurations(system, exact, args.nprobe):
+            if setup is not None:
+                setup()
+            result_ids, latencies = measure(search, queries, args.k)
+            rows.append({
+                "config": name,
+                "recall": round(recall_at_k(result_ids, row_of, scores, kth, args.k), 4),
+                "latency_ms": latency_summary(latencies),
+            })
+    finally:
+        try:
+            system.chroma_retriever.client.delete_collection(system.chroma_retriever.collection_name)
+        except Exception as e:
+            print(f"Failed to delete benchmark collection: {e}", file=sys.stderr)
+
+    rows = pareto(rows)
+    print(f"{'configuration':<28} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}  pareto")
+    for row in sorted(rows, key=lambda row: row["latency_ms"]["p50"]):
+        latency = row["latency_ms"]
+        print(f"{row['config']:<28} {row['recall']:>10.3f} {latency['p50']:>8.2f} {latency['p95']:>8.2f} "
+              f"{latency['mean']:>8.2f}  {'*' if row['pareto'] else ''}")
+    return {
+        "benchmark": "recall",
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": rows,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark retrieval recall@k against latency")
+    parser.add_argument("--notes", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--fused-nprobe", type=int, default=8,
+                        help="IVF nprobe used by the fused search configurations")
+    parser.add_argument("--train-threshold", type=int, default=20000,
+                        help="Notes before the IVF index starts bucketing (exact search below it)")
+    parser.add_argument("--model", default=HASHING_MODEL,
+                        help="Embedding model; must already be in the local cache unless it is the hashing encoder")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,82 @@
+"""
+Benchmark for server time to first request.
+
+Starts the server with uvicorn and measures, from process start, the time
+until /health answers, until /ready reports that warm-up has finished, and
+until a first search returns. It runs once with LAZY_STARTUP (the memory
+system warms up in the background) and once with eager startup (the
+memory system is built before the server accepts connections).
+
+Usage:
+    python benchmarks/bench_startup.py --port 8799 --runs 3
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+import urllib.error
+import urllib.parse
+import urllib.request
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_status(url: str) -> int:
+    """HTTP status of a GET, or 0 if the server is not answering"""
+    try:
+        with urllib.request.urlopen(url, timeout=120) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0
+
+
+def wait_for(url: str, start: float, timeout: float) -> float:
+    """Poll until `url` returns 200; seconds since `start`"""
+    while get_status(url) != 200:
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError(f"{url} did not answer within {timeout}s")
+        time.sleep(0.02)
+    return time.perf_counter() - start
+
+
+def measure(port: int, lazy: bool, timeout: float):
+    """Start a server and time /health, /ready and a first search"""
+    env = dict(os.environ, LAZY_STARTUP=str(lazy), DISABLE_LLM="true", PORT=str(port))
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        health = wait_for(f"{base_url}/health", start, timeout)
+        search_url = f"{base_url}/api/v1/search?" + urllib.parse.urlencode({"query": "startup benchmark", "k": 1})
+        search_start = time.perf_counter()
+        status = get_status(search_url)
+        search = time.perf_counter() - start
+        if status != 200:
+            print(f"First search returned {status} after {time.perf_counter() - search_start:.2f}s", file=sys.stderr)
+        ready = wait_for(f"{base_url}/ready", start, timeout)
+        return health, search, ready
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark server time to first request")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    print(f"{'mode':>6} {'run':>4} {'health s':>9} {'first search s':>15} {'ready s':>8}")
+    for lazy in (True, False):
+        for run in range(args.runs):
+            health, search, ready = measure(args.port, lazy, args.timeout)
+            mode = "lazy" if lazy else "eager"
+            print(f"{mode:>6} {run + 1:>4} {health:>9.2f} {search:>15.2f} {ready:>8.2f}")
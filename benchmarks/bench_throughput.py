@@ -0,0 +1,227 @@
+"""
+Benchmark for ingestion and retrieval throughput.
+
+Grows one memory system through a series of checkpoints (1k, 10k, 100k and
+1M notes by default) using a synthetic corpus and a deterministic mock LLM.
+At each checkpoint it reports:
+- create throughput over the notes added since the previous checkpoint
+- search latency percentiles (p50/p95/p99) over a fixed query set
+- the time to consolidate a fixed fraction of changed notes
+- resident set size, current and peak
+
+The embedding model is replaced by the deterministic hashed bag-of-words
+encoder unless --model names a sentence transformer, so the benchmark runs
+offline. Results are written as JSON with --output. With --baseline, each
+metric is compared against a previous output file, and the script exits
+with status 1 if any metric regressed by more than --tolerance.
+
+Usage:
+    python benchmarks/bench_throughput.py --sizes 1000 10000 --output baseline.json
+    python benchmarks/bench_throughput.py --sizes 1000 10000 --baseline baseline.json
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import platform
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from harness import SyntheticCorpus, BenchmarkLLMController, rss_mb, peak_rss_mb, latency_summary
+from embedding_service import HASHING_MODEL
+from memory_system import AgenticMemorySystem
+from retrievers import ChromaRetriever
+
+# (result key, higher is better) compared against the baseline
+COMPARED_METRICS = [
+    ("creates_per_second", True),
+    ("search_ms.p50", False),
+    ("search_ms.p95", False),
+    ("search_ms.p99", False),
+    ("consolidation_seconds", False),
+    ("rss_mb", False),
+]
+
+
+def build_system(args) -> AgenticMemorySystem:
+    """Create an empty memory system with an isolated ChromaDB collection"""
+    system = AgenticMemorySystem(
+        model_name=args.model,
+        llm_controller=BenchmarkLLMController(args.evolve_rate, args.llm_latency_ms / 1000),
+        vector_index=args.index,
+        fusion=args.fusion
+    )
+    system.chroma_retriever = ChromaRetriever(collection_name=f"bench_throughput_{uuid.uuid4().hex[:8]}",
+                                              model_name=args.model)
+    return system
+
+
+def ingest(system: AgenticMemorySystem, corpus: SyntheticCorpus, start: int, stop: int, args) -> float:
+    """Create notes start..stop-1; seconds taken"""
+    began = time.perf_counter()
+    if args.batch_size <= 1:
+        for content in corpus.notes(start, stop):
+            system.create(content)
+    else:
+        for batch_start in range(start, stop, args.batch_size):
+            contents = list(corpus.notes(batch_start, min(batch_start + args.batch_size, stop)))
+            system.create_many(contents, evolve=args.evolve_rate > 0)
+    # Count background index training in the ingestion time, and search the trained index
+    system.retriever.index.wait_for_training()
+    return time.perf_counter() - began
+
+
+def time_searches(system: AgenticMemorySystem, queries, k: int):
+    """Latency of each search in milliseconds"""
+    system.search(queries[0], k)  # Warm up
+    latencies = []
+    for query in queries:
+        began = time.perf_counter()
+        system.search(query, k)
+        latencies.append(1000 * (time.perf_counter() - began))
+    return latencies
+
+
+def time_consolidation(system: AgenticMemorySystem, fraction: float):
+    """Mark a fraction of notes as changed and time the consolidation pass"""
+    memory_ids = list(system.memories)
+    count = max(1, int(len(memory_ids) * fraction))
+    step = max(1, len(memory_ids) // count)
+    with system._state_lock:
+        system._dirty_ids.update(memory_ids[::step][:count])
+    began = time.perf_counter()
+    system.consolidate_memories()
+    return count, time.perf_counter() - began
+
+
+def run(args):
+    corpus = SyntheticCorpus(seed=args.seed)
+    queries = corpus.queries(args.queries)
+    system = build_system(args)
+    results = []
+    print(f"{'notes':>9} {'create/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'consol s':>9} {'rss MB':>8}")
+    try:
+        created = 0
+        for size in sorted(args.sizes):
+            seconds = ingest(system, corpus, created, size, args)
+            added, created = size - created, size
+            search_ms = latency_summary(time_searches(system, queries, args.k))
+            consolidated, consolidation_seconds = time_consolidation(system, args.dirty_fraction)
+            rss, peak_rss = rss_mb(), peak_rss_mb()
+            result = {
+                "notes": size,
+                "create_seconds": round(seconds, 3),
+                "creates_per_second": round(added / seconds, 1) if seconds > 0 else None,
+                "search_ms": search_ms,
+                "consolidated_notes": consolidated,
+                "consolidation_seconds": round(consolidation_seconds, 4),
+                "rss_mb": round(rss, 1) if rss is not None else None,
+                "peak_rss_mb": round(peak_rss, 1) if peak_rss is not None else None,
+            }
+            results.append(result)
+            print(f"{size:>9} {result['creates_per_second'] or 0:>10.1f} {search_ms['p50']:>8.2f} "
+                  f"{search_ms['p95']:>8.2f} {search_ms['p99']:>8.2f} {consolidation_seconds:>9.3f} "
+                  f"{result['rss_mb'] or 0:>8.1f}")
+    finally:
+        try:
+            system.chroma_retriever.client.delete_collection(system.chroma_retriever.collection_name)
+        except Exception as e:
+            print(f"Failed to delete benchmark collection: {e}", file=sys.stderr)
+
+    return {
+        "benchmark": "throughput",
+        "config": {
+            "sizes": sorted(args.sizes),
+            "batch_size": args.batch_size,
+            "evolve_rate": args.evolve_rate,
+            "llm_latency_ms": args.llm_latency_ms,
+            "model": args.model,
+            "index": args.index,
+            "fusion": args.fusion,
+            "k": args.k,
+            "queries": args.queries,
+            "dirty_fraction": args.dirty_fraction,
+            "seed": args.seed,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def metric(result, key: str):
+    """Value of a dotted key such as "search_ms.p95", or None"""
+    value = result
+    for part in key.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def compare(report, baseline, tolerance: float):
+    """Print each metric against the baseline; list of (notes, metric, change) regressions"""
+    differing = [key for key, value in baseline.get("config", {}).items()
+                 if key != "sizes" and report["config"].get(key) != value]
+    if differing:
+        print(f"Warning: baseline was run with a different {', '.join(differing)}", file=sys.stderr)
+
+    baseline_rows = {row["notes"]: row for row in baseline.get("results", [])}
+    regressions = []
+    print(f"\n{'notes':>9} {'metric':<22} {'baseline':>10} {'current':>10} {'change':>8}")
+    for row in report["results"]:
+        base_row = baseline_rows.get(row["notes"])
+        if base_row is None:
+            continue
+        for key, higher_is_better in COMPARED_METRICS:
+            current, base = metric(row, key), metric(base_row, key)
+            if current is None or not base:
+                continue
+            change = (current - base) / base
+            regressed = change < -tolerance if higher_is_better else change > tolerance
+            if regressed:
+                regressions.append((row["notes"], key, change))
+            print(f"{row['notes']:>9} {key:<22} {base:>10.4g} {current:>10.4g} {100 * change:>+7.1f}%"
+                  f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ingestion and retrieval throughput")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--batch-size", type=int, default=100,
+                        help="Notes per create_many() call; 1 calls create() per note")
+    parser.add_argument("--evolve-rate", type=float, default=0.1,
+                        help="Fraction of evolution decisions that evolve; 0 also lets create_many() skip evolution")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0,
+                        help="Simulated latency of each mock LLM completion")
+    parser.add_argument("--model", default=HASHING_MODEL,
+                        help="Embedding model; the default hashing encoder needs no download")
+    parser.add_argument("--index", default="ivf", choices=["ivf", "exact"])
+    parser.add_argument("--fusion", default="rrf", choices=["rrf", "weighted"])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dirty-fraction", type=float, default=0.01,
+                        help="Fraction of notes marked as changed before each consolidation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative change counted as a regression")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {100 * args.tolerance:.0f}%")
+            sys.exit(1)
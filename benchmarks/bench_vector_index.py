@@ -0,0 +1,69 @@
+"""
+Benchmark for the SimpleEmbeddingRetriever vector indexes.
+
+Fills retrievers with clustered synthetic vectors (the model is never run) and
+reports per-query search latency for the exact and IVF indexes as the store
+grows, together with the IVF recall@k against the exact results.
+
+Usage:
+    python benchmarks/bench_vector_index.py --sizes 100000 300000 1000000 --nprobe 8
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retrievers import SimpleEmbeddingRetriever
+from vector_index import IVFIndex
+
+
+def synthetic(n: int, dimension: int, clusters: int, rng) -> np.ndarray:
+    """Unit vectors drawn around random cluster centers"""
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, n)] + 0.5 * rng.normal(size=(n, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def fill(retriever: SimpleEmbeddingRetriever, vectors: np.ndarray, batch: int = 10000):
+    for start in range(0, len(vectors), batch):
+        ids = [str(i) for i in range(start, min(start + batch, len(vectors)))]
+        retriever.add_documents(ids, ids, embeddings=vectors[start:start + batch])
+
+
+def time_queries(retriever: SimpleEmbeddingRetriever, queries: np.ndarray, k: int):
+    """Return the result IDs per query and the mean latency in milliseconds"""
+    # Feed precomputed query vectors instead of running the model
+    retriever._encode = lambda texts: queries[int(texts[0])][np.newaxis, :]
+    start = time.perf_counter()
+    results = [[r["id"] for r in retriever.search(str(i), k)] for i in range(len(queries))]
+    return results, 1000 * (time.perf_counter() - start) / len(queries)
+
+
+def run(sizes, dimension: int, nprobe: int, k: int, queries: int):
+    rng = np.random.default_rng(0)
+    print(f"{'notes':>10} {'exact ms':>10} {'ivf ms':>10} {'recall@' + str(k):>10}")
+    for size in sizes:
+        vectors = synthetic(size + queries, dimension, max(16, size // 500), rng)
+        data, query_vectors = vectors[:size], vectors[size:]
+        exact = SimpleEmbeddingRetriever(index="exact")
+        ivf = SimpleEmbeddingRetriever(index=IVFIndex(nprobe=nprobe))
+        fill(exact, data)
+        fill(ivf, data)
+        exact_results, exact_ms = time_queries(exact, query_vectors, k)
+        ivf_results, ivf_ms = time_queries(ivf, query_vectors, k)
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(exact_results, ivf_results)])
+        print(f"{size:>10} {exact_ms:>10.2f} {ivf_ms:>10.2f} {recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark exact vs IVF vector search")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 300000, 1000000])
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    run(args.sizes, args.dimension, args.nprobe, args.k, args.queries)
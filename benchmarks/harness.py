@@ -0,0 +1,192 @@
+"""
+Shared pieces of the benchmark harness.
+
+SyntheticCorpus generates notes and queries over a fixed vocabulary of
+topics, and DeterministicLLM answers the analysis and evolution prompts
+with responses derived from the prompt text, so runs are reproducible
+across machines and commits without an LLM backend. Build the memory
+system with model_name=HASHING_MODEL to run without an embedding model.
+"""
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.test_utils import MockLLMController
+
+_SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "te", "vo", "zi", "pa", "do", "fe",
+              "gu", "hi", "ja", "ko", "li", "mo", "nu", "ri", "so", "ta", "ve", "yu"]
+
+_WORD_PATTERN = re.compile(r"[a-z]{4,}")
+_NEIGHBOR_PATTERN = re.compile(r"^Memory (\S+):$", re.MULTILINE)
+
+
+class SyntheticCorpus:
+    """Deterministic notes and queries drawn from topic vocabularies.
+
+    Each note mixes words of one topic with general vocabulary, and topic
+    popularity follows a Zipf distribution. Note i and query j depend only
+    on the seed and their index, so any prefix of the corpus is the same in
+    every run.
+    """
+
+    def __init__(self, seed: int = 0, topics: int = 200, vocabulary: int = 5000,
+                 topic_words: int = 25, note_words: Tuple[int, int] = (12, 24)):
+        """Build the vocabularies.
+
+        Args:
+            seed: Seed of every generated note and query
+            topics: Number of topics
+            vocabulary: Number of distinct general words
+            topic_words: Number of words specific to each topic
+            note_words: Inclusive range of the number of words per note
+        """
+        self.seed = seed
+        self.note_words = note_words
+        rng = random.Random(seed)
+        needed = vocabulary + topics * topic_words
+        words = set()
+        while len(words) < needed:
+            words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+        words = sorted(words)
+        rng.shuffle(words)
+        self.general = words[:vocabulary]
+        self.topics = [words[vocabulary + t * topic_words:vocabulary + (t + 1) * topic_words]
+                       for t in range(topics)]
+        weights = 1.0 / np.arange(1, topics + 1)
+        self._topic_cdf = np.cumsum(weights / weights.sum())
+
+    def _topic(self, rng: random.Random) -> int:
+        return min(int(np.searchsorted(self._topic_cdf, rng.random())), len(self.topics) - 1)
+
+    def note(self, index: int) -> Tuple[str, int]:
+        """Content and topic of note `index`"""
+        rng = random.Random(f"{self.seed}:note:{index}")
+        topic = self._topic(rng)
+        count = rng.randint(*self.note_words)
+        words = [rng.choice(self.topics[topic]) if rng.random() < 0.6 else rng.choice(self.general)
+                 for _ in range(count)]
+        return f"Note {index}: " + " ".join(words), topic
+
+    def notes(self, start: int, stop: int) -> Iterator[str]:
+        """Contents of notes start..stop-1"""
+        for index in range(start, stop):
+            yield self.note(index)[0]
+
+    def query(self, index: int) -> Tuple[str, int]:
+        """Text and topic of query `index`: a few words of one topic, sometimes with a general word"""
+        rng = random.Random(f"{self.seed}:query:{index}")
+        topic = self._topic(rng)
+        words = rng.sample(self.topics[topic], rng.randint(3, 6))
+        if rng.random() < 0.5:
+            words.append(rng.choice(self.general))
+        return " ".join(words), topic
+
+    def queries(self, count: int) -> List[str]:
+        return [self.query(index)[0] for index in range(count)]
+
+
+class DeterministicLLM(MockLLMController):
+    """Mock LLM whose responses are a function of the prompt.
+
+    Analysis prompts get keywords, a context and tags taken from the note
+    text. Evolution prompts evolve for a fixed fraction of notes (chosen by a
+    hash of the prompt), linking the new note to its first neighbors and
+    updating the context and tags of the nearest one.
+    """
+
+    def __init__(self, evolve_rate: float = 0.1, latency: float = 0.0):
+        """Initialize the mock.
+
+        Args:
+            evolve_rate: Fraction of evolution prompts answered with should_evolve
+            latency: Seconds slept per completion to stand in for a real LLM
+        """
+        super().__init__()
+        self.evolve_rate = evolve_rate
+        self.latency = latency
+
+    def get_completion(self, prompt: str, response_format: dict = None, temperature: float = 0.7) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        if "Content for analysis:" in prompt:
+            return json.dumps(self._analysis(prompt.rsplit("Content for analysis:", 1)[1]))
+        if "should_evolve" in prompt:
+            return json.dumps(self._evolution(prompt))
+        return self.mock_response
+
+    @staticmethod
+    def _analysis(content: str) -> Dict:
+        keywords = list(dict.fromkeys(_WORD_PATTERN.findall(content.lower())))[:5] or ["synthetic"]
+        return {
+            "keywords": keywords,
+            "context": f"Synthetic note about {' '.join(keywords[:3])}",
+            "tags": keywords[:2] + ["synthetic"],
+        }
+
+    def _evolution(self, prompt: str) -> Dict:
+        neighbor_ids = _NEIGHBOR_PATTERN.findall(prompt)
+        bucket = zlib.crc32(prompt.encode("utf-8")) % 10000
+        if not neighbor_ids or bucket >= self.evolve_rate * 10000:
+            return {"should_evolve": False, "actions": [], "suggested_connections": [],
+                    "tags_to_update": [], "new_context_neighborhood": [], "new_tags_neighborhood": []}
+        return {
+            "should_evolve": True,
+            "actions": ["strengthen", "update_neighbor"],
+            "suggested_connections": neighbor_ids[:2],
+            "tags_to_update": ["synthetic", "evolved"],
+            "new_context_neighborhood": [f"Synthetic neighborhood {bucket}"],
+            "new_tags_neighborhood": [["synthetic", "neighbor"]],
+        }
+
+
+class BenchmarkLLMController:
+    """Stands in for LLMController, serving completions from a DeterministicLLM"""
+
+    def __init__(self, evolve_rate: float = 0.1, latency: float = 0.0):
+        self.llm = DeterministicLLM(evolve_rate, latency)
+
+    def get_completion(self, prompt: str, response_format: dict = None, temperature: float = 0.7,
+                       timeout: Optional[float] = None) -> str:
+        return self.llm.get_completion(prompt, response_format, temperature)
+
+
+def rss_mb() -> Optional[float]:
+    """Resident set size of this process in MiB, or None if it cannot be read"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MiB, or None on platforms without getrusage"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def latency_summary(samples_ms: Sequence[float]) -> Dict[str, float]:
+    """Mean and p50/p95/p99 of latencies in milliseconds"""
+    if not len(samples_ms):
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    p50, p95, p99 = np.percentile(samples_ms, [50, 95, 99])
+    return {"mean": round(float(np.mean(samples_ms)), 3), "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3), "p99": round(float(p99), 3)}
@@ -24,6 +24,52 @@ class Settings(BaseSettings):
     API_KEY: str = os.environ.get("OPENAI_API_KEY", "")
     API_URL: str = os.environ.get("OPENAI_API_URL", "")  # OpenAI-compatible API URL
     
+    # Durable note store (set MEMORY_STORE_DIR to an empty string to keep notes in memory only)
+    MEMORY_STORE_DIR: str = os.environ.get(
+        "MEMORY_STORE_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "memory_store")
+    )
+    MEMORY_SNAPSHOT_INTERVAL: int = int(os.environ.get("MEMORY_SNAPSHOT_INTERVAL", 10000))
+    
+    # Background evolution (create returns before the evolution LLM call)
+    ASYNC_EVOLUTION: bool = os.environ.get("ASYNC_EVOLUTION", "True").lower() in ("true", "1", "t")
+    EVOLUTION_WORKERS: int = int(os.environ.get("EVOLUTION_WORKERS", 2))
+    
+    # Worker threads available to blocking memory operations in request handlers
+    MAX_CONCURRENT_WRITES: int = int(os.environ.get("MAX_CONCURRENT_WRITES", 4))
+    MAX_CONCURRENT_READS: int = int(os.environ.get("MAX_CONCURRENT_READS", 16))
+    
+    # Embedding retriever index: "ivf" (approximate, exact until the store is large) or "exact"
+    VECTOR_INDEX: str = os.environ.get("VECTOR_INDEX", "ivf")
+    IVF_NPROBE: int = int(os.environ.get("IVF_NPROBE", 8))
+    
+    # Persistent LLM response cache (set LLM_CACHE_PATH to an empty string to disable it).
+    # Analysis and evolution prompts run at temperature 0.7, so the server opts in to
+    # caching non-zero temperatures; re-ingested content then reuses earlier analyses.
+    LLM_CACHE_PATH: str = os.environ.get(
+        "LLM_CACHE_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "llm_cache.sqlite")
+    )
+    LLM_CACHE_TTL: float = float(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 3600))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 100000))
+    LLM_CACHE_NONZERO_TEMPERATURE: bool = os.environ.get("LLM_CACHE_NONZERO_TEMPERATURE", "True").lower() in ("true", "1", "t")
+    
+    # How search fuses ChromaDB, embedding and BM25 results: "rrf" or "weighted"
+    SEARCH_FUSION: str = os.environ.get("SEARCH_FUSION", "rrf")
+    
+    # Startup: with LAZY_STARTUP the server answers /health at once and builds the memory
+    # system in the background; requests wait up to STARTUP_TIMEOUT seconds for it
+    LAZY_STARTUP: bool = os.environ.get("LAZY_STARTUP", "True").lower() in ("true", "1", "t")
+    STARTUP_TIMEOUT: float = float(os.environ.get("STARTUP_TIMEOUT", 60))
+    
+    # Request tracing: fraction of requests traced (head-based sampling, 0 disables it)
+    # and the JSON lines file the traces are appended to
+    TRACE_SAMPLE_RATE: float = float(os.environ.get("TRACE_SAMPLE_RATE", 0.01))
+    TRACE_FILE: str = os.environ.get(
+        "TRACE_FILE",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "traces.jsonl")
+    )
+    
     # Default memory retrieval parameters
     DEFAULT_K: int = int(os.environ.get("DEFAULT_K", 5))
     
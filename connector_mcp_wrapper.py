@@ -8,6 +8,7 @@ import traceback
 import threading
 import msvcrt  # Windows-specific module for console input
 from dotenv import load_dotenv
+from tracing import mcp_trace_headers
 
 # Configure logging
 logging.basicConfig(
@@ -175,6 +176,7 @@ def handle_mcp():
                     sys.stderr.flush()
                     
                     params = request.get("params", {})
+                    trace_headers = mcp_trace_headers(params)
                     
                     try:
                         # Forward to the A-MEM server
@@ -183,6 +185,7 @@ def handle_mcp():
                         
                         api_response = requests.post(
                             f"{base_url}/memories",
+                            headers=trace_headers,
                             json={
                                 "content": params.get("content", ""),
                                 "tags": params.get("tags", []),
@@ -240,6 +243,80 @@ def handle_mcp():
                     print(f"Sent create_memory response", file=sys.stderr)
                     sys.stderr.flush()
                     
+                elif method == "create_memories":
+                    # Handle create_memories (batch) method
+                    logger.info("Handling create_memories request")
+                    print("Handling create_memories request", file=sys.stderr)
+                    sys.stderr.flush()
+                    
+                    params = request.get("params", {})
+                    trace_headers = mcp_trace_headers(params)
+                    items = params.get("memories", [])
+                    
+                    try:
+                        # Forward the whole batch to the A-MEM server in one request
+                        print(f"Sending {len(items)} memories to {base_url}/memories:batch", file=sys.stderr)
+                        sys.stderr.flush()
+                        
+                        api_response = requests.post(
+                            f"{base_url}/memories:batch",
+                            headers=trace_headers,
+                            json={
+                                "memories": [
+                                    {
+                                        "content": item.get("content", ""),
+                                        "tags": item.get("tags", []),
+                                        "category": item.get("category", "General")
+                                    }
+                                    for item in items
+                                ],
+                                "evolve": params.get("evolve", True)
+                            },
+                            timeout=300  # Batches take longer than single creates
+                        )
+                        
+                        logger.info(f"A-MEM server response: {api_response.status_code}")
+                        print(f"A-MEM server response: {api_response.status_code}", file=sys.stderr)
+                        sys.stderr.flush()
+                        
+                        if api_response.status_code in (200, 201):
+                            batch_data = api_response.json()
+                            logger.info(f"Created {len(batch_data.get('memories', []))} memories")
+                            
+                            response = {
+                                "jsonrpc": "2.0",
+                                "id": request_id,
+                                "result": batch_data
+                            }
+                        else:
+                            logger.error(f"API error: {api_response.status_code} - {api_response.text}")
+                            raise Exception(f"API error: {api_response.status_code} - {api_response.text}")
+                            
+                    except Exception as e:
+                        logger.error(f"Error in create_memories: {e}")
+                        print(f"Error in create_memories: {e}", file=sys.stderr)
+                        traceback.print_exc(file=sys.stderr)
+                        sys.stderr.flush()
+                        
+                        # Report the failure instead of inventing IDs for a whole batch
+                        response = {
+                            "jsonrpc": "2.0",
+                            "id": request_id,
+                            "error": {
+                                "code": -32603,
+                                "message": f"Batch creation failed: {str(e)}"
+                            }
+                        }
+                    
+                    # Write response and ensure it's flushed
+                    response_json = json.dumps(response)
+                    sys.stdout.write(response_json + "\n")
+                    sys.stdout.flush()
+                    
+                    logger.info("Sent create_memories response")
+                    print(f"Sent create_memories response", file=sys.stderr)
+                    sys.stderr.flush()
+                    
                 elif method == "search_memories":
                     # Handle search_memories method
                     logger.info("Handling search_memories request")
@@ -247,6 +324,7 @@ def handle_mcp():
                     sys.stderr.flush()
                     
                     params = request.get("params", {})
+                    trace_headers = mcp_trace_headers(params)
                     query = params.get("query", "")
                     k = params.get("k", 5)
                     
@@ -257,6 +335,7 @@ def handle_mcp():
                         
                         api_response = requests.get(
                             f"{base_url}/search",
+                            headers=trace_headers,
                             params={"query": query, "k": k},
                             timeout=30  # Set a longer timeout
                         )
@@ -318,6 +397,7 @@ def handle_mcp():
                     sys.stderr.flush()
                     
                     params = request.get("params", {})
+                    trace_headers = mcp_trace_headers(params)
                     memory_id = params.get("id", "")
                     
                     try:
@@ -327,6 +407,7 @@ def handle_mcp():
                         
                         api_response = requests.get(
                             f"{base_url}/memories/{memory_id}",
+                            headers=trace_headers,
                             timeout=30
                         )
                         
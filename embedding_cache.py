@@ -0,0 +1,307 @@
+"""
+Content-hash embedding cache.
+
+Embeddings are keyed by (model name, normalization, hash of the text), so
+re-encoding an unchanged note after a restart or a consolidation pass is a
+lookup instead of a model call. The cache has two tiers:
+
+- an in-memory LRU of recently used vectors
+- an on-disk tier per (model, normalization): a memory-mapped float32 matrix
+  ``vectors.f32`` plus an append-only ``keys.txt`` with one text hash per row,
+  bounded in size and compacted to the most recently used vectors when full
+"""
+import os
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Project cache directory
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(PROJECT_DIR, ".cache")
+DEFAULT_CACHE_DIR = os.path.join(CACHE_DIR, "embeddings")
+
+
+def text_hash(text: str) -> str:
+    """Stable hex digest of a text, used as its cache key"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class _DiskTier:
+    """Memory-mapped vectors for one (model, normalization) namespace.
+
+    Vectors are written to the matrix before their key is appended, so a
+    crash can leave an unused row but never a key pointing at a missing
+    vector. Rows past the last complete key are overwritten on the next put.
+
+    The tier holds at most `max_rows` vectors. When a put would exceed it,
+    the tier is compacted down to the most recently used three quarters of
+    that bound.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    KEYS_FILE = "keys.txt"
+    INITIAL_CAPACITY = 1024
+    # Fraction of max_rows kept by a compaction, so compactions are amortized
+    COMPACT_FRACTION = 0.75
+
+    def __init__(self, directory: str, dimension: int, max_rows: int = 200000):
+        self.directory = directory
+        self.dimension = dimension
+        self.max_rows = max(1, max_rows)
+        self.vectors_path = os.path.join(directory, self.VECTORS_FILE)
+        self.keys_path = os.path.join(directory, self.KEYS_FILE)
+        os.makedirs(directory, exist_ok=True)
+
+        self.rows: Dict[str, int] = {}
+        row_bytes = 4 * dimension
+        file_rows = os.path.getsize(self.vectors_path) // row_bytes if os.path.exists(self.vectors_path) else 0
+        valid_length = 0
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "rb") as f:
+                for line in f:
+                    # A torn last line or a key without its vector ends the valid prefix
+                    if not line.endswith(b"\n") or len(self.rows) >= file_rows:
+                        break
+                    self.rows[line[:-1].decode("utf-8")] = len(self.rows)
+                    valid_length += len(line)
+            # Drop a torn tail; the valid prefix is left as it is
+            if valid_length != os.path.getsize(self.keys_path):
+                logger.warning(f"Discarding incomplete keys at offset {valid_length} in {self.keys_path}")
+                with open(self.keys_path, "r+b") as f:
+                    f.truncate(valid_length)
+        self._count = len(self.rows)
+        self._keys_file = open(self.keys_path, "a", encoding="utf-8")
+
+        # Last use of each row, for choosing what compaction keeps; rows loaded
+        # from disk count as used in the order they were written
+        self._clock = self._count
+        self._matrix = None
+        self._ticks = np.zeros(0, dtype=np.int64)
+        self._open_matrix(max(file_rows, self.INITIAL_CAPACITY))
+        self._ticks[:self._count] = np.arange(self._count)
+
+    def _open_matrix(self, capacity: int):
+        """(Re)map the vectors file with room for `capacity` rows"""
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+        size = capacity * 4 * self.dimension
+        with open(self.vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+        if len(self._ticks) < capacity:
+            ticks = np.zeros(capacity, dtype=np.int64)
+            ticks[:len(self._ticks)] = self._ticks
+            self._ticks = ticks
+
+    def _touch(self, row: int):
+        self._clock += 1
+        self._ticks[row] = self._clock
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        self._touch(row)
+        return np.array(self._matrix[row])
+
+    def put_many(self, keys: List[str], vectors: np.ndarray):
+        """Append vectors for keys that are not stored yet, compacting first if the tier is full"""
+        new = list({key: vector for key, vector in zip(keys, vectors) if key not in self.rows}.items())
+        if not new:
+            return
+        new = new[-self.max_rows:]
+        if self._count + len(new) > self.max_rows:
+            self._compact(max(0, int(self.max_rows * self.COMPACT_FRACTION) - len(new)))
+        needed = self._count + len(new)
+        if needed > self._matrix.shape[0]:
+            capacity = self._matrix.shape[0]
+            while capacity < needed:
+                capacity *= 2
+            self._open_matrix(capacity)
+        start = self._count
+        for offset, (_, vector) in enumerate(new):
+            self._matrix[start + offset] = vector
+        self._matrix.flush()
+        self._keys_file.write("".join(f"{key}\n" for key, _ in new))
+        self._keys_file.flush()
+        for offset, (key, _) in enumerate(new):
+            self.rows[key] = start + offset
+            self._touch(start + offset)
+        self._count = needed
+
+    def _compact(self, keep: int):
+        """Rewrite the tier with only the `keep` most recently used rows.
+
+        The keys file is emptied before the vectors file is replaced and
+        rewritten after it, so a crash at any point leaves either the old
+        files, an empty cache, or the compacted files.
+        """
+        row_keys = list(self.rows)  # Insertion order is row order
+        kept = np.sort(np.argsort(-self._ticks[:self._count], kind="stable")[:keep])
+        vectors = np.array(self._matrix[kept])
+        ticks = self._ticks[kept]
+
+        capacity = max(len(kept), self.INITIAL_CAPACITY)
+        tmp_vectors = self.vectors_path + ".tmp"
+        tmp_keys = self.keys_path + ".tmp"
+        matrix = np.memmap(tmp_vectors, dtype=np.float32, mode="w+", shape=(capacity, self.dimension))
+        matrix[:len(kept)] = vectors
+        matrix.flush()
+        del matrix
+        with open(tmp_keys, "w", encoding="utf-8") as f:
+            f.writelines(f"{row_keys[row]}\n" for row in kept)
+
+        # Files must be closed before they are replaced (required on Windows)
+        self._matrix.flush()
+        self._matrix = None
+        self._keys_file.close()
+        with open(self.keys_path, "w", encoding="utf-8"):
+            pass
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_keys, self.keys_path)
+
+        self.rows = {row_keys[row]: index for index, row in enumerate(kept)}
+        self._count = len(kept)
+        self._ticks = np.zeros(capacity, dtype=np.int64)
+        self._ticks[:self._count] = ticks
+        self._keys_file = open(self.keys_path, "a", encoding="utf-8")
+        self._open_matrix(capacity)
+        logger.info(f"Compacted embedding cache at {self.directory} to {self._count} vectors")
+
+    def close(self):
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        self._keys_file.close()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache keyed by (model name, normalization, text hash)"""
+
+    def __init__(self, directory: Optional[str] = DEFAULT_CACHE_DIR, max_memory_entries: int = 50000,
+                 max_disk_entries: int = 200000):
+        """Initialize the cache.
+
+        Args:
+            directory: Root directory of the on-disk tier, or None for memory only
+            max_memory_entries: Maximum number of vectors kept in the in-memory LRU
+            max_disk_entries: Maximum number of vectors kept on disk per model; the
+                least recently used are dropped by compaction beyond it
+        """
+        self.directory = directory
+        self.max_memory_entries = max(0, max_memory_entries)
+        self.max_disk_entries = max(1, max_disk_entries)
+        self._memory: "OrderedDict[Tuple[str, bool, str], np.ndarray]" = OrderedDict()
+        self._disk: Dict[Tuple[str, bool], _DiskTier] = {}
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _disk_tier(self, model_name: str, normalize: bool, dimension: int) -> Optional[_DiskTier]:
+        """Open the on-disk tier for a namespace, or None if disk caching is off or unusable"""
+        if not self.directory:
+            return None
+        namespace = (model_name, normalize)
+        tier = self._disk.get(namespace)
+        if tier is None:
+            safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+            directory = os.path.join(self.directory, f"{safe_name}_{'norm' if normalize else 'raw'}_{dimension}")
+            try:
+                tier = _DiskTier(directory, dimension, self.max_disk_entries)
+            except Exception as e:
+                logger.error(f"Error opening embedding cache at {directory}, using memory only: {e}")
+                tier = None
+            self._disk[namespace] = tier
+        return tier
+
+    def _remember(self, key: Tuple[str, bool, str], vector: np.ndarray):
+        """Insert into the in-memory LRU, evicting the least recently used entries"""
+        if self.max_memory_entries == 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model_name: str, normalize: bool, dimension: int,
+                 texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Look up cached vectors for texts.
+
+        Args:
+            model_name: Model that produced the vectors
+            normalize: Whether the vectors are L2-normalized
+            dimension: Embedding dimension of the model
+            texts: Texts to look up
+
+        Returns:
+            List[Optional[np.ndarray]]: The cached vector for each text, or None on a miss
+        """
+        with self._lock:
+            tier = self._disk_tier(model_name, normalize, dimension)
+            results = []
+            for text in texts:
+                key = (model_name, normalize, text_hash(text))
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                elif tier is not None and (vector := tier.get(key[2])) is not None:
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+                results.append(vector)
+            return results
+
+    def put_many(self, model_name: str, normalize: bool, texts: List[str], vectors: np.ndarray):
+        """Store freshly computed vectors in both tiers.
+
+        Args:
+            model_name: Model that produced the vectors
+            normalize: Whether the vectors are L2-normalized
+            texts: Texts the vectors were computed from
+            vectors: Array with one row per text
+        """
+        if not texts:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            hashes = [text_hash(text) for text in texts]
+            for digest, vector in zip(hashes, vectors):
+                self._remember((model_name, normalize, digest), vector.copy())
+            tier = self._disk_tier(model_name, normalize, vectors.shape[1])
+            if tier is not None:
+                try:
+                    tier.put_many(hashes, vectors)
+                except Exception as e:
+                    logger.error(f"Error writing embedding cache: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        """Hit and miss counters for the cache"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": sum(len(tier.rows) for tier in self._disk.values() if tier is not None),
+            }
+
+    def close(self):
+        """Flush and close the on-disk tiers"""
+        with self._lock:
+            for tier in self._disk.values():
+                if tier is not None:
+                    tier.close()
+            self._disk.clear()
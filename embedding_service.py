@@ -0,0 +1,182 @@
+"""
+Process-wide embedding service.
+
+Each sentence transformer model is loaded once per process and shared by every
+index that needs it (SimpleEmbeddingRetriever and the ChromaDB embedding
+function), so documents and queries are encoded in one batch and the vectors
+handed to whichever index needs them.
+Model outputs go through a content-hash embedding cache, so unchanged texts
+are looked up rather than re-encoded, including after a restart.
+
+Pass model_name="hashing" to skip the model and use the deterministic hashed
+bag-of-words encoder, e.g. for offline benchmarks.
+
+Environment variables:
+    EMBEDDING_CACHE_DIR: Root of the on-disk cache tier (empty string for memory only)
+    EMBEDDING_CACHE_SIZE: Number of vectors kept in the in-memory LRU (0 disables the cache)
+    EMBEDDING_CACHE_DISK_SIZE: Maximum number of vectors kept on disk per model
+"""
+import os
+import re
+import zlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_DIR
+from metrics import ENCODE_SECONDS, ENCODED_TEXTS
+
+logger = logging.getLogger(__name__)
+
+# Project cache directory
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(PROJECT_DIR, ".cache")
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+# Model name selecting the hashed bag-of-words encoder instead of a sentence transformer
+HASHING_MODEL = "hashing"
+
+# Dimension of the hashed bag-of-words vectors used when no model is available
+FALLBACK_DIMENSION = 384
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class EmbeddingService:
+    """A loaded sentence transformer model with a fallback encoder"""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, device: Optional[str] = None,
+                 cache: Optional[EmbeddingCache] = None):
+        """Load the model from the local cache.
+
+        Args:
+            model_name: Name of the sentence transformer model to load
+            device: Device to run the model on (cpu/cuda), or None to pick automatically
+            cache: Optional embedding cache consulted before running the model
+        """
+        self.model_name = model_name
+        self.device = device
+        self.cache = cache
+
+        # Set environment variables before loading any models
+        os.environ["SENTENCE_TRANSFORMERS_HOME"] = os.path.join(CACHE_DIR, "sentence_transformers")
+        os.environ["TRANSFORMERS_CACHE"] = os.path.join(CACHE_DIR, "transformers")
+        os.environ["HF_HOME"] = os.path.join(CACHE_DIR, "transformers")
+
+        if model_name == HASHING_MODEL:
+            logger.info("Using the hashed bag-of-words encoder")
+            self.model = None
+            self.dimension = FALLBACK_DIMENSION
+            return
+
+        try:
+            logger.info(f"Loading sentence transformer model: {model_name}")
+            self.model = SentenceTransformer(model_name, device=device)
+            self.dimension = self.model.get_sentence_embedding_dimension()
+            logger.info(f"Successfully loaded sentence transformer model: {model_name}")
+        except Exception as e:
+            logger.error(f"Error loading embedding model {model_name}: {e}")
+            logger.warning("Using fallback embedding approach")
+            self.model = None
+            self.dimension = FALLBACK_DIMENSION
+
+    def encode(self, texts: List[str], normalize: bool = True) -> np.ndarray:
+        """Encode texts into a float32 matrix with one row per text.
+
+        Args:
+            texts: Texts to encode
+            normalize: Whether to L2-normalize each row
+
+        Returns:
+            np.ndarray: Array of shape (len(texts), dimension)
+        """
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        if self.model is None:
+            # Not cached: fallback vectors must not outlive a model failure
+            return self.fallback_encode(texts)
+        if self.cache is None:
+            return self._model_encode(texts, normalize)
+
+        cached = self.cache.get_many(self.model_name, normalize, self.dimension, texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if not missing:
+            return np.stack(cached)
+
+        # Encode each distinct missing text once, in a single batch
+        missing_texts = list(dict.fromkeys(texts[i] for i in missing))
+        computed = self._model_encode(missing_texts, normalize)
+        self.cache.put_many(self.model_name, normalize, missing_texts, computed)
+        rows = dict(zip(missing_texts, computed))
+        for i in missing:
+            cached[i] = rows[texts[i]]
+        return np.stack(cached).astype(np.float32, copy=False)
+
+    def _model_encode(self, texts: List[str], normalize: bool) -> np.ndarray:
+        """Run the model on texts, bypassing the cache"""
+        with ENCODE_SECONDS.time():
+            embeddings = self.model.encode(texts, normalize_embeddings=normalize)
+        ENCODED_TEXTS.inc(len(texts))
+        return np.asarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+
+    @staticmethod
+    def fallback_encode(texts: List[str]) -> np.ndarray:
+        """Hashed bag-of-words vectors of a fixed dimension, L2-normalized.
+
+        Not semantic, but deterministic and dimension-stable, so vectors
+        produced before and after a model failure can share an index.
+        """
+        vectors = np.zeros((len(texts), FALLBACK_DIMENSION), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in _TOKEN_PATTERN.findall(text.lower()):
+                vectors[i, zlib.crc32(word.encode("utf-8")) % FALLBACK_DIMENSION] += 1.0
+            norm = np.linalg.norm(vectors[i])
+            if norm > 0:
+                vectors[i] /= norm
+        return vectors
+
+
+_services: Dict[Tuple[str, Optional[str]], EmbeddingService] = {}
+_services_lock = threading.Lock()
+_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Return the process-wide embedding cache, or None if it is disabled.
+
+    Returns:
+        Optional[EmbeddingCache]: Cache configured from EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_SIZE
+            and EMBEDDING_CACHE_DISK_SIZE
+    """
+    global _cache
+    with _services_lock:
+        if _cache is None:
+            max_entries = int(os.getenv("EMBEDDING_CACHE_SIZE", "50000"))
+            if max_entries <= 0:
+                return None
+            directory = os.getenv("EMBEDDING_CACHE_DIR", DEFAULT_CACHE_DIR) or None
+            max_disk_entries = int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", "200000"))
+            _cache = EmbeddingCache(directory, max_memory_entries=max_entries, max_disk_entries=max_disk_entries)
+        return _cache
+
+
+def get_embedding_service(model_name: str = DEFAULT_MODEL, device: Optional[str] = None) -> EmbeddingService:
+    """Return the process-wide service for a model, loading it on first use.
+
+    Args:
+        model_name: Name of the sentence transformer model
+        device: Device to run the model on, or None to pick automatically
+
+    Returns:
+        EmbeddingService: The shared service for (model_name, device)
+    """
+    key = (model_name, device)
+    cache = get_embedding_cache()
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = EmbeddingService(model_name, device, cache=cache)
+            _services[key] = service
+        return service
@@ -0,0 +1,149 @@
+"""
+Background memory evolution.
+
+Evolution (a hybrid search plus an LLM call) used to run inside create(),
+so write latency was dominated by it. EvolutionQueue moves it to a small
+pool of worker threads: create() returns once the note is analyzed and
+indexed, and evolution decisions are applied later. StripedLock provides
+the per-note locks those decisions are applied under.
+"""
+import time
+import queue
+import contextvars
+import logging
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+
+class StripedLock:
+    """A fixed pool of locks addressed by key.
+
+    Each memory ID maps to one of `stripes` locks, so locking a note costs no
+    allocation and the pool never grows. hold() takes the stripes for several
+    keys in a fixed order, so callers locking overlapping sets cannot deadlock.
+    """
+
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.RLock() for _ in range(max(1, stripes))]
+
+    def _stripe(self, key: str) -> int:
+        return zlib.crc32(key.encode("utf-8")) % len(self._locks)
+
+    @contextmanager
+    def hold(self, keys: Iterable[str]):
+        """Hold the locks for every key in `keys` for the duration of the block"""
+        stripes = sorted({self._stripe(key) for key in keys if key})
+        for stripe in stripes:
+            self._locks[stripe].acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self._locks[stripe].release()
+
+
+class EvolutionQueue:
+    """FIFO of memory IDs awaiting evolution, drained by a worker pool"""
+
+    def __init__(self, handler: Callable[[str], Any], workers: int = 2, max_size: int = 0):
+        """Start the worker threads.
+
+        Args:
+            handler: Called with each queued memory ID on a worker thread
+            workers: Number of worker threads
+            max_size: Maximum queue length (0 for unbounded); submit() blocks when full
+        """
+        self.handler = handler
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max(0, max_size))
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self.started = 0
+        self.processed = 0
+        self.failed = 0
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+        self._total_lag = 0.0
+        self._closed = False
+        self._workers = []
+        for i in range(max(1, workers)):
+            worker = threading.Thread(target=self._run, name=f"memory-evolution-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, memory_id: str):
+        """Queue a memory for evolution"""
+        if self._closed:
+            raise RuntimeError("EvolutionQueue is closed")
+        # Run the handler in the submitter's context, so tracing follows the note
+        self._queue.put((memory_id, time.monotonic(), contextvars.copy_context()))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            memory_id, enqueued_at, context = item
+            lag = time.monotonic() - enqueued_at
+            with self._stats_lock:
+                self._in_flight += 1
+                self.started += 1
+                self._last_lag = lag
+                self._max_lag = max(self._max_lag, lag)
+                self._total_lag += lag
+            failed = False
+            try:
+                context.run(self.handler, memory_id)
+            except Exception as e:
+                failed = True
+                logger.error(f"Error evolving memory {memory_id}: {e}")
+            finally:
+                with self._stats_lock:
+                    self._in_flight -= 1
+                    self.processed += 1
+                    self.failed += int(failed)
+                self._queue.task_done()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued memory has been evolved.
+
+        Args:
+            timeout: Maximum number of seconds to wait, or None to wait indefinitely
+
+        Returns:
+            bool: True if the queue drained, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: Optional[float] = None):
+        """Stop accepting work, let the workers drain the queue and exit"""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def stats(self) -> Dict[str, float]:
+        """Queue depth, in-flight count and lag between enqueue and processing"""
+        with self._stats_lock:
+            return {
+                "depth": self._queue.qsize(),
+                "in_flight": self._in_flight,
+                "processed": self.processed,
+                "failed": self.failed,
+                "last_lag_seconds": self._last_lag,
+                "max_lag_seconds": self._max_lag,
+                "avg_lag_seconds": self._total_lag / self.started if self.started else 0.0,
+                "workers": len(self._workers),
+            }
@@ -90,13 +90,14 @@ class SimpleChromaRetriever:
             self.collection = None
             logger.info("Using in-memory fallback")
             
-    def add_document(self, document: str, metadata: Dict, doc_id: str) -> bool:
+    def add_document(self, document: str, metadata: Dict, doc_id: str, embedding=None) -> bool:
         """Add a document
         
         Args:
             document: Text content
             metadata: Document metadata
             doc_id: Document ID
+            embedding: Ignored; this collection always uses skip embeddings
             
         Returns:
             bool: Success status
@@ -106,7 +107,7 @@ class SimpleChromaRetriever:
                 # Process metadata for ChromaDB (convert lists to strings)
                 processed_metadata = {}
                 for key, value in metadata.items():
-                    if isinstance(value, list):
+                    if isinstance(value, (list, tuple)):
                         processed_metadata[key] = ", ".join(value)
                     else:
                         processed_metadata[key] = value
@@ -134,6 +135,105 @@ class SimpleChromaRetriever:
         }
         return True
         
+    def add_documents(self, documents: List[str], metadatas: List[Dict], doc_ids: List[str], embeddings=None) -> bool:
+        """Add several documents
+        
+        Args:
+            documents: Text content for each document
+            metadatas: Metadata for each document
+            doc_ids: Document IDs
+            embeddings: Ignored; this collection always uses skip embeddings
+            
+        Returns:
+            bool: Success status
+        """
+        # Upserting new IDs is equivalent to adding them
+        return self.upsert_documents(documents, metadatas, doc_ids)
+        
+    def upsert_documents(self, documents: List[str], metadatas: List[Dict], doc_ids: List[str], embeddings=None) -> bool:
+        """Insert or replace several documents
+        
+        Args:
+            documents: Text content for each document
+            metadatas: Metadata for each document
+            doc_ids: Document IDs
+            embeddings: Ignored; this collection always uses skip embeddings
+            
+        Returns:
+            bool: Success status
+        """
+        if self.use_chromadb and self.collection:
+            try:
+                processed_metadatas = []
+                for metadata in metadatas:
+                    processed_metadata = {}
+                    for key, value in metadata.items():
+                        if isinstance(value, (list, tuple)):
+                            processed_metadata[key] = ", ".join(value)
+                        else:
+                            processed_metadata[key] = value
+                    processed_metadatas.append(processed_metadata)
+                    
+                self.collection.upsert(
+                    documents=documents,
+                    metadatas=processed_metadatas,
+                    ids=doc_ids
+                )
+                return True
+            except Exception as e:
+                logger.error(f"Error upserting documents to ChromaDB: {e}")
+                
+                # Fall back to in-memory storage
+                self.use_chromadb = False
+                logger.info("Switching to in-memory fallback")
+                
+        # In-memory fallback
+        for document, metadata, doc_id in zip(documents, metadatas, doc_ids):
+            self.in_memory_docs[doc_id] = {
+                "document": document,
+                "metadata": metadata,
+                "id": doc_id,
+                "embedding": None
+            }
+        return True
+        
+    def update_metadatas(self, metadatas: List[Dict], doc_ids: List[str]) -> bool:
+        """Replace the metadata of existing documents
+        
+        Args:
+            metadatas: Metadata for each document
+            doc_ids: Document IDs
+            
+        Returns:
+            bool: Success status
+        """
+        if self.use_chromadb and self.collection:
+            try:
+                processed_metadatas = []
+                for metadata in metadatas:
+                    processed_metadata = {}
+                    for key, value in metadata.items():
+                        if isinstance(value, (list, tuple)):
+                            processed_metadata[key] = ", ".join(value)
+                        else:
+                            processed_metadata[key] = value
+                    processed_metadatas.append(processed_metadata)
+                    
+                self.collection.update(
+                    ids=doc_ids,
+                    metadatas=processed_metadatas
+                )
+                return True
+            except Exception as e:
+                logger.error(f"Error updating metadata in ChromaDB: {e}")
+                return False
+                
+        # In-memory fallback
+        for metadata, doc_id in zip(metadatas, doc_ids):
+            if doc_id in self.in_memory_docs:
+                self.in_memory_docs[doc_id]["metadata"] = metadata
+        return True
+        
     def delete_document(self, doc_id: str) -> bool:
         """Delete a document
         
@@ -156,6 +256,24 @@ class SimpleChromaRetriever:
             
         return True
         
+    def search_many(self, queries: List[str], k: int = 5, query_embeddings=None):
+        """Search for several queries
+        
+        Args:
+            queries: Search queries
+            k: Number of results per query
+            query_embeddings: Ignored; the fallback encodes queries itself
+            
+        Returns:
+            Dict with ids, documents, distances, and metadatas, one inner list per query
+        """
+        merged = {'ids': [], 'documents': [], 'distances': [], 'metadatas': []}
+        for query in queries:
+            results = self.search(query, k)
+            for key in merged:
+                merged[key].append(results.get(key, [[]])[0])
+        return merged
+        
     def search(self, query: str, k: int = 5):
         """Search for documents
         
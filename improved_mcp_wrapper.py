@@ -4,9 +4,11 @@ import subprocess
 import threading
 import os
 import time
-import socket
 import logging
+import urllib.error
+import urllib.request
 import traceback
+from tracing import mcp_trace_headers
 
 # Configure logging
 logging.basicConfig(
@@ -43,29 +45,67 @@ def start_server():
     return server_process
 
 # Check if the server is up and running
-def wait_for_server(port=None, timeout=100):
+def wait_for_server(port=None, timeout=100, ready_timeout=30, process=None):
+    """Wait until the server answers /health, then give it a while to become ready.
+    
+    The server answers /health as soon as it is listening and warms up the
+    memory system in the background; requests sent before warm-up finishes wait
+    for it on the server side, so /ready is only awaited for up to `ready_timeout`.
+    
+    Args:
+        port: Server port (defaults to the PORT environment variable)
+        timeout: Seconds to wait for /health
+        ready_timeout: Seconds to wait for /ready after /health answers
+        process: Optional server process; stop waiting if it exits
+    
+    Returns:
+        bool: True if the server answered /health within `timeout`
+    """
     if port is None:
         port = os.getenv("PORT", "8765")
+    base_url = f"http://localhost:{int(port)}"
     logger.info(f"Waiting for server to start on port {port}")
     print(f"Waiting for server to start on port {port}", file=sys.stderr)
     sys.stderr.flush()
     
-    start_time = time.time()
-    while time.time() - start_time < timeout:
+    def get_status(path):
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.connect(("localhost", port))
-                logger.info("Server is up and running!")
-                print("Server is up and running!", file=sys.stderr)
-                sys.stderr.flush()
-                return True
-        except:
-            time.sleep(0.5)
+            with urllib.request.urlopen(base_url + path, timeout=2) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except (urllib.error.URLError, OSError):
+            return None
+    
+    start_time = time.time()
+    delay = 0.05
+    while get_status("/health") != 200:
+        if process is not None and process.poll() is not None:
+            logger.error(f"Server process exited with code {process.returncode}")
+            print(f"ERROR: Server process exited with code {process.returncode}", file=sys.stderr)
+            sys.stderr.flush()
+            return False
+        if time.time() - start_time >= timeout:
+            logger.error(f"Server failed to start within {timeout} seconds")
+            print(f"ERROR: Server failed to start within {timeout} seconds", file=sys.stderr)
+            sys.stderr.flush()
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
     
-    logger.error(f"Server failed to start within {timeout} seconds")
-    print(f"ERROR: Server failed to start within {timeout} seconds", file=sys.stderr)
+    logger.info(f"Server is up and running after {time.time() - start_time:.2f}s")
+    print("Server is up and running!", file=sys.stderr)
     sys.stderr.flush()
-    return False
+    
+    # Servers without a readiness endpoint answer 404 and are treated as ready
+    ready_start = time.time()
+    while time.time() - ready_start < ready_timeout:
+        if get_status("/ready") in (200, 404):
+            logger.info(f"Server is ready after {time.time() - start_time:.2f}s")
+            return True
+        time.sleep(0.5)
+    logger.warning(f"Server not ready after {ready_timeout} seconds; requests will wait for warm-up")
+    return True
 
 # Handle MCP protocol communications
 def handle_mcp():
@@ -136,6 +176,7 @@ def handle_mcp():
                 sys.stderr.flush()
                 
                 params = request.get("params", {})
+                trace_headers = mcp_trace_headers(params)
                 
                 try:
                     # Forward request to our API server
@@ -143,6 +184,7 @@ def handle_mcp():
                     
                     api_response = requests.post(
                         f"{server_url}/memories",
+                        headers=trace_headers,
                         json={
                             "content": params.get("content", ""),
                             "tags": params.get("tags", []),
@@ -195,6 +237,72 @@ def handle_mcp():
                 print(f"Sent create_memory response", file=sys.stderr)
                 sys.stderr.flush()
                 
+            elif method == "create_memories":
+                # Handle create_memories (batch) method
+                logger.info("Handling create_memories request")
+                print("Handling create_memories request", file=sys.stderr)
+                sys.stderr.flush()
+                
+                params = request.get("params", {})
+                trace_headers = mcp_trace_headers(params)
+                items = params.get("memories", [])
+                
+                try:
+                    # Forward the whole batch to our API server in one request
+                    print(f"Forwarding create_memories request to server with {len(items)} memories", file=sys.stderr)
+                    
+                    api_response = requests.post(
+                        f"{server_url}/memories:batch",
+                        headers=trace_headers,
+                        json={
+                            "memories": [
+                                {
+                                    "content": item.get("content", ""),
+                                    "tags": item.get("tags", []),
+                                    "category": item.get("category", "General")
+                                }
+                                for item in items
+                            ],
+                            "evolve": params.get("evolve", True)
+                        }
+                    )
+                    
+                    if api_response.status_code == 200 or api_response.status_code == 201:
+                        # Successfully created memories
+                        batch_data = api_response.json()
+                        print(f"Successfully created {len(batch_data.get('memories', []))} memories", file=sys.stderr)
+                        
+                        # Format response for MCP
+                        response = {
+                            "jsonrpc": "2.0",
+                            "id": request_id,
+                            "result": batch_data
+                        }
+                    else:
+                        # Error from API
+                        print(f"Error from API: {api_response.status_code} - {api_response.text}", file=sys.stderr)
+                        raise Exception(f"API error: {api_response.status_code}")
+                        
+                except Exception as e:
+                    print(f"Error during create_memories: {e}", file=sys.stderr)
+                    traceback.print_exc(file=sys.stderr)
+                    
+                    # Report the failure instead of inventing IDs for a whole batch
+                    response = {
+                        "jsonrpc": "2.0",
+                        "id": request_id,
+                        "error": {
+                            "code": -32603,
+                            "message": f"Batch creation failed: {str(e)}"
+                        }
+                    }
+                    
+                sys.stdout.write(json.dumps(response) + "\n")
+                sys.stdout.flush()
+                logger.info(f"Sent create_memories response")
+                print(f"Sent create_memories response", file=sys.stderr)
+                sys.stderr.flush()
+                
             elif method == "search_memories":
                 # Handle search_memories method
                 logger.info("Handling search_memories request")
@@ -202,6 +310,7 @@ def handle_mcp():
                 sys.stderr.flush()
                 
                 params = request.get("params", {})
+                trace_headers = mcp_trace_headers(params)
                 query = params.get("query", "")
                 k = params.get("k", 5)
                 
@@ -211,6 +320,7 @@ def handle_mcp():
                     
                     api_response = requests.get(
                         f"{server_url}/search",
+                        headers=trace_headers,
                         params={
                             "query": query,
                             "k": k
@@ -314,7 +424,7 @@ if __name__ == "__main__":
         server_process = start_server()
         
         # Wait for the server to start
-        if wait_for_server():
+        if wait_for_server(process=server_process):
             logger.info("Server started successfully, starting MCP handler")
             print("Server started successfully, starting MCP handler", file=sys.stderr)
             sys.stderr.flush()
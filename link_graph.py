@@ -0,0 +1,252 @@
+"""
+Adjacency index over MemoryNote.links.
+
+Memory IDs are mapped to dense integers, and edges are kept in compressed
+sparse row (CSR) form, forward (note -> linked note) and reverse (linked
+note -> note), so the neighbors of a node are one contiguous int32 slice.
+Edges added or removed since the last rebuild live in small per-node
+deltas, and the CSR arrays are rebuilt once the deltas grow large, so
+writes stay cheap and reads stay O(degree).
+"""
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+
+
+class _CSR:
+    """Immutable CSR adjacency: the neighbors of node u are indices[indptr[u]:indptr[u + 1]]"""
+
+    def __init__(self, nodes: int = 0, sources: Optional[np.ndarray] = None, targets: Optional[np.ndarray] = None):
+        if sources is None or len(sources) == 0:
+            self.indptr = np.zeros(nodes + 1, dtype=np.int64)
+            self.indices = np.zeros(0, dtype=np.int32)
+            return
+        order = np.argsort(sources, kind="stable")
+        self.indices = targets[order].astype(np.int32)
+        self.indptr = np.zeros(nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=nodes), out=self.indptr[1:])
+
+    def row(self, node: int) -> np.ndarray:
+        if node + 1 >= len(self.indptr):
+            return self.indices[:0]
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+
+class LinkGraph:
+    """Directed link graph with forward and reverse neighbor lookups"""
+
+    def __init__(self, rebuild_threshold: int = 4096):
+        """Initialize an empty graph.
+
+        Args:
+            rebuild_threshold: Minimum number of pending edge changes before the
+                CSR arrays are rebuilt (the threshold also scales with graph size)
+        """
+        self.rebuild_threshold = max(1, rebuild_threshold)
+        self._ids: List[str] = []  # Memory ID per integer node
+        self._nodes: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._forward = _CSR()
+        self._reverse = _CSR()
+        self._edges = 0  # Edges in the CSR arrays
+        self._added: Dict[int, List[int]] = {}  # Forward edges added since the last rebuild
+        self._reverse_added: Dict[int, List[int]] = {}
+        self._removed: Set[Tuple[int, int]] = set()  # CSR edges removed since the last rebuild
+        self._pending = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        """Number of live nodes"""
+        return int(self._alive[:len(self._ids)].sum())
+
+    def _node(self, memory_id: str) -> int:
+        """Integer node for a memory ID, allocated on first use and marked live"""
+        node = self._nodes.get(memory_id)
+        if node is None:
+            node = len(self._ids)
+            self._ids.append(memory_id)
+            self._nodes[memory_id] = node
+            if node >= len(self._alive):
+                alive = np.zeros(max(1024, 2 * len(self._alive)), dtype=bool)
+                alive[:len(self._alive)] = self._alive
+                self._alive = alive
+        self._alive[node] = True
+        return node
+
+    def _target_nodes(self, memory_id: str, linked_ids: Iterable[str]) -> List[int]:
+        """Nodes for the link targets of a note, skipping removed notes.
+
+        A removed note keeps its integer node, marked dead, so a stale link to
+        it is dropped here instead of bringing the node back to life. IDs not
+        seen before are allocated, since the note they name may be indexed
+        after the note linking to it.
+        """
+        targets = []
+        for linked_id in dict.fromkeys(linked_ids or []):
+            if not linked_id or linked_id == memory_id:
+                continue
+            node = self._nodes.get(linked_id)
+            if node is not None and not self._alive[node]:
+                continue
+            targets.append(self._node(linked_id))
+        return targets
+
+    def _forward_row(self, node: int) -> List[int]:
+        row = [int(target) for target in self._forward.row(node) if (node, int(target)) not in self._removed]
+        return row + self._added.get(node, [])
+
+    def _reverse_row(self, node: int) -> List[int]:
+        row = [int(source) for source in self._reverse.row(node) if (int(source), node) not in self._removed]
+        return row + self._reverse_added.get(node, [])
+
+    def _add_edge(self, source: int, target: int):
+        if (source, target) in self._removed:
+            # The edge is still in the CSR arrays; just undo its removal
+            self._removed.discard((source, target))
+        else:
+            self._added.setdefault(source, []).append(target)
+            self._reverse_added.setdefault(target, []).append(source)
+        self._pending += 1
+
+    def _remove_edge(self, source: int, target: int):
+        added = self._added.get(source)
+        if added and target in added:
+            added.remove(target)
+            self._reverse_added[target].remove(source)
+        else:
+            self._removed.add((source, target))
+        self._pending += 1
+
+    def set_links(self, memory_id: str, linked_ids: Iterable[str]):
+        """Replace the outgoing links of a note.
+
+        Args:
+            memory_id: Source memory ID
+            linked_ids: IDs the note links to; duplicates, self links and links
+                to removed notes are ignored
+        """
+        with self._lock:
+            source = self._node(memory_id)
+            targets = self._target_nodes(memory_id, linked_ids)
+            current = set(self._forward_row(source))
+            wanted = set(targets)
+            for target in current - wanted:
+                self._remove_edge(source, target)
+            for target in targets:
+                if target not in current:
+                    self._add_edge(source, target)
+            self._maybe_rebuild()
+
+    def add_links(self, memory_id: str, linked_ids: Iterable[str]):
+        """Add outgoing links to a note, keeping the existing ones"""
+        with self._lock:
+            source = self._node(memory_id)
+            current = set(self._forward_row(source))
+            for target in self._target_nodes(memory_id, linked_ids):
+                if target not in current:
+                    self._add_edge(source, target)
+                    current.add(target)
+            self._maybe_rebuild()
+
+    def remove(self, memory_id: str):
+        """Remove a note and every edge into or out of it.
+
+        Later links to the removed note are ignored until it is the source of
+        set_links() or add_links() again.
+        """
+        with self._lock:
+            node = self._nodes.get(memory_id)
+            if node is None:
+                return
+            for target in self._forward_row(node):
+                self._remove_edge(node, target)
+            for source in self._reverse_row(node):
+                self._remove_edge(source, node)
+            self._alive[node] = False
+            self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        if self._pending >= max(self.rebuild_threshold, self._edges // 4):
+            self.rebuild()
+
+    def rebuild(self):
+        """Fold pending edge changes into fresh CSR arrays"""
+        with self._lock:
+            nodes = len(self._ids)
+            indptr = self._forward.indptr
+            sources = np.repeat(np.arange(len(indptr) - 1, dtype=np.int64), np.diff(indptr))
+            targets = self._forward.indices.astype(np.int64)
+            if self._removed:
+                removed = np.array([source << 32 | target for source, target in self._removed], dtype=np.int64)
+                keep = ~np.isin(sources << 32 | targets, removed)
+                sources, targets = sources[keep], targets[keep]
+            if self._added:
+                added_sources = np.fromiter((source for source, row in self._added.items() for _ in row), dtype=np.int64)
+                added_targets = np.fromiter((target for row in self._added.values() for target in row), dtype=np.int64)
+                sources = np.concatenate([sources, added_sources])
+                targets = np.concatenate([targets, added_targets])
+            alive = self._alive[:nodes]
+            keep = alive[sources] & alive[targets]
+            sources, targets = sources[keep], targets[keep]
+            self._forward = _CSR(nodes, sources, targets)
+            self._reverse = _CSR(nodes, targets, sources)
+            self._edges = len(sources)
+            self._added, self._reverse_added, self._removed = {}, {}, set()
+            self._pending = 0
+
+    def neighbors(self, memory_id: str, direction: str = "both") -> List[str]:
+        """IDs linked from ("out"), to ("in") or either way ("both") from a note"""
+        with self._lock:
+            node = self._nodes.get(memory_id)
+            if node is None or not self._alive[node]:
+                return []
+            return [self._ids[other] for other in self._neighbor_nodes(node, direction)]
+
+    def _neighbor_nodes(self, node: int, direction: str) -> List[int]:
+        if direction not in ("out", "in", "both"):
+            raise ValueError("direction must be one of: 'out', 'in', 'both'")
+        rows = []
+        if direction in ("out", "both"):
+            rows.extend(self._forward_row(node))
+        if direction in ("in", "both"):
+            rows.extend(self._reverse_row(node))
+        return [other for other in dict.fromkeys(rows) if self._alive[other]]
+
+    def expand(self, memory_ids: Iterable[str], hops: int = 1, direction: str = "both") -> Dict[str, Tuple[int, str]]:
+        """Breadth-first expansion from seed notes.
+
+        Args:
+            memory_ids: Seed memory IDs
+            hops: Maximum number of links to follow
+            direction: "out", "in" or "both"
+
+        Returns:
+            Dict mapping each reached memory ID (seeds excluded) to (hop count,
+            seed it was first reached from), in breadth-first order
+        """
+        with self._lock:
+            seeds = [self._nodes[memory_id] for memory_id in memory_ids if memory_id in self._nodes]
+            origin = {node: node for node in seeds}
+            reached: Dict[int, int] = {}
+            frontier = seeds
+            for hop in range(1, max(0, hops) + 1):
+                next_frontier = []
+                for node in frontier:
+                    for other in self._neighbor_nodes(node, direction):
+                        if other in origin:
+                            continue
+                        origin[other] = origin[node]
+                        reached[other] = hop
+                        next_frontier.append(other)
+                frontier = next_frontier
+                if not frontier:
+                    break
+            return {self._ids[node]: (hop, self._ids[origin[node]]) for node, hop in reached.items()}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "nodes": len(self),
+                "edges": self._edges + sum(len(row) for row in self._added.values()) - len(self._removed),
+                "pending_changes": self._pending,
+            }
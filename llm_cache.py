@@ -0,0 +1,204 @@
+"""
+Persistent cache for LLM responses.
+
+Responses are stored in SQLite, keyed by (backend, model, prompt hash,
+temperature, response_format), so re-ingesting the same content, such as
+replaying a backlog after a crash, does not call the LLM again. Entries
+expire after a TTL, and the least recently used entries are evicted once
+the cache exceeds its size bound.
+
+Sampling at temperature > 0 is not deterministic, so those responses are
+only cached when `cache_nonzero_temperature` is enabled.
+"""
+import os
+import json
+import asyncio
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, Optional, Any
+
+from llm_controller import BaseLLMController
+
+logger = logging.getLogger(__name__)
+
+# Project cache directory
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(PROJECT_DIR, ".cache")
+DEFAULT_CACHE_PATH = os.path.join(CACHE_DIR, "llm_cache.sqlite")
+
+
+class LLMResponseCache:
+    """SQLite-backed response cache with TTL and LRU eviction"""
+
+    def __init__(self,
+                 path: str = DEFAULT_CACHE_PATH,
+                 ttl_seconds: Optional[float] = 7 * 24 * 3600,
+                 max_entries: int = 100000,
+                 cache_nonzero_temperature: bool = False):
+        """Open (or create) the cache database.
+
+        Args:
+            path: SQLite database file
+            ttl_seconds: Age after which an entry is ignored and removed, or None to never expire
+            max_entries: Number of entries kept; least recently used ones are evicted beyond it
+            cache_nonzero_temperature: Whether to cache responses sampled at temperature > 0
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.cache_nonzero_temperature = cache_nonzero_temperature
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(backend: str, model: str, prompt: str, temperature: float,
+                 response_format: Optional[dict]) -> str:
+        """Cache key for one request"""
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        fields = [backend, model, prompt_hash, float(temperature), response_format]
+        return hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def cacheable(self, temperature: float) -> bool:
+        """Whether responses sampled at `temperature` may be cached"""
+        return temperature == 0 or self.cache_nonzero_temperature
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for `key`, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._count -= 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """Store a response, evicting the least recently used entries if over capacity"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO responses (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, response, now, now)
+            )
+            if cursor.rowcount == 0:
+                self._conn.execute(
+                    "UPDATE responses SET response = ?, created = ?, accessed = ? WHERE key = ?",
+                    (response, now, now, key)
+                )
+            else:
+                self._count += 1
+            if self._count > self.max_entries:
+                # Evict in chunks so eviction cost is amortized across inserts
+                excess = self._count - self.max_entries + max(1, self.max_entries // 100)
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed LIMIT ?)", (excess,)
+                )
+                self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                self.evictions += excess
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._count = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Hit, miss and eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": self._count,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachingLLMController(BaseLLMController):
+    """Wraps an LLM controller and serves repeated requests from an LLMResponseCache"""
+
+    def __init__(self, llm: BaseLLMController, cache: LLMResponseCache, backend: str, model: str):
+        """Initialize the wrapper.
+
+        Args:
+            llm: Controller that performs the actual requests
+            cache: Response cache
+            backend: Backend name, part of the cache key
+            model: Model name, part of the cache key
+        """
+        self.llm = llm
+        self.cache = cache
+        self.backend = backend
+        self.model = model
+        self.max_concurrency = getattr(llm, "max_concurrency", self.max_concurrency)
+
+    def _key(self, prompt: str, response_format: Optional[dict], temperature: float) -> Optional[str]:
+        if not self.cache.cacheable(temperature):
+            return None
+        return self.cache.make_key(self.backend, self.model, prompt, temperature, response_format)
+
+    def _store(self, key: Optional[str], response: Any):
+        # Empty objects are what the controllers return on errors; never cache them
+        if key is not None and isinstance(response, str) and response.strip() not in ("", "{}"):
+            self.cache.put(key, response)
+
+    def get_completion(self, prompt: str, response_format: dict = None, temperature: float = 0.7) -> str:
+        key = self._key(prompt, response_format, temperature)
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            return cached
+        response = self.llm.get_completion(prompt, response_format, temperature)
+        self._store(key, response)
+        return response
+
+    def get_completion_with_timeout(self, prompt: str, response_format: dict = None,
+                                    temperature: float = 0.7, timeout: Optional[float] = None) -> str:
+        key = self._key(prompt, response_format, temperature)
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            return cached
+        response = self.llm.get_completion_with_timeout(prompt, response_format, temperature, timeout)
+        self._store(key, response)
+        return response
+
+    async def aget_completion(self, prompt: str, response_format: dict = None,
+                              temperature: float = 0.7, timeout: Optional[float] = None) -> str:
+        """Async completion; the SQLite lookup and write run on a worker thread, off the event loop"""
+        key = self._key(prompt, response_format, temperature)
+        cached = await asyncio.to_thread(self.cache.get, key) if key is not None else None
+        if cached is not None:
+            return cached
+        response = await self.llm.aget_completion(prompt, response_format, temperature, timeout)
+        if key is not None:
+            await asyncio.to_thread(self._store, key, response)
+        return response
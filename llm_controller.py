@@ -1,81 +1,275 @@
 from typing import Dict, Optional, Literal, Any
 import os
 import json
+import time
+import asyncio
+import weakref
+import threading
 from abc import ABC, abstractmethod
-from litellm import completion
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from litellm import completion, acompletion
+from metrics import time_llm_request
+
+# Bounded pool for controllers that only implement the blocking API; replaces
+# the thread-per-call pattern, so timed-out calls cannot pile up unbounded
+_blocking_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-blocking")
 
 class BaseLLMController(ABC):
+    # Maximum number of in-flight async requests per event loop
+    max_concurrency: int = 8
+    
     @abstractmethod
     def get_completion(self, prompt: str) -> str:
         """Get completion from LLM"""
         pass
+    
+    def get_completion_with_timeout(self, prompt: str, response_format: dict = None,
+                                    temperature: float = 0.7, timeout: Optional[float] = None) -> str:
+        """Get a completion, giving up after `timeout` seconds.
+        
+        Controllers with a native request timeout override this so the request
+        itself is cancelled. The default runs get_completion on a small shared
+        pool and stops waiting for it.
+        
+        Raises:
+            TimeoutError: If no response arrived within `timeout` seconds
+        """
+        future = _blocking_executor.submit(self.get_completion, prompt, response_format, temperature)
+        try:
+            with time_llm_request():
+                return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise TimeoutError(f"LLM did not respond within {timeout} seconds")
+    
+    async def aget_completion(self, prompt: str, response_format: dict = None,
+                              temperature: float = 0.7, timeout: Optional[float] = None) -> str:
+        """Async completion. The default awaits the blocking call on the shared pool.
+        
+        Raises:
+            asyncio.TimeoutError: If no response arrived within `timeout` seconds
+        """
+        async with self._semaphore():
+            loop = asyncio.get_running_loop()
+            call = loop.run_in_executor(_blocking_executor, self.get_completion, prompt, response_format, temperature)
+            with time_llm_request():
+                return await asyncio.wait_for(call, timeout)
+    
+    def _semaphore(self) -> asyncio.Semaphore:
+        """Semaphore capping in-flight async requests on the running event loop"""
+        semaphores = self.__dict__.setdefault("_semaphores", weakref.WeakKeyDictionary())
+        loop = asyncio.get_running_loop()
+        if loop not in semaphores:
+            semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphores[loop]
+    
+    def _blocking_slots(self) -> threading.BoundedSemaphore:
+        """Semaphore capping in-flight blocking requests across threads"""
+        return self.__dict__.setdefault("_slots", threading.BoundedSemaphore(self.max_concurrency))
+    
+    def _call_with_slot(self, call, timeout: Optional[float]):
+        """Run and time `call(deadline)` holding one of the `max_concurrency` blocking request slots
+        
+        The deadline is a time.monotonic() value `timeout` seconds from now,
+        or None without a timeout, so waiting for the slot counts against it.
+        Only the call itself is recorded as request latency.
+        
+        Raises:
+            TimeoutError: If no slot freed up within `timeout` seconds
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        slots = self._blocking_slots()
+        if not slots.acquire(timeout=-1 if timeout is None else timeout):
+            raise TimeoutError(f"No LLM request slot freed up within {timeout} seconds")
+        try:
+            with time_llm_request():
+                return call(deadline)
+        finally:
+            slots.release()
+    
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        """Seconds left before `deadline` (a time.monotonic() value), or None without one
+        
+        Raises:
+            TimeoutError: If the deadline has passed
+        """
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("LLM did not respond before the deadline")
+        return remaining
 
 class OpenAIController(BaseLLMController):
-    def __init__(self, model: str = "gpt-4", api_key: Optional[str] = None, api_base: Optional[str] = None):
+    def __init__(self, model: str = "gpt-4", api_key: Optional[str] = None, api_base: Optional[str] = None,
+                 max_concurrency: int = 8):
         try:
+            import httpx
             from openai import OpenAI
             self.model = model
+            self.max_concurrency = max_concurrency
             if api_key is None:
                 api_key = os.getenv('OPENAI_API_KEY')
             if api_key is None:
                 raise ValueError("OpenAI API key not found. Set OPENAI_API_KEY environment variable.")
             
-            # Initialize with custom base URL if provided
-            client_kwargs = {"api_key": api_key}
+            # Initialize with custom base URL if provided. The client's own
+            # retries are disabled so a timeout bounds the whole call
+            client_kwargs = {"api_key": api_key, "max_retries": 0}
             if api_base and api_base.strip():
                 client_kwargs["base_url"] = api_base
                 print(f"Using custom API base URL: {api_base}")
                 
-            self.client = OpenAI(**client_kwargs)
+            # Keep-alive pool sized to the concurrency cap
+            self._limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+            self._client_kwargs = client_kwargs
+            self.client = OpenAI(**client_kwargs, http_client=httpx.Client(limits=self._limits))
+            # AsyncOpenAI clients are bound to the event loop they were created on
+            self._async_clients = weakref.WeakKeyDictionary()
             # Store the API base for future reference
             self.using_custom_api = bool(api_base and api_base.strip())
         except ImportError:
             raise ImportError("OpenAI package not found. Install it with: pip install openai")
     
-    def get_completion(self, prompt: str, response_format: dict, temperature: float = 0.7) -> str:
+    def _request_kwargs(self, prompt: str, response_format: dict, temperature: float) -> Dict[str, Any]:
+        """Chat completion arguments, with JSON-only instructions for the model"""
+        # For custom API endpoints, we might need to use a different approach
+        # Some providers don't fully support response_format, so add explicit instructions
+        system_message = "You must respond with a JSON object."
+        if self.using_custom_api:
+            system_message += " Return only the raw JSON with no Markdown formatting, no code blocks, and no backticks."
+        return dict(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": prompt}
+            ],
+            response_format=response_format,
+            temperature=temperature,
+            max_tokens=1000
+        )
+    
+    def _retry_kwargs(self, prompt: str, temperature: float) -> Dict[str, Any]:
+        """Chat completion arguments without response_format, for providers that reject it"""
+        return dict(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You must respond with a raw JSON object. No Markdown formatting, no code blocks, no backticks."},
+                {"role": "user", "content": prompt + "\n\nIMPORTANT: Return only the raw JSON with no Markdown formatting or code blocks."}
+            ],
+            temperature=temperature,
+            max_tokens=1000
+        )
+    
+    @classmethod
+    def _timeout_kwargs(cls, deadline: Optional[float]) -> Dict[str, Any]:
+        """Timeout of the next request; omitted so the client default applies without a deadline"""
+        remaining = cls._remaining(deadline)
+        return {} if remaining is None else {"timeout": remaining}
+    
+    def get_completion(self, prompt: str, response_format: dict, temperature: float = 0.7,
+                       timeout: Optional[float] = None) -> str:
+        """Blocking completion, capped at `max_concurrency` in-flight requests.
+        
+        `timeout` bounds the whole call: waiting for a free slot, the request
+        and the retry without response_format.
+        
+        Raises:
+            TimeoutError: If no slot freed up within `timeout` seconds
+        """
+        return self._call_with_slot(
+            lambda deadline: self._complete(prompt, response_format, temperature, deadline), timeout
+        )
+    
+    def _complete(self, prompt: str, response_format: dict, temperature: float,
+                  deadline: Optional[float]) -> str:
+        """One completion, retried without response_format on custom endpoints.
+        
+        Raises:
+            TimeoutError: If a request timed out; a timeout is never retried,
+                since the deadline it was given is spent
+        """
+        from openai import APITimeoutError
         try:
-            # For custom API endpoints, we might need to use a different approach
-            # Some providers don't fully support response_format, so add explicit instructions
-            system_message = "You must respond with a JSON object."
-            if self.using_custom_api:
-                system_message += " Return only the raw JSON with no Markdown formatting, no code blocks, and no backticks."
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format=response_format,
-                temperature=temperature,
-                max_tokens=1000
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            # If response_format causes issues with some providers, try without it
-            if self.using_custom_api:
+            try:
+                response = self.client.chat.completions.create(
+                    **self._request_kwargs(prompt, response_format, temperature), **self._timeout_kwargs(deadline)
+                )
+                return response.choices[0].message.content
+            except APITimeoutError:
+                raise
+            except Exception as e:
+                # If response_format causes issues with some providers, try without it
+                if not self.using_custom_api:
+                    raise
                 print(f"Error with response_format: {e}. Trying without it...")
                 try:
                     response = self.client.chat.completions.create(
-                        model=self.model,
-                        messages=[
-                            {"role": "system", "content": "You must respond with a raw JSON object. No Markdown formatting, no code blocks, no backticks."},
-                            {"role": "user", "content": prompt + "\n\nIMPORTANT: Return only the raw JSON with no Markdown formatting or code blocks."}
-                        ],
-                        temperature=temperature,
-                        max_tokens=1000
+                        **self._retry_kwargs(prompt, temperature), **self._timeout_kwargs(deadline)
                     )
                     return response.choices[0].message.content
                 except Exception as inner_e:
                     print(f"Also failed without response_format: {inner_e}")
                     raise
-            else:
-                raise
+        except APITimeoutError as e:
+            raise TimeoutError(f"OpenAI request timed out: {e}") from e
+    
+    def get_completion_with_timeout(self, prompt: str, response_format: dict = None,
+                                    temperature: float = 0.7, timeout: Optional[float] = None) -> str:
+        # The HTTP request itself times out; no extra thread is needed
+        return self.get_completion(prompt, response_format, temperature, timeout=timeout)
+    
+    def _async_client(self):
+        """AsyncOpenAI client with a keep-alive pool for the running event loop"""
+        import httpx
+        from openai import AsyncOpenAI
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(**self._client_kwargs, http_client=httpx.AsyncClient(limits=self._limits))
+            self._async_clients[loop] = client
+        return client
+    
+    async def aget_completion(self, prompt: str, response_format: dict = None,
+                              temperature: float = 0.7, timeout: Optional[float] = None) -> str:
+        """Async completion over a pooled connection.
+        
+        At most `max_concurrency` requests are in flight per event loop.
+        `timeout` bounds the whole call, including the wait for a slot and the
+        retry without response_format. On timeout the request task is
+        cancelled, which closes its connection.
+        """
+        return await asyncio.wait_for(self._acomplete(prompt, response_format, temperature), timeout)
+    
+    async def _acomplete(self, prompt: str, response_format: dict, temperature: float) -> str:
+        from openai import APITimeoutError
+        client = self._async_client()
+        async with self._semaphore():
+            with time_llm_request():
+                try:
+                    try:
+                        response = await client.chat.completions.create(
+                            **self._request_kwargs(prompt, response_format, temperature)
+                        )
+                        return response.choices[0].message.content
+                    except APITimeoutError:
+                        raise
+                    except Exception as e:
+                        # If response_format causes issues with some providers, try without it
+                        if not self.using_custom_api:
+                            raise
+                        print(f"Error with response_format: {e}. Trying without it...")
+                        response = await client.chat.completions.create(**self._retry_kwargs(prompt, temperature))
+                        return response.choices[0].message.content
+                except APITimeoutError as e:
+                    raise TimeoutError(f"OpenAI request timed out: {e}") from e
 
 class OllamaController(BaseLLMController):
-    def __init__(self, model: str = "llama2"):
+    def __init__(self, model: str = "llama2", max_concurrency: int = 8):
         from ollama import chat
         self.model = model
+        self.max_concurrency = max_concurrency
     
     def _generate_empty_value(self, schema_type: str, schema_items: dict = None) -> Any:
         if schema_type == "array":
@@ -120,19 +314,28 @@ class OllamaController(BaseLLMController):
         from memory_system import strip_markdown_code_fences
         return strip_markdown_code_fences(response)
 
-    def get_completion(self, prompt: str, response_format: dict, temperature: float = 0.7) -> str:
+    def _request_kwargs(self, prompt: str, response_format: dict) -> Dict[str, Any]:
+        """litellm arguments, with explicit instructions to avoid Markdown"""
+        enhanced_prompt = prompt + "\n\nRETURN RAW JSON ONLY. NO MARKDOWN CODE BLOCKS OR BACKTICKS."
+        return dict(
+            model="ollama_chat/{}".format(self.model),
+            messages=[
+                {"role": "system", "content": "You must respond with a JSON object. Do not use Markdown formatting, code blocks, or backticks in your response."},
+                {"role": "user", "content": enhanced_prompt}
+            ],
+            response_format=response_format,
+        )
+
+    def get_completion(self, prompt: str, response_format: dict, temperature: float = 0.7,
+                       timeout: Optional[float] = None) -> str:
+        """Blocking completion, capped at `max_concurrency` in-flight requests"""
+        return self._call_with_slot(
+            lambda deadline: self._complete(prompt, response_format, self._remaining(deadline)), timeout
+        )
+    
+    def _complete(self, prompt: str, response_format: dict, timeout: Optional[float]) -> str:
         try:
-            # Add explicit instructions to avoid Markdown
-            enhanced_prompt = prompt + "\n\nRETURN RAW JSON ONLY. NO MARKDOWN CODE BLOCKS OR BACKTICKS."
-            
-            response = completion(
-                model="ollama_chat/{}".format(self.model),
-                messages=[
-                    {"role": "system", "content": "You must respond with a JSON object. Do not use Markdown formatting, code blocks, or backticks in your response."},
-                    {"role": "user", "content": enhanced_prompt}
-                ],
-                response_format=response_format,
-            )
+            response = completion(**self._request_kwargs(prompt, response_format), timeout=timeout)
             
             # Clean response to remove any Markdown or code fences
             raw_response = response.choices[0].message.content
@@ -143,19 +346,54 @@ class OllamaController(BaseLLMController):
             empty_response = self._generate_empty_response(response_format)
             return json.dumps(empty_response)
 
+    def get_completion_with_timeout(self, prompt: str, response_format: dict = None,
+                                    temperature: float = 0.7, timeout: Optional[float] = None) -> str:
+        # litellm enforces the timeout on the request itself
+        return self.get_completion(prompt, response_format, temperature, timeout=timeout)
+
+    async def aget_completion(self, prompt: str, response_format: dict = None,
+                              temperature: float = 0.7, timeout: Optional[float] = None) -> str:
+        """Async completion through litellm, capped at `max_concurrency` in-flight requests"""
+        async with self._semaphore():
+            try:
+                with time_llm_request():
+                    response = await asyncio.wait_for(
+                        acompletion(**self._request_kwargs(prompt, response_format), timeout=timeout),
+                        timeout
+                    )
+                return self._clean_response(response.choices[0].message.content)
+            except asyncio.TimeoutError:
+                raise
+            except Exception as e:
+                print(f"Error in OllamaController: {e}")
+                return json.dumps(self._generate_empty_response(response_format))
+
 class LLMController:
     """LLM-based controller for memory metadata generation"""
     def __init__(self, 
                  backend: Literal["openai", "ollama"] = "openai",
                  model: str = "gpt-4", 
                  api_key: Optional[str] = None,
-                 api_base: Optional[str] = None):
+                 api_base: Optional[str] = None,
+                 max_concurrency: int = 8,
+                 cache=None):
         if backend == "openai":
-            self.llm = OpenAIController(model, api_key, api_base)
+            self.llm = OpenAIController(model, api_key, api_base, max_concurrency=max_concurrency)
         elif backend == "ollama":
-            self.llm = OllamaController(model)
+            self.llm = OllamaController(model, max_concurrency=max_concurrency)
         else:
             raise ValueError("Backend must be one of: 'openai', 'ollama'")
+        if cache is not None:
+            # Import here to avoid circular imports
+            from llm_cache import CachingLLMController
+            self.llm = CachingLLMController(self.llm, cache, backend, model)
             
-    def get_completion(self, prompt: str, response_format: dict = None, temperature: float = 0.7) -> str:
-        return self.llm.get_completion(prompt, response_format, temperature)
+    def get_completion(self, prompt: str, response_format: dict = None, temperature: float = 0.7,
+                       timeout: Optional[float] = None) -> str:
+        if timeout is None:
+            return self.llm.get_completion(prompt, response_format, temperature)
+        return self.llm.get_completion_with_timeout(prompt, response_format, temperature, timeout)
+    
+    async def aget_completion(self, prompt: str, response_format: dict = None, temperature: float = 0.7,
+                              timeout: Optional[float] = None) -> str:
+        return await self.llm.aget_completion(prompt, response_format, temperature, timeout)
@@ -0,0 +1,332 @@
+"""
+Durable append-only storage for memory notes.
+
+Every mutation of the note set (create, update, delete, evolution) is written
+as one JSON line to an append-only log and flushed to disk before the call
+returns. Every ``snapshot_interval`` records the log is rotated aside and the
+full note set is written to a compacted snapshot, after which the rotated log
+is deleted, so a restart only loads the snapshot and replays the records
+written after it.
+"""
+import os
+import re
+import json
+import logging
+import threading
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Project cache directory
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(PROJECT_DIR, ".cache")
+DEFAULT_STORE_DIR = os.path.join(CACHE_DIR, "memory_store")
+
+
+class CorruptLogError(RuntimeError):
+    """Raised when a log record other than the last one cannot be parsed"""
+
+
+def _fsync_directory(directory: str):
+    """Flush directory metadata so renames and new files survive a crash"""
+    if not hasattr(os, "O_DIRECTORY"):
+        # Windows does not support opening directories
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class MemoryStore:
+    """Log-structured on-disk store for memory notes.
+
+    The store keeps these files in its directory:
+    - ``notes.log``: one JSON record per line, each carrying a sequence number
+    - ``notes.log.<seq>``: a log rotated aside when a snapshot up to ``seq``
+      was started, deleted once that snapshot is in place
+    - ``snapshot.jsonl``: a header line with the last sequence number it covers,
+      followed by one note per line
+
+    Rotated logs are replayed before ``notes.log``, and records whose sequence
+    number is already covered by the snapshot are skipped, so a crash while a
+    snapshot is written loses nothing and never applies a record twice.
+    """
+
+    LOG_FILE = "notes.log"
+    SNAPSHOT_FILE = "snapshot.jsonl"
+
+    def __init__(self,
+                 directory: str = DEFAULT_STORE_DIR,
+                 snapshot_interval: int = 10000,
+                 fsync: bool = True):
+        """Initialize the store.
+
+        Args:
+            directory: Directory holding the log and snapshot files
+            snapshot_interval: Number of log records after which a snapshot is due
+            fsync: Whether to fsync every append (required for crash durability)
+        """
+        self.directory = directory
+        self.snapshot_interval = max(1, snapshot_interval)
+        self.fsync = fsync
+        self.log_path = os.path.join(directory, self.LOG_FILE)
+        self.snapshot_path = os.path.join(directory, self.SNAPSHOT_FILE)
+
+        self._lock = threading.RLock()
+        self._log_file = None
+        self._seq = 0
+        self._records_since_snapshot = 0
+        # Background thread writing the current snapshot, if any
+        self._snapshot_thread = None
+
+        os.makedirs(directory, exist_ok=True)
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Load the snapshot, replay the log tail and open the log for appending.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Note dictionaries keyed by memory ID
+
+        Raises:
+            CorruptLogError: If a record before the last one in the log cannot
+                be parsed. Replaying past it would silently drop a write that
+                was acknowledged, so the store refuses to open.
+        """
+        with self._lock:
+            notes = {}
+            snapshot_seq = 0
+
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                    header = json.loads(f.readline())
+                    snapshot_seq = header.get("seq", 0)
+                    for line in f:
+                        note = json.loads(line)
+                        notes[note["id"]] = note
+
+            self._seq = snapshot_seq
+            self._records_since_snapshot = 0
+
+            # Logs rotated for a snapshot that never completed come before notes.log
+            for rotated_seq, path in self._rotated_logs():
+                if rotated_seq <= snapshot_seq:
+                    os.remove(path)
+                    continue
+                self._replay(path, notes, snapshot_seq, allow_torn_tail=False)
+
+            if os.path.exists(self.log_path):
+                valid_length = self._replay(self.log_path, notes, snapshot_seq, allow_torn_tail=True)
+                # Drop a torn last record before appending
+                if valid_length != os.path.getsize(self.log_path):
+                    with open(self.log_path, "r+b") as f:
+                        f.truncate(valid_length)
+
+            self._log_file = open(self.log_path, "a", encoding="utf-8")
+            logger.info(f"Loaded {len(notes)} memories from {self.directory} "
+                        f"(replayed {self._records_since_snapshot} log records)")
+            return notes
+
+    def _rotated_logs(self) -> List[Tuple[int, str]]:
+        """Rotated logs in the store directory as (seq, path), oldest first"""
+        pattern = re.compile(re.escape(self.LOG_FILE) + r"\.(\d+)$")
+        rotated = []
+        for name in os.listdir(self.directory):
+            match = pattern.match(name)
+            if match:
+                rotated.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return sorted(rotated)
+
+    def _replay(self, path: str, notes: Dict[str, Dict[str, Any]], snapshot_seq: int,
+                allow_torn_tail: bool) -> int:
+        """Apply the records of one log file that the snapshot does not cover.
+
+        Args:
+            path: Log file to replay
+            notes: Note dictionaries to apply the records to
+            snapshot_seq: Sequence number covered by the loaded snapshot
+            allow_torn_tail: Whether an unparseable last record is discarded
+                (only the active log can end in a torn write)
+
+        Returns:
+            int: Length in bytes of the valid prefix of the file
+        """
+        with open(path, "rb") as f:
+            lines = f.readlines()
+        valid_length = 0
+        for index, raw_line in enumerate(lines):
+            try:
+                if not raw_line.endswith(b"\n"):
+                    raise ValueError("incomplete record")
+                record = json.loads(raw_line)
+                seq = record["seq"]
+            except (ValueError, KeyError, TypeError) as e:
+                if allow_torn_tail and index == len(lines) - 1:
+                    # A torn write from a crash can only affect the last
+                    # record, which was never acknowledged to a caller
+                    logger.warning(f"Discarding incomplete record at offset {valid_length} in {path}")
+                    break
+                raise CorruptLogError(f"Corrupt record at offset {valid_length} in {path}: {e}") from e
+            valid_length += len(raw_line)
+            if seq <= snapshot_seq:
+                continue
+            self._apply(notes, record)
+            self._seq = seq
+            self._records_since_snapshot += 1
+        return valid_length
+
+    @staticmethod
+    def _apply(notes: Dict[str, Dict[str, Any]], record: Dict[str, Any]):
+        """Apply a single log record to a note dictionary"""
+        op = record.get("op")
+        if op in ("create", "update"):
+            notes[record["note"]["id"]] = record["note"]
+        elif op == "evolve":
+            for note in record.get("notes", []):
+                notes[note["id"]] = note
+        elif op == "delete":
+            notes.pop(record["id"], None)
+        else:
+            logger.warning(f"Skipping unknown log record type: {op}")
+
+    def _write_records(self, records: List[Dict[str, Any]]):
+        """Append records to the log and make them durable"""
+        with self._lock:
+            if self._log_file is None:
+                raise RuntimeError("MemoryStore.load() must be called before writing")
+            lines = []
+            for record in records:
+                self._seq += 1
+                record["seq"] = self._seq
+                lines.append(json.dumps(record, ensure_ascii=False))
+            self._log_file.write("\n".join(lines) + "\n")
+            self._log_file.flush()
+            if self.fsync:
+                os.fsync(self._log_file.fileno())
+            self._records_since_snapshot += len(records)
+
+    def record_create(self, note: Dict[str, Any]):
+        """Append a record for a newly created note"""
+        self._write_records([{"op": "create", "note": note}])
+
+    def record_create_many(self, notes: List[Dict[str, Any]]):
+        """Append one create record per note with a single flush and fsync"""
+        if notes:
+            self._write_records([{"op": "create", "note": note} for note in notes])
+
+    def record_update(self, note: Dict[str, Any]):
+        """Append a record with the full state of an updated note"""
+        self._write_records([{"op": "update", "note": note}])
+
+    def record_update_many(self, notes: List[Dict[str, Any]]):
+        """Append one update record per note with a single flush and fsync"""
+        if notes:
+            self._write_records([{"op": "update", "note": note} for note in notes])
+
+    def record_delete(self, memory_id: str):
+        """Append a record for a deleted note"""
+        self._write_records([{"op": "delete", "id": memory_id}])
+
+    def record_evolution(self, notes: List[Dict[str, Any]]):
+        """Append a single record with every note changed by one evolution step"""
+        if notes:
+            self._write_records([{"op": "evolve", "notes": notes}])
+
+    def snapshot_due(self) -> bool:
+        """Whether enough records have accumulated to warrant a snapshot.
+
+        Always False while a background snapshot is still being written.
+        """
+        if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+            return False
+        return self._records_since_snapshot >= self.snapshot_interval
+
+    def snapshot(self, notes: Iterable[Dict[str, Any]], background: bool = False,
+                 after_write: Optional[Callable[[], None]] = None):
+        """Rotate the log aside and write a compacted snapshot of all notes.
+
+        Only the rotation happens inline: ``notes.log`` is renamed to
+        ``notes.log.<seq>`` and a fresh log is opened, so appends continue
+        right away. The snapshot is written to a temporary file, fsynced and
+        atomically renamed into place, and only then is the rotated log
+        deleted. A crash at any point leaves either the old snapshot plus the
+        rotated log, or the new snapshot.
+
+        The caller must keep other writers from appending records until this
+        returns, and `notes` must describe the note set as of the latest
+        record; it is consumed after this returns when `background` is True.
+        AgenticMemorySystem calls this under its commit lock with a list of
+        the (copy-on-write) notes at that point.
+
+        Args:
+            notes: Dictionaries for every live note, as of the latest record
+            background: If True, write the snapshot on a background thread
+            after_write: Optional callable run on the same thread once the
+                snapshot is in place, e.g. to save derived indexes next to it
+        """
+        with self._lock:
+            if self._snapshot_thread is not None:
+                self._snapshot_thread.join()
+                self._snapshot_thread = None
+            seq = self._seq
+            rotated_path = f"{self.log_path}.{seq}"
+            if self._log_file is not None:
+                self._log_file.close()
+            os.replace(self.log_path, rotated_path)
+            self._log_file = open(self.log_path, "a", encoding="utf-8")
+            _fsync_directory(self.directory)
+            self._records_since_snapshot = 0
+
+        if background:
+            self._snapshot_thread = threading.Thread(target=self._write_snapshot, args=(seq, notes, after_write),
+                                                     name="memory-snapshot", daemon=True)
+            self._snapshot_thread.start()
+        else:
+            self._write_snapshot(seq, notes, after_write)
+
+    def _write_snapshot(self, seq: int, notes: Iterable[Dict[str, Any]],
+                        after_write: Optional[Callable[[], None]] = None):
+        """Write the snapshot covering `seq` and delete the logs it covers"""
+        tmp_path = self.snapshot_path + ".tmp"
+        count = 0
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"seq": seq}) + "\n")
+                for note in notes:
+                    f.write(json.dumps(note, ensure_ascii=False) + "\n")
+                    count += 1
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            _fsync_directory(self.directory)
+
+            # Every rotated log up to seq is now covered by the snapshot
+            for rotated_seq, path in self._rotated_logs():
+                if rotated_seq <= seq:
+                    os.remove(path)
+            _fsync_directory(self.directory)
+        except Exception as e:
+            # The rotated log is kept and replayed on load; the next snapshot covers it
+            logger.error(f"Error writing memory snapshot at seq {seq}: {e}")
+            return
+        logger.info(f"Wrote memory snapshot with {count} notes at seq {seq}")
+        if after_write is not None:
+            try:
+                after_write()
+            except Exception as e:
+                logger.error(f"Error after writing memory snapshot at seq {seq}: {e}")
+
+    def wait_for_snapshot(self):
+        """Block until a snapshot being written in the background is in place"""
+        thread = self._snapshot_thread
+        if thread is not None:
+            thread.join()
+
+    def close(self):
+        """Finish a background snapshot and close the log file"""
+        self.wait_for_snapshot()
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
@@ -68,20 +68,72 @@ def strip_markdown_code_fences(text):
     return text
 
 import keyword
-from typing import List, Dict, Optional, Any
+from typing import Callable, List, Dict, Optional, Any, Tuple
 import uuid
 from datetime import datetime
 from llm_controller import LLMController
-from retrievers import SimpleEmbeddingRetriever, ChromaRetriever
+from retrievers import SimpleEmbeddingRetriever, ChromaRetriever, BM25Retriever
+from embedding_service import get_embedding_service
+from memory_store import MemoryStore
+from evolution_queue import EvolutionQueue, StripedLock
+from rank_fusion import fuse, FUSION_METHODS
+from metadata_index import MetadataIndex, TimeBound, parse_time_bound
+from link_graph import LinkGraph
+from vocabulary import Vocabulary
+from metrics import (timed_operation, llm_purpose, SEARCH_STAGE_SECONDS, LLM_ERRORS, EVOLUTIONS,
+                     CONSOLIDATED_NOTES)
+from tracing import span, traced, annotate, continue_trace
+import functools
 import json
 import logging
 import os
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 import re
 
 logger = logging.getLogger(__name__)
 
+# Seconds to wait for the LLM before falling back (content analysis) or skipping (evolution)
+ANALYSIS_TIMEOUT = 10
+EVOLUTION_TIMEOUT = 60
+
+# Candidates each retriever contributes to fusion, as a multiple of k
+SEARCH_CANDIDATE_FACTOR = 4
+
+# Score multiplier per link followed when search expands hits to linked notes
+LINK_SCORE_DECAY = 0.5
+
+# File in persist_dir holding the SimpleEmbeddingRetriever vectors, so a restart
+# only re-encodes notes whose index document changed since it was written
+EMBEDDINGS_FILE = "embeddings.npz"
+
+# Note fields that feed each index; update_many() only refreshes the indexes whose fields changed
+_EMBEDDED_FIELDS = frozenset({"content", "context", "keywords", "tags"})  # _index_document()
+_CHROMA_METADATA_FIELDS = frozenset({"context", "keywords", "tags", "category", "timestamp"})  # _chroma_metadata()
+_METADATA_INDEX_FIELDS = frozenset({"tags", "category", "timestamp"})  # _index_metadata()
+
+# Shared vocabularies for note fields: terms (keywords, tags, categories) and memory
+# IDs (link targets). Vocabularies never shrink, so only low-cardinality fields are
+# interned; free text such as the context stays a plain string per note
+_TERMS = Vocabulary()
+# Holds every distinct ID linked to since the process started, including IDs of
+# notes deleted since: about 60 bytes per ID, bounded by the notes ever linked to.
+# A restart rebuilds it from the links of the stored notes only
+_IDS = Vocabulary()
+
+
+def _encode_time(value: Optional[str]):
+    """Store YYYYMMDDHHMM timestamps as integers; keep any other format as given"""
+    if isinstance(value, str) and len(value) == 12 and value.isdigit():
+        return int(value)
+    return value
+
+
+def _decode_time(value) -> str:
+    return f"{value:012d}" if isinstance(value, int) else value
+
+
 class MemoryNote:
     """A memory note that represents a single unit of information in the memory system.
     
@@ -92,13 +144,25 @@ class MemoryNote:
     - Relationship data (links to other memories)
     - Usage statistics (retrieval count)
     - Evolution tracking (history of changes)
+    
+    Notes are stored compactly for multi-million-note stores: the class uses
+    __slots__ instead of a per-instance __dict__, keywords, tags and category
+    are interned in a shared vocabulary and kept as integer IDs,
+    links are integer IDs into a vocabulary of memory IDs, and timestamps are
+    integers. The attributes assign as before (lists of strings, YYYYMMDDHHMM
+    strings); keywords, tags, links and evolution_history read back as tuples,
+    so changes must be assigned (note.tags = [...]) and an in-place edit
+    (note.tags.append(...)) raises instead of being silently lost.
     """
     
+    __slots__ = ("id", "content", "_keywords", "_links", "retrieval_count", "_timestamp",
+                 "_last_accessed", "_context", "_evolution_history", "_category", "_tags")
+    
     def __init__(self, 
                  content: str,
                  id: Optional[str] = None,
                  keywords: Optional[List[str]] = None,
-                 links: Optional[Dict] = None,
+                 links: Optional[List[str]] = None,
                  retrieval_count: Optional[int] = None,
                  timestamp: Optional[str] = None,
                  last_accessed: Optional[str] = None,
@@ -112,7 +176,7 @@ class MemoryNote:
             content (str): The main text content of the memory
             id (Optional[str]): Unique identifier for the memory. If None, a UUID will be generated
             keywords (Optional[List[str]]): Key terms extracted from the content
-            links (Optional[Dict]): References to related memories
+            links (Optional[List[str]]): IDs of related memories
             retrieval_count (Optional[int]): Number of times this memory has been accessed
             timestamp (Optional[str]): Creation time in format YYYYMMDDHHMM
             last_accessed (Optional[str]): Last access time in format YYYYMMDDHHMM
@@ -140,6 +204,113 @@ class MemoryNote:
         # Usage and evolution data
         self.retrieval_count = retrieval_count or 0
         self.evolution_history = evolution_history or []
+    
+    @property
+    def keywords(self) -> Tuple[str, ...]:
+        return _TERMS.values(self._keywords)
+    
+    @keywords.setter
+    def keywords(self, value: List[str]):
+        self._keywords = _TERMS.intern_many(str(keyword) for keyword in value or [])
+    
+    @property
+    def tags(self) -> Tuple[str, ...]:
+        return _TERMS.values(self._tags)
+    
+    @tags.setter
+    def tags(self, value: List[str]):
+        self._tags = _TERMS.intern_many(str(tag) for tag in value or [])
+    
+    @property
+    def links(self) -> Tuple[str, ...]:
+        return _IDS.values(self._links)
+    
+    @links.setter
+    def links(self, value: List[str]):
+        value = value or []
+        for link in value:
+            if not isinstance(link, str):
+                raise TypeError(f"Links must be memory ID strings, got {type(link).__name__}: {link!r}")
+        self._links = _IDS.intern_many(value)
+    
+    @property
+    def context(self) -> str:
+        return self._context
+    
+    @context.setter
+    def context(self, value: str):
+        self._context = value if isinstance(value, str) else str(value)
+    
+    @property
+    def category(self) -> str:
+        return _TERMS.value(self._category)
+    
+    @category.setter
+    def category(self, value: str):
+        self._category = _TERMS.intern(value if isinstance(value, str) else str(value))
+    
+    @property
+    def timestamp(self) -> str:
+        return _decode_time(self._timestamp)
+    
+    @timestamp.setter
+    def timestamp(self, value: str):
+        self._timestamp = _encode_time(value)
+    
+    @property
+    def last_accessed(self) -> str:
+        return _decode_time(self._last_accessed)
+    
+    @last_accessed.setter
+    def last_accessed(self, value: str):
+        self._last_accessed = _encode_time(value)
+    
+    @property
+    def evolution_history(self) -> Tuple:
+        return self._evolution_history or ()
+    
+    @evolution_history.setter
+    def evolution_history(self, value: List):
+        # Most notes never evolve; share the empty case instead of a list per note
+        self._evolution_history = tuple(value) if value else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the note to a JSON-compatible dictionary"""
+        return {
+            "id": self.id,
+            "content": self.content,
+            "keywords": list(self.keywords),
+            "links": list(self.links),
+            "retrieval_count": self.retrieval_count,
+            "timestamp": self.timestamp,
+            "last_accessed": self.last_accessed,
+            "context": self.context,
+            "evolution_history": list(self.evolution_history),
+            "category": self.category,
+            "tags": list(self.tags)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MemoryNote":
+        """Recreate a note from a dictionary produced by to_dict()"""
+        return cls(**data)
+
+@functools.lru_cache(maxsize=None)
+def _chromadb_use_fallback() -> bool:
+    """USE_FALLBACK from chromadb_config.py, if it exists (loaded once per process)"""
+    try:
+        import importlib.util
+        config_path = os.path.join(os.path.dirname(__file__), "chromadb_config.py")
+        if os.path.exists(config_path):
+            spec = importlib.util.spec_from_file_location("chromadb_config", config_path)
+            chromadb_config = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(chromadb_config)
+            use_fallback = getattr(chromadb_config, "USE_FALLBACK", False)
+            logger.info(f"Loaded chromadb_config.py: USE_FALLBACK={use_fallback}")
+            return use_fallback
+    except Exception as e:
+        logger.warning(f"Error loading chromadb_config.py: {e}")
+    return False
 
 class AgenticMemorySystem:
     """Core memory system that manages memory notes and their evolution.
@@ -158,7 +329,16 @@ class AgenticMemorySystem:
                  evo_threshold: int = 3,
                  api_key: Optional[str] = None,
                  api_base: Optional[str] = None,
-                 llm_controller = None):  
+                 llm_controller = None,
+                 persist_dir: Optional[str] = None,
+                 snapshot_interval: int = 10000,
+                 async_evolution: bool = False,
+                 evolution_workers: int = 2,
+                 llm_cache = None,
+                 vector_index = "ivf",
+                 fusion: str = "rrf",
+                 fusion_weights: Optional[Dict[str, float]] = None,
+                 restore_progress: Optional[Callable[[int, int], None]] = None):  
         """Initialize the memory system.
         
         Args:
@@ -168,28 +348,53 @@ class AgenticMemorySystem:
             evo_threshold: Number of memories before triggering evolution
             api_key: API key for the LLM service
             llm_controller: Optional custom LLM controller for testing
+            persist_dir: Optional directory for the durable note store. If None,
+                notes are only kept in memory
+            snapshot_interval: Number of log records between compacted snapshots
+            async_evolution: If True, create() queues evolution for background workers
+                and returns once the note is analyzed and indexed
+            evolution_workers: Number of background evolution workers
+            llm_cache: Optional LLMResponseCache serving repeated analysis and
+                evolution prompts without calling the LLM
+            vector_index: Index for the SimpleEmbeddingRetriever: "ivf", "exact"
+                or an index instance from vector_index
+            fusion: How search fuses retriever results: "rrf" (reciprocal rank
+                fusion) or "weighted" (weighted sum of normalized scores)
+            fusion_weights: Optional weight per retriever ("chroma", "embedding",
+                "lexical"), 1.0 for any retriever not listed
+            restore_progress: Optional callback(done, total) reporting how many
+                loaded notes have been re-indexed, called after each batch
         """
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Fusion method must be one of: {', '.join(FUSION_METHODS)}")
+        self.fusion = fusion
+        self.fusion_weights = dict(fusion_weights or {})
+        # Tag, category and timestamp indexes used to pre-filter searches
+        self.metadata_index = MetadataIndex()
+        # Forward and reverse adjacency over MemoryNote.links
+        self.link_graph = LinkGraph()
         self.memories = {}
+        self.store = None
+        self._embeddings_path = os.path.join(persist_dir, EMBEDDINGS_FILE) if persist_dir else None
+        if persist_dir:
+            self.store = MemoryStore(persist_dir, snapshot_interval=snapshot_interval)
+            for memory_id, data in self.store.load().items():
+                self.memories[memory_id] = MemoryNote.from_dict(data)
         self.model_name = model_name  # Store the model name for later use
         
         # Check if ChromaDB is disabled
         disable_chromadb = os.getenv("DISABLE_CHROMADB", "false").lower() in ("true", "1", "t")
         
-        # Try to load chromadb_config.py if it exists
-        use_fallback = False
-        try:
-            import importlib.util
-            config_path = os.path.join(os.path.dirname(__file__), "chromadb_config.py")
-            if os.path.exists(config_path):
-                spec = importlib.util.spec_from_file_location("chromadb_config", config_path)
-                chromadb_config = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(chromadb_config)
-                use_fallback = getattr(chromadb_config, "USE_FALLBACK", False)
-                logger.info(f"Loaded chromadb_config.py: USE_FALLBACK={use_fallback}")
-        except Exception as e:
-            logger.warning(f"Error loading chromadb_config.py: {e}")
+        # Use the fallback ChromaDB implementation if chromadb_config.py asks for it
+        use_fallback = _chromadb_use_fallback()
+        
+        # Shared embedding model; set only when the standard retrievers are in use
+        self.embedder = None
+        # BM25 index over content, keywords and tags for exact term and identifier matches
+        self.lexical_retriever = None
         
         if not disable_chromadb:
+            self.lexical_retriever = BM25Retriever()
             if use_fallback:
                 # Use fallback implementation
                 logger.info("Using fallback ChromaDB implementation")
@@ -205,10 +410,12 @@ class AgenticMemorySystem:
             else:
                 # Use standard retrievers
                 try:
-                    self.retriever = SimpleEmbeddingRetriever(model_name)
-                    self.chroma_retriever = ChromaRetriever()
+                    self.embedder = get_embedding_service(model_name)
+                    self.retriever = SimpleEmbeddingRetriever(model_name, index=vector_index)
+                    self.chroma_retriever = ChromaRetriever(model_name=model_name)
                 except Exception as e:
                     logger.error(f"Error initializing retrievers: {e}")
+                    self.embedder = None
                     self.retriever = None
                     self.chroma_retriever = None
         else:
@@ -216,9 +423,29 @@ class AgenticMemorySystem:
             self.retriever = None
             self.chroma_retriever = None
             
-        self.llm_controller = llm_controller or LLMController(llm_backend, llm_model, api_key, api_base)
+        self.llm_controller = llm_controller or LLMController(llm_backend, llm_model, api_key, api_base,
+                                                              cache=llm_cache)
         self.evo_cnt = 0
         self.evo_threshold = evo_threshold
+        # IDs of notes whose re-index failed after evolution, retried by consolidation
+        self._dirty_ids = set()
+        # Guards evo_cnt and the dirty set, which evolution workers update concurrently
+        self._state_lock = threading.Lock()
+        # Per-note locks: evolution decisions and updates are applied under these
+        self._note_locks = StripedLock()
+        # Serializes appending to the note store, applying to self.memories and snapshots
+        self._commit_lock = threading.RLock()
+        self.evolution_queue = None
+        if async_evolution:
+            self.evolution_queue = EvolutionQueue(self._evolve_queued, workers=evolution_workers)
+        
+        # Notes loaded from the store are in ChromaDB's own persistent store, but the
+        # in-process indexes start empty
+        for note in self.memories.values():
+            self._index_metadata(note)
+            self.link_graph.set_links(note.id, self._link_ids(note.links))
+        if self.memories:
+            self._restore_indexes(progress=restore_progress)
 
         # Evolution system prompt
         self._evolution_system_prompt = '''
@@ -253,6 +480,155 @@ class AgenticMemorySystem:
                                 }}
                                 '''
         
+    @staticmethod
+    def _chroma_metadata(note: MemoryNote) -> Dict[str, Any]:
+        """Build the metadata stored alongside a note in ChromaDB"""
+        return {
+            "context": note.context,
+            "keywords": note.keywords,
+            "tags": note.tags,
+            "category": note.category,
+            "timestamp": note.timestamp
+        }
+    
+    @staticmethod
+    def _index_document(note: MemoryNote) -> str:
+        """Build the metadata-enhanced document indexed by the SimpleEmbeddingRetriever"""
+        metadata_text = f"{note.context} {' '.join(note.keywords)} {' '.join(note.tags)}"
+        return f"{note.content} , {metadata_text}"
+    
+    @staticmethod
+    def _lexical_document(note: MemoryNote) -> str:
+        """Build the document indexed by the BM25 retriever: content, keywords and tags"""
+        return f"{note.content} {' '.join(note.keywords)} {' '.join(note.tags)}"
+    
+    def _embed_notes(self, notes: List[MemoryNote]):
+        """Encode the documents of each note for both vector retrievers in one call
+        
+        ChromaDB stores and embeds note.content, while the SimpleEmbeddingRetriever
+        embeds the metadata-enhanced document. Keeping the two vectors distinct
+        gives fusion two different dense rankings rather than the same one twice.
+        
+        Args:
+            notes: Notes to encode
+            
+        Returns:
+            Tuple of (content embeddings for ChromaDB, index document embeddings
+            for the SimpleEmbeddingRetriever), each an np.ndarray with one row per
+            note, or (None, None) to let each retriever embed the documents itself
+            (fallback retrievers or encoding failure)
+        """
+        if self.embedder is None or not notes:
+            return None, None
+        try:
+            vectors = self.embedder.encode([note.content for note in notes] +
+                                           [self._index_document(note) for note in notes])
+        except Exception as e:
+            logger.error(f"Error encoding memories: {e}")
+            return None, None
+        return vectors[:len(notes)], vectors[len(notes):]
+    
+    def _restore_indexes(self, batch_size: int = 1024,
+                         progress: Optional[Callable[[int, int], None]] = None):
+        """Index every loaded note in the embedding and lexical retrievers, keyed by memory ID
+        
+        Vectors saved next to the note snapshot are reused for every note whose
+        index document is unchanged, so a clean restart encodes nothing. The
+        remaining notes are encoded in batches with one EmbeddingService.encode
+        call each, so vectors already in the embedding cache are not recomputed
+        and at most `batch_size` documents are held in flight.
+        
+        Args:
+            batch_size: Number of notes encoded per batch
+            progress: Optional callback(done, total), called before the first
+                batch and after each one
+        """
+        if self.retriever is None and self.lexical_retriever is None:
+            return
+        notes = list(self.memories.values())
+        if progress is not None:
+            progress(0, len(notes))
+        unsaved = set()
+        reused = 0
+        if self.retriever is not None:
+            documents = {note.id: self._index_document(note) for note in notes}
+            if self._embeddings_path is not None:
+                unsaved.update(self.retriever.load_vectors(self._embeddings_path, documents))
+            else:
+                unsaved.update(documents)
+            reused = len(notes) - len(unsaved)
+        for start in range(0, len(notes), batch_size):
+            batch = notes[start:start + batch_size]
+            ids = [note.id for note in batch]
+            to_encode = [note.id for note in batch if note.id in unsaved]
+            if to_encode:
+                # Encoded by the retriever with the shared model, in one call
+                self.retriever.add_documents([documents[memory_id] for memory_id in to_encode], to_encode)
+            if self.lexical_retriever is not None:
+                self.lexical_retriever.add_documents([self._lexical_document(note) for note in batch], ids)
+            if progress is not None:
+                progress(start + len(batch), len(notes))
+        logger.info(f"Restored in-process indexes for {len(notes)} memories "
+                    f"({reused} saved embeddings reused)")
+    
+    def _link_ids(self, links) -> List[str]:
+        """IDs of live notes in a links value, for the link graph.
+        
+        Links to deleted notes stay on the note but get no edge, so a stale
+        link never brings a deleted note back into the graph.
+        """
+        return [link for link in links or [] if link in self.memories]
+    
+    def _index_metadata(self, note: MemoryNote):
+        """Add or refresh a note in the tag, category and timestamp indexes"""
+        self.metadata_index.add(note.id, note.tags, note.category, note.timestamp)
+    
+    def _commit(self, op: str, notes: List[MemoryNote] = (), memory_id: Optional[str] = None):
+        """Record a mutation in the durable note store, then apply it to the memory map.
+        
+        Appending the record, applying it and starting a due snapshot happen
+        under one commit lock, and the new notes are swapped in (or the deleted
+        note removed) before the snapshot check. The lock is only held to rotate
+        the log and list the current notes; notes are replaced rather than
+        mutated, so the snapshot serialized from that list on a background
+        thread reflects exactly the records its sequence number covers, even
+        with concurrent writers such as evolution workers. If the write fails,
+        nothing is applied.
+        
+        Args:
+            op: One of "create", "update", "delete" or "evolve"
+            notes: Notes whose new state should be recorded and applied
+            memory_id: ID of the deleted note for "delete"
+        """
+        with self._commit_lock:
+            self._record(op, notes, memory_id)
+            if op == "delete":
+                self.memories.pop(memory_id, None)
+            else:
+                for note in notes:
+                    self.memories[note.id] = note
+            if self.store is not None and self.store.snapshot_due():
+                live_notes = list(self.memories.values())
+                self.store.snapshot((note.to_dict() for note in live_notes), background=True,
+                                    after_write=self._save_embeddings)
+    
+    def _record(self, op: str, notes: List[MemoryNote] = (), memory_id: Optional[str] = None):
+        """Append a mutation record to the durable note store, if one is configured"""
+        if self.store is None:
+            return
+        if op == "create" and len(notes) == 1:
+            self.store.record_create(notes[0].to_dict())
+        elif op == "create":
+            self.store.record_create_many([note.to_dict() for note in notes])
+        elif op == "update" and len(notes) == 1:
+            self.store.record_update(notes[0].to_dict())
+        elif op == "update":
+            self.store.record_update_many([note.to_dict() for note in notes])
+        elif op == "delete":
+            self.store.record_delete(memory_id)
+        elif op == "evolve":
+            self.store.record_evolution([note.to_dict() for note in notes])
+    
     def _extract_best_json(self, text: str) -> Dict:
         """Extract the best JSON object from text, trying multiple approaches.
         
@@ -304,6 +680,7 @@ class AgenticMemorySystem:
         # If we got here, extraction failed - use the default
         return default_response
 
+    @traced("analyze")
     def analyze_content(self, content: str) -> Dict:            
         """Analyze content using LLM to extract semantic metadata.
         
@@ -380,42 +757,31 @@ class AgenticMemorySystem:
             Content for analysis:
             """ + truncated_content
         try:
-            # Add timeout handling in case LLM takes too long
-            
-            result = [None]
-            error = [None]
-            
-            def call_llm():
-                try:
-                    response = self.llm_controller.llm.get_completion(
+            # Use a timeout to prevent hanging; the controller cancels the request itself
+            try:
+                with llm_purpose("analysis"), span("llm", purpose="analysis"):
+                    response = self.llm_controller.llm.get_completion_with_timeout(
                         prompt, 
                         response_format={"type": "json_object"}, 
-                        temperature=0.7
+                        temperature=0.7,
+                        timeout=ANALYSIS_TIMEOUT
                     )
-                    result[0] = response
-                except Exception as e:
-                    error[0] = e
-            
-            # Use a timeout of 10 seconds to prevent hanging
-            thread = threading.Thread(target=call_llm)
-            thread.daemon = True
-            thread.start()
-            thread.join(10)  # 10 second timeout
-            
-            if thread.is_alive() or error[0] is not None:
+            except Exception as e:
                 # Timeout occurred or there was an error
-                logger.warning(f"LLM timeout or error: {error[0]}")
+                LLM_ERRORS.labels("analysis").inc()
+                logger.warning(f"LLM timeout or error: {e}")
                 return fallback_result
                 
-            if not result[0]:
+            if not response:
                 logger.warning("Empty LLM response, using fallback")
                 return fallback_result
                 
-            # Strip any Markdown code fences from the response
-            cleaned_response = strip_markdown_code_fences(result[0])
-            
-            # Try to extract valid JSON using multiple approaches
-            extracted_result = self._extract_best_json(cleaned_response)
+            with span("json_extraction"):
+                # Strip any Markdown code fences from the response
+                cleaned_response = strip_markdown_code_fences(response)
+                
+                # Try to extract valid JSON using multiple approaches
+                extracted_result = self._extract_best_json(cleaned_response)
             
             # Validate the result has required fields
             if not all(key in extracted_result for key in ["keywords", "context", "tags"]):
@@ -438,6 +804,7 @@ class AgenticMemorySystem:
             logger.error(f"Error analyzing content: {e}")
             return fallback_result
 
+    @timed_operation("create")
     def create(self, content: str, **kwargs) -> str:
         """Create a new memory note.
         
@@ -457,147 +824,285 @@ class AgenticMemorySystem:
             kwargs['tags'] = tags_from_analysis
             
         note = MemoryNote(content=content, keywords=keyword, context=context, **kwargs)
-        self.memories[note.id] = note
+        with span("persist"):
+            self._commit("create", [note])
+        self._index_metadata(note)
+        if note.links:
+            self.link_graph.set_links(note.id, self._link_ids(note.links))
+        annotate(memory_id=note.id)
         
         # Check if ChromaDB is disabled
         disable_chromadb = os.getenv("DISABLE_CHROMADB", "false").lower() in ("true", "1", "t")
         
         if not disable_chromadb and self.chroma_retriever is not None:
             # Add to retrievers only if ChromaDB is not disabled
-            metadata = {
-                "context": note.context,
-                "keywords": note.keywords,
-                "tags": note.tags,
-                "category": note.category,
-                "timestamp": note.timestamp
-            }
+            metadata = self._chroma_metadata(note)
+            with span("encode"):
+                content_embeddings, index_embeddings = self._embed_notes([note])
             
             # Add to ChromaRetriever (standard or fallback)
-            self.chroma_retriever.add_document(document=content, metadata=metadata, doc_id=note.id)
+            with span("chroma_add"):
+                self.chroma_retriever.add_document(
+                    document=content, metadata=metadata, doc_id=note.id,
+                    embedding=None if content_embeddings is None else content_embeddings[0])
+            
+            # Add to SimpleEmbeddingRetriever if available, keyed by memory ID so
+            # consolidation can refresh it in place
+            if self.retriever is not None:
+                with span("embedding_add"):
+                    self.retriever.add_document(
+                        self._index_document(note), note.id,
+                        embedding=None if index_embeddings is None else index_embeddings[0])
+            if self.lexical_retriever is not None:
+                with span("lexical_add"):
+                    self.lexical_retriever.add_document(self._lexical_document(note), note.id)
+        
+        self._schedule_evolution(note)
+        
+        return note.id
+    
+    @timed_operation("create_many")
+    def create_many(self,
+                    contents: List[str],
+                    metadata: Optional[List[Dict[str, Any]]] = None,
+                    max_workers: int = 8,
+                    evolve: bool = True) -> List[str]:
+        """Create several memory notes in one batch.
+        
+        Content analysis runs concurrently with at most `max_workers` LLM calls in
+        flight. The new notes are then persisted with a single log write, added to
+        ChromaDB with a single `add` call and embedded with a single batched encode.
+        Evolution runs for each note afterwards unless `evolve` is False, which is
+        the fastest option for bulk imports of historical data.
+        
+        Args:
+            contents: The content of each memory
+            metadata: Optional additional metadata (tags, category, etc.) for each
+                memory, aligned with `contents`
+            max_workers: Maximum number of content analyses running concurrently
+            evolve: Whether to run memory evolution for the new notes
+            
+        Returns:
+            List[str]: IDs of the created memories, in the order of `contents`
+        """
+        if not contents:
+            return []
+        if metadata is None:
+            metadata = [{} for _ in contents]
+        if len(metadata) != len(contents):
+            raise ValueError("metadata must have one entry per content item")
+        
+        # Analyze content concurrently with bounded parallelism
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(contents)))) as executor:
+            analyses = list(executor.map(self.analyze_content, contents))
+        
+        notes = []
+        for content, analysis, kwargs in zip(contents, analyses, metadata):
+            kwargs = dict(kwargs)
+            # Use provided tags if available, otherwise use tags from analysis
+            if 'tags' not in kwargs:
+                kwargs['tags'] = analysis["tags"]
+            notes.append(MemoryNote(content=content, keywords=analysis["keywords"], context=analysis["context"], **kwargs))
+        self._commit("create", notes)
+        for note in notes:
+            self._index_metadata(note)
+            if note.links:
+                self.link_graph.set_links(note.id, self._link_ids(note.links))
+        
+        # Check if ChromaDB is disabled
+        disable_chromadb = os.getenv("DISABLE_CHROMADB", "false").lower() in ("true", "1", "t")
+        
+        if not disable_chromadb and self.chroma_retriever is not None:
+            # One batched encode for both vector retrievers
+            content_embeddings, index_embeddings = self._embed_notes(notes)
+            
+            # One ChromaDB call for the whole batch
+            self.chroma_retriever.add_documents(
+                documents=[note.content for note in notes],
+                metadatas=[self._chroma_metadata(note) for note in notes],
+                doc_ids=[note.id for note in notes],
+                embeddings=content_embeddings
+            )
             
-            # Add to SimpleEmbeddingRetriever if available
             if self.retriever is not None:
-                self.retriever.add_document(content)
+                self.retriever.add_documents(
+                    [self._index_document(note) for note in notes],
+                    [note.id for note in notes],
+                    embeddings=index_embeddings
+                )
+            if self.lexical_retriever is not None:
+                self.lexical_retriever.add_documents(
+                    [self._lexical_document(note) for note in notes],
+                    [note.id for note in notes]
+                )
+        
+        if evolve:
+            for note in notes:
+                self._schedule_evolution(note)
+        
+        return [note.id for note in notes]
+    
+    def _schedule_evolution(self, note: MemoryNote):
+        """Evolve a new note now, or queue it for the background workers"""
+        if self.evolution_queue is not None:
+            self.evolution_queue.submit(note.id)
+        else:
+            self._evolve_new_note(note)
+    
+    def _evolve_queued(self, memory_id: str):
+        """Evolution worker entry point; skips notes deleted while queued"""
+        note = self.memories.get(memory_id)
+        if note is not None:
+            # The request that queued the note has finished; trace under its trace ID
+            with continue_trace("queued_evolution", memory_id=memory_id):
+                self._evolve_new_note(note)
+    
+    @timed_operation("evolution")
+    @traced("evolution")
+    def _evolve_new_note(self, note: MemoryNote):
+        """Run memory evolution for a newly created note and consolidate when due
+        
+        Args:
+            note: The newly created memory note
+        """
+        # Check if ChromaDB is disabled
+        disable_chromadb = os.getenv("DISABLE_CHROMADB", "false").lower() in ("true", "1", "t")
         
         # First increment the counter
-        self.evo_cnt += 1
+        with self._state_lock:
+            self.evo_cnt += 1
         
         evolved = self._process_memory_evolution(note)
+        EVOLUTIONS.labels("evolved" if evolved == True else "unchanged").inc()
         
         if evolved == True:
-            self.evo_cnt += 1
-            if self.evo_cnt % self.evo_threshold == 0 and not disable_chromadb:
+            with self._state_lock:
+                self.evo_cnt += 1
+                consolidate = self.evo_cnt % self.evo_threshold == 0
+            if consolidate and not disable_chromadb:
                 self.consolidate_memories()
+    
+    def wait_for_evolution(self, timeout: Optional[float] = None) -> bool:
+        """Block until queued evolution work has been applied
         
-        return note.id
+        Args:
+            timeout: Maximum number of seconds to wait, or None to wait indefinitely
+            
+        Returns:
+            bool: True if nothing is left in the queue
+        """
+        if self.evolution_queue is None:
+            return True
+        return self.evolution_queue.join(timeout)
+    
+    def close(self):
+        """Finish queued evolution, close the durable note store and save the embeddings"""
+        if self.evolution_queue is not None:
+            self.evolution_queue.close()
+        if self.store is not None:
+            self.store.close()
+        self._save_embeddings()
+    
+    def _save_embeddings(self):
+        """Save the SimpleEmbeddingRetriever vectors next to the note snapshot"""
+        if self.retriever is None or self._embeddings_path is None:
+            return
+        try:
+            count = self.retriever.save(self._embeddings_path)
+            logger.info(f"Saved {count} embeddings to {self._embeddings_path}")
+        except Exception as e:
+            logger.error(f"Error saving embeddings to {self._embeddings_path}: {e}")
     
+    @timed_operation("consolidate")
     def consolidate_memories(self):
-        """Consolidate memories: update retriever with new documents
+        """Consolidate memories: refresh the retrievers for notes changed since the last pass
         
-        This function re-initializes both retrievers (SimpleEmbeddingRetriever and ChromaRetriever)
-        and updates them with all memory documents, including their metadata (context, keywords, tags).
-        This ensures the retrieval systems have the latest state of all memories for accurate search results.
+        Evolution re-indexes the notes it rewrites as soon as the change is applied.
+        Notes whose re-index failed are recorded in the dirty set, and a
+        consolidation pass retries exactly those, so its cost is proportional to the
+        number of changed notes rather than to the size of the store.
         
         The consolidation process:
-        1. Reinitializes both retrievers with their original configurations (which clears existing data)
-        2. Adds all memory documents back to both retrievers with their current metadata
-        3. Ensures consistent document representation across both retrieval systems
+        1. Takes the IDs of notes recorded since the last pass
+        2. Encodes their metadata-enhanced documents once with the shared model
+        3. Upserts content, current metadata and embeddings into the ChromaDB retriever
+        4. Replaces their vectors in the SimpleEmbeddingRetriever and BM25 index
         """
-        # Check if we're using the fallback implementation
-        try:
-            import importlib.util
-            config_path = os.path.join(os.path.dirname(__file__), "chromadb_config.py")
-            use_fallback = False
-            if os.path.exists(config_path):
-                spec = importlib.util.spec_from_file_location("chromadb_config", config_path)
-                chromadb_config = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(chromadb_config)
-                use_fallback = getattr(chromadb_config, "USE_FALLBACK", False)
-        except Exception as e:
-            logger.warning(f"Error loading chromadb_config.py: {e}")
-            use_fallback = False
-
-        if use_fallback:
-            logger.info("Using fallback ChromaDB implementation, skipping traditional consolidation")
-            try:
-                # If using fallback implementation, recreate the retriever with all memories
-                from fallback_chromadb import SimpleChromaRetriever
-                collection_name = getattr(self.chroma_retriever, "collection_name", "memories")
-                self.chroma_retriever = SimpleChromaRetriever(collection_name)
-                
-                # Add all memories to the new fallback retriever
-                for memory_id, memory in self.memories.items():
-                    # Prepare metadata
-                    metadata = {
-                        "context": memory.context,
-                        "keywords": memory.keywords,
-                        "tags": memory.tags,
-                        "category": memory.category,
-                        "timestamp": memory.timestamp
-                    }
-                    
-                    # Add to fallback retriever
-                    self.chroma_retriever.add_document(
-                        document=memory.content,
-                        metadata=metadata,
-                        doc_id=memory_id
-                    )
-                
-                logger.info(f"Fallback memory consolidation complete. Updated {len(self.memories)} memories.")
-                return
-            except Exception as e:
-                logger.error(f"Error in fallback consolidation: {e}")
-                # Fall through to standard consolidation
-        
-        # Only proceed with standard consolidation if we have both retrievers
-        if self.retriever is None or self.chroma_retriever is None:
+        if self.chroma_retriever is None:
             logger.warning("Cannot consolidate memories: retrievers not initialized")
             return
-            
-        # 1. Save original configuration
-        model_name = self.model_name  # Use the stored model name instead of trying to extract it
-        collection_name = getattr(self.chroma_retriever, "collection_name", "memories")
-        if hasattr(self.chroma_retriever, "collection") and self.chroma_retriever.collection is not None:
-            collection_name = self.chroma_retriever.collection.name
         
-        # 2. Clear and reinitialize retrievers
-        # For SimpleEmbeddingRetriever, creating a new instance clears all documents
-        self.retriever = SimpleEmbeddingRetriever(model_name)
+        # Take the current dirty set; notes changed while we upsert land in a new one
+        with self._state_lock:
+            dirty_ids, self._dirty_ids = self._dirty_ids, set()
+        notes = [self.memories[memory_id] for memory_id in dirty_ids if memory_id in self.memories]
+        if not notes:
+            return
         
-        # For ChromaRetriever, we need to delete the collection and recreate it
         try:
-            if hasattr(self.chroma_retriever, "client") and self.chroma_retriever.client is not None:
-                self.chroma_retriever.client.delete_collection(collection_name)
+            reindexed = self._reindex_notes(notes)
         except Exception as e:
-            logger.warning(f"Failed to delete collection {collection_name}: {e}")
-        self.chroma_retriever = ChromaRetriever(collection_name)
-        
-        # 3. Re-add all memory documents with their metadata to both retrievers
-        for memory_id, memory in self.memories.items():
-            # Prepare metadata for ChromaDB
-            metadata = {
-                "context": memory.context,
-                "keywords": memory.keywords,
-                "tags": memory.tags,
-                "category": memory.category,
-                "timestamp": memory.timestamp
-            }
+            logger.error(f"Error consolidating memories: {e}")
+            reindexed = False
+        if not reindexed:
+            # Keep them for the next pass
+            logger.warning(f"Failed to re-index {len(notes)} changed memories; will retry")
+            with self._state_lock:
+                self._dirty_ids.update(note.id for note in notes)
+            return
+        CONSOLIDATED_NOTES.inc(len(notes))
             
-            # Add to ChromaRetriever
-            self.chroma_retriever.add_document(
-                document=memory.content,
-                metadata=metadata,
-                doc_id=memory_id
+        logger.info(f"Memory consolidation complete. Updated {len(notes)} changed memories in both retrievers.")
+    
+    def _reindex_notes(self, notes: List[MemoryNote]) -> bool:
+        """Refresh the content, metadata and embeddings of notes in every retriever
+        
+        The content and metadata-enhanced documents are encoded in one call to
+        the shared model, for ChromaDB and the SimpleEmbeddingRetriever.
+        
+        Returns:
+            bool: False if the ChromaDB upsert reported a failure; the caller
+            should leave the notes in the dirty set for consolidation to retry
+        """
+        if not notes:
+            return True
+        content_embeddings, index_embeddings = self._embed_notes(notes)
+        succeeded = True
+        if self.chroma_retriever is not None:
+            # The retrievers log and swallow ChromaDB errors, returning False
+            succeeded = self.chroma_retriever.upsert_documents(
+                documents=[note.content for note in notes],
+                metadatas=[self._chroma_metadata(note) for note in notes],
+                doc_ids=[note.id for note in notes],
+                embeddings=content_embeddings
             )
-            
-            # Create enhanced document for SimpleEmbeddingRetriever by combining content with metadata
-            metadata_text = f"{memory.context} {' '.join(memory.keywords)} {' '.join(memory.tags)}"
-            enhanced_document = f"{memory.content} , {metadata_text}"
-            
-            # Add to SimpleEmbeddingRetriever
-            self.retriever.add_document(enhanced_document)
-            
-        logger.info(f"Memory consolidation complete. Updated {len(self.memories)} memories in both retrievers.")
+        
+        if self.retriever is not None:
+            for i, note in enumerate(notes):
+                embedding = None if index_embeddings is None else index_embeddings[i]
+                self.retriever.upsert_document(self._index_document(note), note.id, embedding=embedding)
+        if self.lexical_retriever is not None:
+            for note in notes:
+                self.lexical_retriever.upsert_document(self._lexical_document(note), note.id)
+        return succeeded is not False
+    
+    def stats(self) -> Dict[str, Any]:
+        """Operational counters for the memory system
+        
+        Returns:
+            Dict with the number of memories, notes awaiting consolidation,
+            embedding and LLM cache hit/miss counters (None when a cache is off) and
+            evolution queue depth and lag (None when evolution is synchronous)
+        """
+        cache = self.embedder.cache if self.embedder is not None else None
+        llm_cache = getattr(getattr(self.llm_controller, "llm", None), "cache", None)
+        return {
+            "memories": len(self.memories),
+            "pending_consolidation": len(self._dirty_ids),
+            "embedding_cache": cache.stats() if cache is not None else None,
+            "llm_cache": llm_cache.stats() if llm_cache is not None else None,
+            "evolution_queue": self.evolution_queue.stats() if self.evolution_queue is not None else None
+        }
     
     def read(self, memory_id: str) -> Optional[MemoryNote]:
         """Retrieve a memory note by its ID.
@@ -620,29 +1125,84 @@ class AgenticMemorySystem:
         Returns:
             bool: True if update successful
         """
-        if memory_id not in self.memories:
-            return False
-            
-        note = self.memories[memory_id]
+        return memory_id in self.update_many({memory_id: kwargs})
+    
+    @timed_operation("update")
+    def update_many(self, updates: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Update several memory notes, re-indexing only what each change affects.
         
-        # Update fields
-        for key, value in kwargs.items():
-            if hasattr(note, key):
-                setattr(note, key, value)
-                
-        # Update in ChromaDB
-        metadata = {
-            "context": note.context,
-            "keywords": note.keywords,
-            "tags": note.tags,
-            "category": note.category,
-            "timestamp": note.timestamp
-        }
-        self.chroma_retriever.delete_document(memory_id)
-        self.chroma_retriever.add_document(document=note.content, metadata=metadata, doc_id=memory_id)
+        Each note is compared with its updated copy. Changes to the embedded
+        document (content, context, keywords, tags) are encoded in one batch and
+        upserted into every retriever; changes to other ChromaDB metadata
+        (category, timestamp) are a metadata-only update with no encoding; links
+        and usage fields only touch the link graph and the note store. The
+        updated notes are recorded in the durable store before any of them is
+        swapped in, so a failed write leaves every note unchanged, and swapped
+        in before a snapshot is taken, so a snapshot never loses them.
         
-        return True
+        Args:
+            updates: Fields to update per memory ID; unknown fields are ignored
+            
+        Returns:
+            List[str]: IDs of the notes that exist (and were updated if anything changed)
+        """
+        with self._note_locks.hold(list(updates)):
+            found = []
+            changes = []
+            for memory_id, fields in updates.items():
+                current = self.memories.get(memory_id)
+                if current is None:
+                    continue
+                found.append(memory_id)
+                old = current.to_dict()
+                data = dict(old)
+                data.update((key, value) for key, value in fields.items() if key in data and key != "id")
+                note = MemoryNote.from_dict(data)
+                new = note.to_dict()
+                changed = {key for key in new if new[key] != old[key]}
+                if changed:
+                    changes.append((note, changed))
+            if not changes:
+                return found
+            
+            # Swapped in before any snapshot the write triggers, so the snapshot includes them
+            self._commit("update", [note for note, _ in changes])
+            for note, changed in changes:
+                if changed & _METADATA_INDEX_FIELDS:
+                    self._index_metadata(note)
+                if "links" in changed:
+                    self.link_graph.set_links(note.id, self._link_ids(note.links))
+            
+            reembed = [note for note, changed in changes if changed & _EMBEDDED_FIELDS]
+            metadata_only = [note for note, changed in changes
+                             if changed & _CHROMA_METADATA_FIELDS and not changed & _EMBEDDED_FIELDS]
+            try:
+                # One encode call for ChromaDB and the SimpleEmbeddingRetriever; refreshes BM25 too
+                failed = []
+                if self._reindex_notes(reembed):
+                    with self._state_lock:
+                        self._dirty_ids.difference_update(note.id for note in reembed)
+                else:
+                    failed.extend(reembed)
+                if metadata_only and self.chroma_retriever is not None:
+                    if self.chroma_retriever.update_metadatas(
+                        metadatas=[self._chroma_metadata(note) for note in metadata_only],
+                        doc_ids=[note.id for note in metadata_only]
+                    ) is False:
+                        failed.extend(metadata_only)
+                if failed:
+                    # ChromaDB reported the failure instead of raising; retry in consolidation
+                    logger.warning(f"Failed to re-index {len(failed)} updated memories in ChromaDB; will retry")
+                    with self._state_lock:
+                        self._dirty_ids.update(note.id for note in failed)
+            except Exception as e:
+                # Leave them to the next consolidation pass
+                logger.error(f"Error re-indexing updated memories: {e}")
+                with self._state_lock:
+                    self._dirty_ids.update(note.id for note in reembed + metadata_only)
+            return found
     
+    @timed_operation("delete")
     def delete(self, memory_id: str) -> bool:
         """Delete a memory note by its ID.
         
@@ -652,13 +1212,21 @@ class AgenticMemorySystem:
         Returns:
             bool: True if memory was deleted, False if not found
         """
-        if memory_id in self.memories:
-            # Delete from ChromaDB
-            self.chroma_retriever.delete_document(memory_id)
-            # Delete from local storage
-            del self.memories[memory_id]
-            return True
-        return False
+        with self._note_locks.hold([memory_id]):
+            if memory_id in self.memories:
+                # Delete from every retriever so no stale vectors or postings remain
+                if self.chroma_retriever is not None:
+                    self.chroma_retriever.delete_document(memory_id)
+                if self.retriever is not None:
+                    self.retriever.delete_document(memory_id)
+                if self.lexical_retriever is not None:
+                    self.lexical_retriever.delete_document(memory_id)
+                self.metadata_index.remove(memory_id)
+                self.link_graph.remove(memory_id)
+                # Delete from local storage
+                self._commit("delete", memory_id=memory_id)
+                return True
+            return False
     
     def _search_raw(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
         """Internal search method that returns raw results from ChromaDB.
@@ -677,72 +1245,376 @@ class AgenticMemorySystem:
         return [{'id': doc_id, 'score': score} 
                 for doc_id, score in zip(results['ids'][0], results['distances'][0])]
                 
-    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+    def search(self, query: str, k: int = 5,
+               tags: Optional[List[str]] = None,
+               category: Optional[str] = None,
+               since: TimeBound = None,
+               until: TimeBound = None,
+               expand_links: int = 0) -> List[Dict[str, Any]]:
         """Search for memories using a hybrid retrieval approach.
         
-        This method combines results from both:
+        This method combines results from:
         1. ChromaDB vector store (semantic similarity)
         2. Embedding-based retrieval (dense vectors)
+        3. BM25 lexical retrieval (exact terms and identifiers)
+        
+        Each retriever returns a candidate pool, and the ranked lists are fused
+        (reciprocal rank fusion by default) into one ranking whose scores are
+        comparable across results: higher is better.
         
-        The results are deduplicated and ranked by relevance.
+        Metadata filters are resolved to a set of memory IDs through the tag,
+        category and timestamp indexes before ranking, so the k results all
+        match the filters even when matching memories are rare.
         
         Args:
             query (str): The search query text
             k (int): Maximum number of results to return
+            tags (Optional[List[str]]): Only return memories carrying all of these tags
+            category (Optional[str]): Only return memories in this category
+            since: Only return memories created at or after this time (YYYYMMDD[HHMM] or datetime)
+            until: Only return memories created at or before this time
+            expand_links (int): Number of link hops to follow from the hits; linked
+                notes are added with the score of the hit they were reached from,
+                multiplied by LINK_SCORE_DECAY per hop
             
         Returns:
             List[Dict[str, Any]]: List of search results, each containing:
                 - id: Memory ID
                 - content: Memory content
-                - score: Similarity score
+                - score: Fused relevance score (higher is better)
                 - metadata: Additional memory metadata
+                
+        Raises:
+            ValueError: If since or until is not a timestamp
+        """
+        return self.search_many([query], k, tags=tags, category=category, since=since, until=until,
+                                expand_links=expand_links)[0]
+    
+    def search_many(self, queries: List[str], k: int = 5, fusion: Optional[str] = None,
+                    tags: Optional[List[str]] = None,
+                    category: Optional[str] = None,
+                    since: TimeBound = None,
+                    until: TimeBound = None,
+                    expand_links: int = 0) -> List[List[Dict[str, Any]]]:
+        """Hybrid search for several queries at once.
+        
+        Uses one ChromaDB query call and one batched embedding pass for all
+        queries instead of one round trip per query.
+        
+        Args:
+            queries: The search query texts
+            k: Maximum number of results to return per query
+            fusion: "rrf" or "weighted", or None for the system default
+            tags: Only return memories carrying all of these tags
+            category: Only return memories in this category
+            since: Only return memories created at or after this time (YYYYMMDD[HHMM] or datetime)
+            until: Only return memories created at or before this time
+            expand_links: Number of link hops to follow from the hits (see search())
+            
+        Returns:
+            List[List[Dict[str, Any]]]: One result list per query, as returned by search()
+        """
+        return self._search_batch(queries, k, fusion, tags=tags, category=category, since=since, until=until,
+                                  expand_links=expand_links)[0]
+    
+    def search_detailed(self, query: str, k: int = 5, fusion: Optional[str] = None,
+                        tags: Optional[List[str]] = None,
+                        category: Optional[str] = None,
+                        since: TimeBound = None,
+                        until: TimeBound = None,
+                        expand_links: int = 0) -> Dict[str, Any]:
+        """Hybrid search that also reports where the time went.
+        
+        Args:
+            query: The search query text
+            k: Maximum number of results to return
+            fusion: "rrf" or "weighted", or None for the system default
+            tags: Only return memories carrying all of these tags
+            category: Only return memories in this category
+            since: Only return memories created at or after this time (YYYYMMDD[HHMM] or datetime)
+            until: Only return memories created at or before this time
+            expand_links: Number of link hops to follow from the hits (see search())
+            
+        Returns:
+            Dict with 'results' (as returned by search()) and 'timings', the
+            milliseconds spent filtering, embedding the query, in each
+            retriever, in fusion and in total
         """
+        results, timings = self._search_batch([query], k, fusion, tags=tags, category=category, since=since, until=until,
+                                              expand_links=expand_links)
+        return {"results": results[0], "timings": timings}
+    
+    @timed_operation("search")
+    @traced("search")
+    def _search_batch(self, queries: List[str], k: int, fusion: Optional[str],
+                      tags: Optional[List[str]] = None,
+                      category: Optional[str] = None,
+                      since: TimeBound = None,
+                      until: TimeBound = None,
+                      expand_links: int = 0):
+        """Run each retriever on a candidate pool per query and fuse the ranked lists
+        
+        Queries are embedded once and the vectors are shared by ChromaDB and the
+        embedding retriever. Each retriever returns SEARCH_CANDIDATE_FACTOR * k
+        candidates, which are fused into one ranking with comparable scores
+        (higher is better).
+        
+        Metadata filters become a set of allowed IDs that the embedding and
+        lexical retrievers rank exactly. ChromaDB cannot filter on the flattened
+        tag strings, so it is skipped when the embedding retriever can rank the
+        dense side of a filtered search, and post-filtered otherwise.
+        
+        Returns:
+            Tuple of (one result list per query, timings in milliseconds)
+        """
+        started = time.perf_counter()
+        timings = {"filter_ms": 0.0, "embed_ms": 0.0, "chroma_ms": 0.0, "embedding_ms": 0.0,
+                   "lexical_ms": 0.0, "fusion_ms": 0.0, "links_ms": 0.0}
+        
         # Check if ChromaDB is disabled
         disable_chromadb = os.getenv("DISABLE_CHROMADB", "false").lower() in ("true", "1", "t")
         
+        # Reject malformed time bounds even when there is nothing to search
+        parse_time_bound(since)
+        parse_time_bound(until, upper=True)
+        
         # Return empty results if ChromaDB is disabled or all retrievers are None
-        if disable_chromadb or self.chroma_retriever is None:
-            return []
+        if not queries or k <= 0 or disable_chromadb or self.chroma_retriever is None:
+            timings["total_ms"] = (time.perf_counter() - started) * 1000
+            return [[] for _ in queries], timings
+        method = fusion or self.fusion
+        if method not in FUSION_METHODS:
+            raise ValueError(f"Fusion method must be one of: {', '.join(FUSION_METHODS)}")
+        pool = k * SEARCH_CANDIDATE_FACTOR
+        
+        # Resolve metadata filters to the IDs the retrievers may return
+        mark = time.perf_counter()
+        allowed_ids = self.metadata_index.filter(tags=tags, category=category, since=since, until=until)
+        timings["filter_ms"] = (time.perf_counter() - mark) * 1000
+        if allowed_ids is not None and not allowed_ids:
+            timings["total_ms"] = (time.perf_counter() - started) * 1000
+            return [[] for _ in queries], timings
+        
+        # One embedding per query, shared by both vector retrievers
+        query_embeddings = None
+        if self.embedder is not None:
+            mark = time.perf_counter()
+            try:
+                query_embeddings = self.embedder.encode(queries)
+            except Exception as e:
+                logger.error(f"Error encoding queries: {e}")
+            timings["embed_ms"] = (time.perf_counter() - mark) * 1000
+        
+        # Ranked (id, score) lists per retriever: ChromaDB distances, then
+        # embedding similarities and BM25 scores
+        chroma_lists = [[] for _ in queries]
+        if allowed_ids is None or self.retriever is None:
+            mark = time.perf_counter()
+            chroma_results = self.chroma_retriever.search_many(queries, pool, query_embeddings=query_embeddings)
+            chroma_lists = self._chroma_ranked_lists(chroma_results, len(queries))
+            timings["chroma_ms"] = (time.perf_counter() - mark) * 1000
+        
+        embedding_lists = [[] for _ in queries]
+        if self.retriever is not None:
+            mark = time.perf_counter()
+            embedding_results = self.retriever.search_many(queries, pool, query_embeddings=query_embeddings,
+                                                           allowed_ids=allowed_ids)
+            embedding_lists = [[(r['id'], r['score']) for r in results if r.get('id')] for results in embedding_results]
+            timings["embedding_ms"] = (time.perf_counter() - mark) * 1000
             
-        # Get results from ChromaDB
-        chroma_results = self.chroma_retriever.search(query, k)
-        memories = []
+        lexical_lists = [[] for _ in queries]
+        if self.lexical_retriever is not None:
+            mark = time.perf_counter()
+            lexical_results = self.lexical_retriever.search_many(queries, pool, allowed_ids=allowed_ids)
+            lexical_lists = [[(r['id'], r['score']) for r in results] for results in lexical_results]
+            timings["lexical_ms"] = (time.perf_counter() - mark) * 1000
         
-        # Process ChromaDB results
-        if 'ids' in chroma_results and len(chroma_results['ids']) > 0 and len(chroma_results['ids'][0]) > 0:
-            for i, doc_id in enumerate(chroma_results['ids'][0]):
-                memory = self.memories.get(doc_id)
+        # Fuse and attach note fields
+        mark = time.perf_counter()
+        weights = [self.fusion_weights.get(name, 1.0) for name in ("chroma", "embedding", "lexical")]
+        all_results = []
+        for lists in zip(chroma_lists, embedding_lists, lexical_lists):
+            # Deleted notes can linger in an index, and ChromaDB results are not
+            # pre-filtered; drop both before fusing
+            lists = [[(doc_id, score) for doc_id, score in results
+                      if doc_id in self.memories and (allowed_ids is None or doc_id in allowed_ids)]
+                     for results in lists]
+            fused = fuse(lists, method=method, weights=weights, higher_is_better=[False, True, True], top_k=k)
+            memories = []
+            for memory_id, score in fused:
+                memory = self.memories.get(memory_id)
                 if memory:
                     memories.append({
-                        'id': doc_id,
+                        'id': memory_id,
                         'content': memory.content,
                         'context': memory.context,
                         'keywords': memory.keywords,
-                        'score': chroma_results['distances'][0][i] if 'distances' in chroma_results and len(chroma_results['distances']) > 0 else 0.5
+                        'score': score
                     })
+            all_results.append(memories)
+        timings["fusion_ms"] = (time.perf_counter() - mark) * 1000
         
-        # Get results from embedding retriever if available
-        if self.retriever is not None:
-            embedding_results = self.retriever.search(query, k)
-            
-            # Combine results with deduplication
-            seen_ids = set(m['id'] for m in memories)
-            for result in embedding_results:
-                memory_id = result.get('id')
-                if memory_id and memory_id not in seen_ids:
-                    memory = self.memories.get(memory_id)
-                    if memory:
-                        memories.append({
-                            'id': memory_id,
-                            'content': memory.content,
-                            'context': memory.context,
-                            'keywords': memory.keywords,
-                            'score': result.get('score', 0.0)
-                        })
-                        seen_ids.add(memory_id)
-                    
-        return memories[:k]
+        if expand_links > 0:
+            mark = time.perf_counter()
+            all_results = [self._expand_links(memories, k, expand_links, allowed_ids) for memories in all_results]
+            timings["links_ms"] = (time.perf_counter() - mark) * 1000
+        timings["total_ms"] = (time.perf_counter() - started) * 1000
+        for stage, milliseconds in timings.items():
+            if milliseconds and stage != "total_ms":
+                SEARCH_STAGE_SECONDS.labels(stage[:-3]).observe(milliseconds / 1000)
+        annotate(queries=len(queries), k=k, fusion=method, **timings)
+        return all_results, timings
+    
+    def _expand_links(self, memories: List[Dict[str, Any]], k: int, hops: int,
+                      allowed_ids: Optional[set]) -> List[Dict[str, Any]]:
+        """Add up to k notes linked from the hits, with decayed scores, and re-sort"""
+        scores = {memory['id']: memory['score'] for memory in memories}
+        linked = []
+        for memory_id, (hop, seed) in self.link_graph.expand(list(scores), hops).items():
+            memory = self.memories.get(memory_id)
+            if memory is None or (allowed_ids is not None and memory_id not in allowed_ids):
+                continue
+            linked.append({
+                'id': memory_id,
+                'content': memory.content,
+                'context': memory.context,
+                'keywords': memory.keywords,
+                'score': scores[seed] * LINK_SCORE_DECAY ** hop,
+                'linked_from': seed
+            })
+        linked.sort(key=lambda result: -result['score'])
+        return sorted(memories + linked[:k], key=lambda result: -result['score'])
+    
+    def neighbors(self, memory_id: str, hops: int = 1, direction: str = "both") -> Optional[List[MemoryNote]]:
+        """Notes reachable from a note by following links.
+        
+        Args:
+            memory_id: ID of the starting memory
+            hops: Maximum number of links to follow
+            direction: "out" (links of the note), "in" (notes linking to it) or "both"
+            
+        Returns:
+            Optional[List[MemoryNote]]: Reached notes, nearest first, or None if
+            the memory does not exist
+        """
+        if memory_id not in self.memories:
+            return None
+        reached = self.link_graph.expand([memory_id], hops, direction)
+        return [self.memories[other] for other in reached if other in self.memories]
+    
+    @staticmethod
+    def _chroma_ranked_lists(chroma_results: Dict[str, Any], count: int) -> List[List[tuple]]:
+        """Turn a ChromaDB query result into one (id, distance) list per query"""
+        chroma_lists = []
+        for i in range(count):
+            ids = chroma_results['ids'][i] if i < len(chroma_results.get('ids') or []) else []
+            distances = chroma_results['distances'][i] if i < len(chroma_results.get('distances') or []) else []
+            chroma_lists.append([
+                (doc_id, distances[j] if j < len(distances or []) else 0.5) for j, doc_id in enumerate(ids or [])
+            ])
+        return chroma_lists
+        
+    def _build_evolution_patch(self, memory_id: str, decision: Dict[str, Any],
+                               neighbor_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Translate an evolution decision into field changes addressed by memory ID
+        
+        Suggested connections and neighbor updates are checked against the store
+        with dict lookups, so IDs the LLM made up or that were deleted meanwhile
+        are dropped, and the cost does not depend on the number of memories.
+        
+        Args:
+            memory_id: ID of the evolving note
+            decision: Parsed evolution response from the LLM
+            neighbor_ids: IDs of the neighbors shown to the LLM, in prompt order
+            
+        Returns:
+            Dict mapping memory IDs to their changes ("tags", "context", "add_links");
+            later actions override earlier ones for the same field
+        """
+        def as_list(value):
+            if isinstance(value, list):
+                return value
+            return [value] if value else []
+        
+        patch: Dict[str, Dict[str, Any]] = {}
+        for action in as_list(decision.get("actions", [])):
+            if action == "strengthen":
+                connections = [
+                    connection for connection in as_list(decision.get("suggested_connections", []))
+                    if isinstance(connection, str) and connection != memory_id and connection in self.memories
+                ]
+                changes = patch.setdefault(memory_id, {})
+                changes["add_links"] = connections
+                changes["tags"] = as_list(decision.get("tags_to_update", []))
+                
+            elif action == "update_neighbor":
+                contexts = as_list(decision.get("new_context_neighborhood", []))
+                tags_per_neighbor = as_list(decision.get("new_tags_neighborhood", []))
+                # The i-th entries describe the i-th neighbor in the prompt
+                for neighbor_id, context, tags in zip(neighbor_ids, contexts, tags_per_neighbor):
+                    if neighbor_id not in self.memories:
+                        logger.warning(f"Skipping evolution of unknown neighbor {neighbor_id}")
+                        continue
+                    changes = patch.setdefault(neighbor_id, {})
+                    changes["tags"] = as_list(tags)
+                    changes["context"] = context if isinstance(context, str) else str(context)
+        return patch
+    
+    def _apply_evolution_patch(self, patch: Dict[str, Dict[str, Any]]) -> List[MemoryNote]:
+        """Apply evolution changes to every note in the patch, or to none of them
+        
+        Updated copies of the notes are built first and recorded in the durable
+        store as one evolution record; only then are they swapped into the
+        memory map, so a failed write leaves every note unchanged. They are
+        swapped in before a snapshot is taken, so a snapshot never loses them. The updated
+        notes are re-indexed right away in the metadata, link and retriever
+        indexes. The caller holds the locks of every note in the patch.
+        
+        Args:
+            patch: Changes per memory ID, as built by _build_evolution_patch()
+            
+        Returns:
+            List[MemoryNote]: The updated notes (empty if nothing was applied)
+        """
+        updated = []
+        for memory_id, changes in patch.items():
+            current = self.memories.get(memory_id)
+            if current is None:
+                continue
+            data = current.to_dict()
+            if "tags" in changes:
+                data["tags"] = list(changes["tags"])
+            if "context" in changes:
+                data["context"] = changes["context"]
+            if changes.get("add_links"):
+                existing = list(data["links"] or [])
+                data["links"] = existing + [link for link in changes["add_links"] if link not in existing]
+            updated.append(MemoryNote.from_dict(data))
+        if not updated:
+            return []
+        
+        try:
+            # Swapped in before any snapshot the write triggers, so the snapshot includes them
+            self._commit("evolve", updated)
+        except Exception as e:
+            logger.error(f"Error recording memory evolution, leaving notes unchanged: {e}")
+            return []
+        for note in updated:
+            self._index_metadata(note)
+            if patch[note.id].get("add_links"):
+                self.link_graph.add_links(note.id, self._link_ids(patch[note.id]["add_links"]))
         
+        try:
+            reindexed = self._reindex_notes(updated)
+        except Exception as e:
+            logger.error(f"Error re-indexing evolved memories: {e}")
+            reindexed = False
+        if not reindexed:
+            # Leave them to the next consolidation pass
+            with self._state_lock:
+                self._dirty_ids.update(note.id for note in updated)
+        return updated
+    
     def _process_memory_evolution(self, note: MemoryNote) -> bool:
         """Process potential memory evolution for a new note.
         
@@ -762,7 +1634,8 @@ class AgenticMemorySystem:
         if disable_chromadb or self.chroma_retriever is None or disable_llm:
             return False
         # Get nearest neighbors
-        neighbors = self.search(note.content, k=5)
+        with span("evolution_search"):
+            neighbors = self.search(note.content, k=5)
         if not neighbors:
             return False
             
@@ -789,9 +1662,15 @@ class AgenticMemorySystem:
         # Add an explicit instruction to avoid Markdown formatting
         prompt += "\n\nIMPORTANT: Return ONLY the JSON object with no Markdown formatting, code blocks, or backticks."
         
-        response = self.llm_controller.llm.get_completion(
-            prompt,response_format={"type": "json_object"}
-        )
+        try:
+            with llm_purpose("evolution"), span("evolution_llm"):
+                response = self.llm_controller.llm.get_completion_with_timeout(
+                    prompt, response_format={"type": "json_object"}, timeout=EVOLUTION_TIMEOUT
+                )
+        except Exception as e:
+            LLM_ERRORS.labels("evolution").inc()
+            logger.warning(f"LLM timeout or error during evolution: {e}")
+            return False
         try:
             # Strip any Markdown code fences from the response
             cleaned_response = strip_markdown_code_fences(response)
@@ -841,75 +1720,18 @@ class AgenticMemorySystem:
             if isinstance(should_evolve, str):
                 should_evolve = should_evolve.lower() == "true"
                 
-            if should_evolve:
-                # Get actions with safe fallback
-                actions = response_json.get("actions", [])
-                if not isinstance(actions, list):
-                    actions = [actions] if actions else []
-                    
-                for action in actions:
-                    if action == "strengthen":
-                        # Get values with safe fallbacks
-                        suggest_connections = response_json.get("suggested_connections", [])
-                        new_tags = response_json.get("tags_to_update", [])
-                        
-                        # Ensure they're lists
-                        if not isinstance(suggest_connections, list):
-                            suggest_connections = [suggest_connections] if suggest_connections else []
-                        if not isinstance(new_tags, list):
-                            new_tags = [new_tags] if new_tags else []
-                            
-                        # Update the memory
-                        note.links.extend(suggest_connections)
-                        note.tags = new_tags
-                        
-                    elif action == "update_neighbor":
-                        # Get values with safe fallbacks
-                        new_context_neighborhood = response_json.get("new_context_neighborhood", [])
-                        new_tags_neighborhood = response_json.get("new_tags_neighborhood", [])
-                        
-                        # Ensure they're lists
-                        if not isinstance(new_context_neighborhood, list):
-                            new_context_neighborhood = [new_context_neighborhood] if new_context_neighborhood else []
-                        if not isinstance(new_tags_neighborhood, list):
-                            new_tags_neighborhood = [new_tags_neighborhood] if new_tags_neighborhood else []
-                        
-                        noteslist = list(self.memories.values())
-                        notes_id = list(self.memories.keys())
-                        
-                        # Create a mapping from neighbor ID to its index in the memory list
-                        indices = []
-                        for neighbor_id in neighbor_ids:
-                            if neighbor_id in notes_id:
-                                indices.append(notes_id.index(neighbor_id))
-                            else:
-                                indices.append(-1)  # Invalid index as a fallback
-                        
-                        # Make sure we have valid indices to work with
-                        if not indices:
-                            logger.warning("No valid memory indices found for evolution")
-                            continue
-                        
-                        # Make sure we don't go out of bounds
-                        max_updates = min(len(indices), len(new_tags_neighborhood), len(new_context_neighborhood))
-                        
-                        for i in range(max_updates):
-                            # find some memory
-                            tags = new_tags_neighborhood[i]
-                            context = new_context_neighborhood[i]
-                            memorytmp_idx = indices[i]
-                            
-                            # Check if index is valid
-                            if memorytmp_idx >= 0 and memorytmp_idx < len(noteslist):
-                                notetmp = noteslist[memorytmp_idx]
-                                # add tag to memory - ensure tags is a list
-                                if not isinstance(tags, list):
-                                    tags = [tags] if tags else []
-                                notetmp.tags = tags
-                                notetmp.context = context
-                                self.memories[notes_id[memorytmp_idx]] = notetmp
-                            else:
-                                logger.warning(f"Invalid memory index {memorytmp_idx}")
+            # Apply the decision under the locks of the note and its neighbors; with
+            # background evolution the note may have been deleted in the meantime
+            with self._note_locks.hold([note.id] + neighbor_ids), span("evolution_apply") as current:
+                if note.id not in self.memories:
+                    return False
+                if should_evolve:
+                    patch = self._build_evolution_patch(note.id, response_json, neighbor_ids)
+                    if patch:
+                        self._apply_evolution_patch(patch)
+                        if current is not None:
+                            current.set(updated_notes=len(patch))
+            annotate(should_evolve=bool(should_evolve))
             return should_evolve
             
         except (json.JSONDecodeError, KeyError, Exception) as e:
@@ -0,0 +1,190 @@
+"""
+In-memory metadata indexes for filtered search.
+
+Tags and categories are indexed as inverted indexes (value -> set of memory
+IDs), and creation timestamps as a sorted list, so a filter such as "tag
+project-x, created this week" resolves to a set of memory IDs without
+scanning every note. The retrievers then rank only those IDs, instead of
+post-filtering a top-k that may contain no matching notes at all.
+"""
+import bisect
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+TimeBound = Union[str, int, datetime, None]
+
+
+def timestamp_key(value: TimeBound, upper: bool = False) -> Optional[int]:
+    """Convert a timestamp to a sortable YYYYMMDDHHMM integer.
+
+    Args:
+        value: A datetime, or a YYYYMMDD[HH[MM]] string or integer (separators
+            such as '-', ':' and 'T' are ignored)
+        upper: Pad a partial timestamp to the end of its period rather than the
+            start, so `until="20240131"` includes the whole day
+
+    Returns:
+        Optional[int]: The key, or None if value is None or not a timestamp
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(value.strftime("%Y%m%d%H%M"))
+    digits = "".join(ch for ch in str(value) if ch.isdigit())[:12]
+    if len(digits) < 8:
+        return None
+    # Fill the missing hour and minute digits
+    padding = "2359"[len(digits) - 8:] if upper else "0000"[len(digits) - 8:]
+    return int(digits + padding)
+
+
+def parse_time_bound(value: TimeBound, upper: bool = False) -> Optional[int]:
+    """Key of a `since` or `until` filter bound.
+
+    Unlike timestamp_key, which skips notes with unusable timestamps, a
+    bound that is not a timestamp is an error rather than no filter.
+
+    Raises:
+        ValueError: If value is neither None, a datetime nor a valid
+            YYYYMMDD[HH[MM]] date
+    """
+    key = timestamp_key(value, upper)
+    if value is None:
+        return None
+    try:
+        if key is None:
+            raise ValueError
+        datetime.strptime(str(key), "%Y%m%d%H%M")
+    except ValueError:
+        raise ValueError(f"not a YYYYMMDD[HHMM] timestamp: {value!r}") from None
+    return key
+
+
+class MetadataIndex:
+    """Inverted indexes on tags and category plus a sorted timestamp index"""
+
+    def __init__(self):
+        self.tags: Dict[str, Set[str]] = {}
+        self.categories: Dict[str, Set[str]] = {}
+        self._times: List[int] = []  # Sorted timestamp keys
+        self._time_ids: List[str] = []  # Memory ID for each entry of _times
+        self._entries: Dict[str, Tuple[Tuple[str, ...], str, Optional[int]]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, memory_id: str, tags: Iterable[str], category: Optional[str], timestamp: TimeBound):
+        """Index a note, replacing any entry stored under the same ID
+
+        Args:
+            memory_id: Memory ID
+            tags: Tags of the note
+            category: Category of the note
+            timestamp: Creation time (YYYYMMDDHHMM)
+        """
+        tags = tuple(dict.fromkeys(tag for tag in tags or [] if tag))
+        key = timestamp_key(timestamp)
+        with self._lock:
+            if self._entries.get(memory_id) == (tags, category, key):
+                return
+            self._remove_locked(memory_id)
+            for tag in tags:
+                self.tags.setdefault(tag, set()).add(memory_id)
+            if category:
+                self.categories.setdefault(category, set()).add(memory_id)
+            if key is not None:
+                # Timestamps mostly arrive in order, so this is usually an append
+                position = bisect.bisect_right(self._times, key)
+                self._times.insert(position, key)
+                self._time_ids.insert(position, memory_id)
+            self._entries[memory_id] = (tags, category, key)
+
+    def remove(self, memory_id: str) -> bool:
+        """Drop a note from the indexes
+
+        Returns:
+            bool: True if the note was indexed
+        """
+        with self._lock:
+            return self._remove_locked(memory_id)
+
+    def _remove_locked(self, memory_id: str) -> bool:
+        entry = self._entries.pop(memory_id, None)
+        if entry is None:
+            return False
+        tags, category, key = entry
+        for tag in tags:
+            self._discard(self.tags, tag, memory_id)
+        if category:
+            self._discard(self.categories, category, memory_id)
+        if key is not None:
+            position = bisect.bisect_left(self._times, key)
+            while position < len(self._times) and self._times[position] == key:
+                if self._time_ids[position] == memory_id:
+                    del self._times[position]
+                    del self._time_ids[position]
+                    break
+                position += 1
+        return True
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], value: str, memory_id: str):
+        ids = index.get(value)
+        if ids is not None:
+            ids.discard(memory_id)
+            if not ids:
+                del index[value]
+
+    def filter(self,
+               tags: Optional[Iterable[str]] = None,
+               category: Optional[str] = None,
+               since: TimeBound = None,
+               until: TimeBound = None) -> Optional[Set[str]]:
+        """Memory IDs matching every given filter
+
+        Args:
+            tags: Tags the note must all carry
+            category: Category the note must belong to
+            since: Earliest creation time, inclusive
+            until: Latest creation time, inclusive
+
+        Returns:
+            Optional[Set[str]]: Matching IDs, or None if no filter was given
+
+        Raises:
+            ValueError: If since or until is not a timestamp
+        """
+        tags = [tag for tag in tags or [] if tag]
+        since_key = parse_time_bound(since)
+        until_key = parse_time_bound(until, upper=True)
+        if not tags and not category and since_key is None and until_key is None:
+            return None
+
+        with self._lock:
+            sets = [self.tags.get(tag, set()) for tag in tags]
+            if category:
+                sets.append(self.categories.get(category, set()))
+            # Intersect starting from the smallest set
+            sets.sort(key=len)
+            result = set(sets[0]) if sets else None
+            for ids in sets[1:]:
+                if not result:
+                    break
+                result &= ids
+
+            if since_key is not None or until_key is not None:
+                start = bisect.bisect_left(self._times, since_key) if since_key is not None else 0
+                end = bisect.bisect_right(self._times, until_key) if until_key is not None else len(self._times)
+                if result is None:
+                    result = set(self._time_ids[start:end])
+                elif len(result) < end - start:
+                    # Check each candidate's own timestamp instead of materializing the range
+                    low = since_key if since_key is not None else float("-inf")
+                    high = until_key if until_key is not None else float("inf")
+                    result = {memory_id for memory_id in result
+                              if self._entries[memory_id][2] is not None and low <= self._entries[memory_id][2] <= high}
+                else:
+                    result &= set(self._time_ids[start:end])
+            return result
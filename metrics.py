@@ -0,0 +1,342 @@
+"""
+Process-wide metrics in the Prometheus text exposition format.
+
+Counters and histograms are plain in-process objects: recording a value is
+a bucket lookup and a few additions under a per-series lock, so they can
+sit on the hot path. Gauges such as queue depths and cache sizes are not
+recorded at all; collectors read them from stats() when /metrics is
+scraped.
+
+The metrics used by the memory system are defined at the bottom of this
+module so every component records into the same registry.
+"""
+import bisect
+import contextlib
+import contextvars
+import functools
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond index lookups to LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Timer:
+    """Context manager that observes its elapsed time into a histogram series"""
+
+    __slots__ = ("_series", "_start")
+
+    def __init__(self, series: "_HistogramSeries"):
+        self._series = series
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._series.observe(time.perf_counter() - self._start)
+        return False
+
+
+class _CounterSeries:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramSeries:
+    __slots__ = ("_upper_bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self._upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+class _Metric:
+    """A named metric with one series per combination of label values"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._series[()] = self._new_series()
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """The series for the given label values, created on first use"""
+        key = tuple(str(value) for value in values)
+        series = self._series.get(key)
+        if series is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                series = self._series.setdefault(key, self._new_series())
+        return series
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return list(self._series.items())
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def _new_series(self):
+        return _CounterSeries()
+
+    def inc(self, amount: float = 1.0):
+        self._series[()].inc(amount)
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(series.value)}"
+                for key, series in self._items()]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.upper_bounds = tuple(sorted(float(bound) for bound in buckets if not math.isinf(bound)))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_series(self):
+        return _HistogramSeries(self.upper_bounds)
+
+    def observe(self, value: float):
+        self._series[()].observe(value)
+
+    def time(self) -> _Timer:
+        """Context manager observing the duration of its block"""
+        return self._series[()].time()
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, series in self._items():
+            with series._lock:
+                counts, total, count = list(series.counts), series.sum, series.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.upper_bounds + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+# A collector returns gauge samples as (name, documentation, value) tuples
+Collector = Callable[[], Iterable[Tuple[str, str, float]]]
+
+
+class MetricsRegistry:
+    """Named counters and histograms plus gauge collectors, rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Collector):
+        """Add a callback producing gauge samples at scrape time"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def unregister_collector(self, collector: Collector):
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for collector in collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                lines.append(f"# Collector failed: {_escape(e)}")
+                continue
+            for name, documentation, value in samples:
+                lines.append(f"# HELP {name} {_escape(documentation)}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def stats_samples(stats: Dict[str, Any], prefix: str = "amem") -> List[Tuple[str, str, float]]:
+    """Flatten a nested stats() dictionary into gauge samples.
+
+    Numeric leaves become `<prefix>_<key>_<subkey>` gauges; None, strings and
+    other values are skipped.
+
+    Args:
+        stats: Dictionary such as AgenticMemorySystem.stats()
+        prefix: Metric name prefix
+
+    Returns:
+        List of (name, documentation, value) tuples
+    """
+    samples = []
+
+    def walk(value: Any, path: List[str]):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                walk(child, path + [str(key)])
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            name = "_".join([prefix] + path)
+            samples.append((name, f"stats() value {'.'.join(path)}", float(value)))
+
+    walk(stats, [])
+    return samples
+
+
+def timed(histogram: Histogram, *labels: str, errors: Optional[Counter] = None):
+    """Decorator observing the duration of each call and counting raised exceptions.
+
+    Args:
+        histogram: Histogram to observe durations into
+        *labels: Label values of the histogram and error counter series
+        errors: Optional counter incremented when the call raises
+    """
+    def decorator(func):
+        series = histogram.labels(*labels)
+        error_series = errors.labels(*labels) if errors is not None else None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                if error_series is not None:
+                    error_series.inc()
+                raise
+            finally:
+                series.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+REGISTRY = MetricsRegistry()
+
+OPERATION_SECONDS = REGISTRY.histogram(
+    "amem_operation_seconds", "Duration of memory system operations", ["operation"])
+OPERATION_ERRORS = REGISTRY.counter(
+    "amem_operation_errors_total", "Memory system operations that raised an exception", ["operation"])
+SEARCH_STAGE_SECONDS = REGISTRY.histogram(
+    "amem_search_stage_seconds", "Time spent in each search stage per batch of queries", ["stage"])
+LLM_SECONDS = REGISTRY.histogram(
+    "amem_llm_request_seconds", "LLM backend request latency, including timeouts (cache misses only)", ["purpose"])
+LLM_ERRORS = REGISTRY.counter(
+    "amem_llm_errors_total", "LLM completions that failed or timed out", ["purpose"])
+ENCODE_SECONDS = REGISTRY.histogram(
+    "amem_encode_seconds", "Embedding model time per encode batch (cache misses only)")
+ENCODED_TEXTS = REGISTRY.counter(
+    "amem_encoded_texts_total", "Texts encoded by the embedding model (cache misses only)")
+CHROMA_WRITE_SECONDS = REGISTRY.histogram(
+    "amem_chroma_write_seconds", "ChromaDB write latency", ["operation"])
+EVOLUTIONS = REGISTRY.counter(
+    "amem_evolutions_total", "Evolution decisions for new notes", ["result"])
+CONSOLIDATED_NOTES = REGISTRY.counter(
+    "amem_consolidated_notes_total", "Notes re-indexed by consolidation passes")
+
+
+# Purpose label of the LLM requests made in the current context
+_LLM_PURPOSE = contextvars.ContextVar("llm_purpose", default="other")
+
+
+@contextlib.contextmanager
+def llm_purpose(purpose: str):
+    """Label the LLM requests made inside the block with `purpose` in amem_llm_request_seconds"""
+    token = _LLM_PURPOSE.set(purpose)
+    try:
+        yield
+    finally:
+        _LLM_PURPOSE.reset(token)
+
+
+def time_llm_request() -> _Timer:
+    """Timer for one LLM backend request, labelled with the purpose set by llm_purpose()"""
+    return LLM_SECONDS.labels(_LLM_PURPOSE.get()).time()
+
+
+def timed_operation(operation: str):
+    """Decorator recording a memory system operation in amem_operation_seconds"""
+    return timed(OPERATION_SECONDS, operation, errors=OPERATION_ERRORS)
@@ -9,6 +9,11 @@ class MemoryCreateRequest(BaseModel):
     category: Optional[str] = Field(None, description="Classification category")
     timestamp: Optional[str] = Field(None, description="Creation time in format YYYYMMDDHHMM")
 
+class MemoryBatchCreateRequest(BaseModel):
+    """Request model for creating several memories at once"""
+    memories: List[MemoryCreateRequest] = Field(..., description="Memories to create")
+    evolve: bool = Field(True, description="Whether to run memory evolution for the new memories")
+
 class MemoryUpdateRequest(BaseModel):
     """Request model for updating an existing memory"""
     content: Optional[str] = Field(None, description="The main text content of the memory")
@@ -16,6 +21,7 @@ class MemoryUpdateRequest(BaseModel):
     category: Optional[str] = Field(None, description="Classification category")
     context: Optional[str] = Field(None, description="The broader context or domain of the memory")
     keywords: Optional[List[str]] = Field(None, description="Key terms extracted from the content")
+    links: Optional[List[str]] = Field(None, description="IDs of related memories (replaces the existing links)")
 
 class MemoryResponse(BaseModel):
     """Response model for memory data"""
@@ -30,6 +36,15 @@ class MemoryResponse(BaseModel):
     retrieval_count: int = Field(0, description="Number of times this memory has been accessed")
     links: List[str] = Field(default_factory=list, description="References to related memories")
 
+class MemoryNeighborsResponse(BaseModel):
+    """Response model for the linked neighbors of a memory"""
+    id: str = Field(..., description="ID of the starting memory")
+    neighbors: List[MemoryResponse] = Field(default_factory=list, description="Linked memories, nearest first")
+
+class MemoryBatchCreateResponse(BaseModel):
+    """Response model for batch memory creation"""
+    memories: List[MemoryResponse] = Field(default_factory=list, description="The created memories, in request order")
+
 class MemorySearchRequest(BaseModel):
     """Request model for searching memories"""
     query: str = Field(..., description="Search query text")
@@ -41,11 +56,12 @@ class MemorySearchResult(BaseModel):
     content: str = Field(..., description="Memory content")
     context: str = Field(..., description="Memory context")
     keywords: List[str] = Field(default_factory=list, description="Memory keywords")
-    score: float = Field(..., description="Similarity score")
+    score: float = Field(..., description="Fused relevance score (higher is better)")
 
 class MemorySearchResponse(BaseModel):
     """Response model for memory search"""
     results: List[MemorySearchResult] = Field(default_factory=list, description="Search results")
+    timings: Optional[Dict[str, float]] = Field(None, description="Milliseconds spent per search stage, if requested")
 
 class DeleteResponse(BaseModel):
     """Response model for delete operations"""
@@ -0,0 +1,117 @@
+"""
+Fusion of ranked result lists from several retrievers.
+
+Retrievers score on different scales: ChromaDB returns distances (lower is
+better), the embedding retriever cosine similarities and the lexical
+retriever unbounded BM25 scores. Appending their lists and truncating
+leaves scores that cannot be compared, so results are fused instead:
+
+- reciprocal rank fusion (RRF) uses only ranks: a document scores
+  sum(weight / (rrf_k + rank)) over the lists it appears in
+- weighted score fusion min-max normalizes each list to [0, 1] (flipping
+  distances) and sums the weighted normalized scores
+
+Both return (id, score) pairs ordered by a fused score where higher is
+better. All contributions are accumulated in a single bincount pass.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+FUSION_METHODS = ("rrf", "weighted")
+
+# Conventional RRF constant; dampens the advantage of the very top ranks
+DEFAULT_RRF_K = 60
+
+
+def _fuse(ranked_lists: Sequence[Sequence[Tuple[str, float]]],
+          contributions: List[np.ndarray],
+          top_k: Optional[int]) -> List[Tuple[str, float]]:
+    """Sum per-entry contributions by ID and return the top IDs, best first.
+
+    Ties keep the order in which IDs were first seen, so the earlier lists win.
+    """
+    positions: Dict[str, int] = {}
+    index = []
+    for results in ranked_lists:
+        for doc_id, _ in results:
+            index.append(positions.setdefault(doc_id, len(positions)))
+    if not positions:
+        return []
+    scores = np.bincount(np.asarray(index, dtype=np.int64),
+                         weights=np.concatenate(contributions), minlength=len(positions))
+    order = np.argsort(-scores, kind="stable")
+    if top_k is not None:
+        order = order[:top_k]
+    ids = list(positions)
+    return [(ids[i], float(scores[i])) for i in order]
+
+
+def reciprocal_rank_fusion(ranked_lists: Sequence[Sequence[Tuple[str, float]]],
+                           weights: Optional[Sequence[float]] = None,
+                           rrf_k: int = DEFAULT_RRF_K,
+                           top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+    """Fuse ranked lists by reciprocal rank.
+
+    Args:
+        ranked_lists: One list of (id, score) pairs per retriever, best first;
+            scores are ignored
+        weights: Optional weight per list (default 1.0 each)
+        rrf_k: Rank offset; larger values flatten the contribution of top ranks
+        top_k: Number of fused results to return, or None for all
+
+    Returns:
+        List[Tuple[str, float]]: (id, fused score) pairs, best first
+    """
+    weights = weights if weights is not None else [1.0] * len(ranked_lists)
+    contributions = [
+        weight / (rrf_k + np.arange(1, len(results) + 1, dtype=np.float64))
+        for results, weight in zip(ranked_lists, weights)
+    ]
+    return _fuse(ranked_lists, contributions, top_k)
+
+
+def weighted_score_fusion(ranked_lists: Sequence[Sequence[Tuple[str, float]]],
+                          weights: Optional[Sequence[float]] = None,
+                          higher_is_better: Optional[Sequence[bool]] = None,
+                          top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+    """Fuse lists by weighted sums of min-max normalized scores.
+
+    Args:
+        ranked_lists: One list of (id, score) pairs per retriever
+        weights: Optional weight per list (default 1.0 each)
+        higher_is_better: Score direction per list; False for distances
+            (default True for every list)
+        top_k: Number of fused results to return, or None for all
+
+    Returns:
+        List[Tuple[str, float]]: (id, fused score) pairs, best first
+    """
+    weights = weights if weights is not None else [1.0] * len(ranked_lists)
+    higher_is_better = higher_is_better if higher_is_better is not None else [True] * len(ranked_lists)
+    contributions = []
+    for results, weight, higher in zip(ranked_lists, weights, higher_is_better):
+        scores = np.fromiter((score for _, score in results), dtype=np.float64, count=len(results))
+        if len(scores) == 0:
+            contributions.append(scores)
+            continue
+        low, high = scores.min(), scores.max()
+        if high > low:
+            normalized = (scores - low) / (high - low) if higher else (high - scores) / (high - low)
+        else:
+            # A single score, or all equal: every entry is as good as the best
+            normalized = np.ones_like(scores)
+        contributions.append(weight * normalized)
+    return _fuse(ranked_lists, contributions, top_k)
+
+
+def fuse(ranked_lists: Sequence[Sequence[Tuple[str, float]]],
+         method: str = "rrf",
+         weights: Optional[Sequence[float]] = None,
+         higher_is_better: Optional[Sequence[bool]] = None,
+         top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+    """Fuse ranked lists with the named method ("rrf" or "weighted")"""
+    if method == "rrf":
+        return reciprocal_rank_fusion(ranked_lists, weights=weights, top_k=top_k)
+    if method == "weighted":
+        return weighted_score_fusion(ranked_lists, weights=weights, higher_is_better=higher_is_better, top_k=top_k)
+    raise ValueError(f"Fusion method must be one of: {', '.join(FUSION_METHODS)}")
@@ -1,20 +1,22 @@
-from typing import List, Dict, Any, Optional, Union
-from sentence_transformers import SentenceTransformer
-from rank_bm25 import BM25Okapi
+from typing import List, Dict, Any, Iterable, Optional, Union
 import nltk
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 import chromadb
 from chromadb.config import Settings
-import pickle
 from nltk.tokenize import word_tokenize
 import os
+import re
 import logging
 import time
 import sys
+import threading
 
-# Import custom embedding function
+# Import custom embedding function and the shared embedding service
 from custom_embedding import LocalCacheEmbeddingFunction
+from embedding_service import get_embedding_service, HASHING_MODEL
+from embedding_cache import text_hash
+from vector_index import make_index
+from metrics import CHROMA_WRITE_SECONDS
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -65,12 +67,35 @@ def simple_tokenize(text):
             return text.split()
 
 class SimpleEmbeddingRetriever:
-    """Simple retriever using sentence embeddings"""
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
+    """Simple retriever using sentence embeddings
+    
+    Embeddings live in a preallocated, contiguous float32 matrix whose capacity
+    doubles when it fills up, so appends are amortized O(1). Deleted rows are
+    tombstoned instead of shifting the matrix, and are reclaimed by compact().
+    Rows are L2-normalized on insert, so cosine similarity is a plain dot
+    product and a batch of queries is scored with a single matrix product.
+    
+    The model comes from the process-wide embedding service, and callers that
+    already encoded a document (for ChromaDB) can pass the vector in directly.
+    
+    The retriever is thread-safe: encoding happens outside the lock, and only
+    arena reads and writes are serialized.
+    
+    A vector index (see vector_index.py) picks the rows scored per query: the
+    default IVF index searches exactly until the store is large enough to
+    bucket, then scores only the rows near the query.
+    
+    save() writes the live rows with a hash of their documents, and
+    load_vectors() adds them back after a restart for every document that
+    is unchanged, so only new or edited documents are re-encoded.
+    """
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', initial_capacity: int = 1024, index="ivf"):
         """Initialize the embedding retriever with the specified model
         
         Args:
             model_name: Name of the sentence transformer model to use
+            initial_capacity: Number of rows to preallocate for embeddings
+            index: "ivf", "exact" (brute force), or an index instance from vector_index
         """
         logger.info(f"Initializing SimpleEmbeddingRetriever with model: {model_name}")
         
@@ -78,93 +103,299 @@ class SimpleEmbeddingRetriever:
         if not check_directory_writable(CACHE_DIR):
             logger.warning(f"Cache directory {CACHE_DIR} is not writable. Model downloads may fail.")
         
+        self.initial_capacity = max(1, initial_capacity)
+        self.documents = []  # Document text per row (None for deleted rows)
+        self.row_ids = []  # Document ID per row (None if added without an ID)
+        self.id_to_row = {}  # Reverse lookup for in-place updates and deletes
+        self._matrix = None  # Preallocated (capacity, dim) float32 arena of unit rows
+        self._alive = None  # False for tombstoned rows
+        self._count = 0  # Number of rows in use, including tombstones
+        self._deleted = 0  # Number of tombstoned rows
+        self._lock = threading.RLock()  # Guards the arena and row bookkeeping
+        self.index = make_index(index) if isinstance(index, str) else index
+        
+        # Get the shared model (falls back to hashed vectors if it cannot load)
+        self.embedder = get_embedding_service(model_name)
+        self.model = self.embedder.model
+            
+    @property
+    def embeddings(self) -> Optional[np.ndarray]:
+        """View of the embedding rows in use (no copy)"""
+        if self._matrix is None:
+            return None
+        return self._matrix[:self._count]
+        
+    def __len__(self) -> int:
+        """Number of live (non-deleted) documents"""
+        return self._count - self._deleted
+        
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize rows in place (zero rows stay zero) and return them"""
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+        
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts into a float32 matrix, falling back to zero vectors on error"""
         try:
-            # Initialize the model
-            self.model = SentenceTransformer(model_name)
-            self.documents = []
-            self.embeddings = None
-            self.embedding_to_id_map = {}  # Track document IDs
-            logger.info(f"Successfully initialized sentence transformer model: {model_name}")
+            return self.embedder.encode(texts)
         except Exception as e:
-            logger.error(f"Error initializing embedding model: {e}")
-            # Instead of crashing, create a fallback embedding function
-            logger.warning("Using fallback embedding approach")
-            self.model = None
-            self.documents = []
-            self.embeddings = None
-            self.embedding_to_id_map = {}
-        
-    def _fallback_encode(self, texts: List[str]) -> np.ndarray:
-        """Simple fallback encoding when model fails to load
-        
-        This creates simple bag-of-words vectors as a fallback
+            logger.error(f"Error encoding document: {e}")
+            dimension = self._matrix.shape[1] if self._matrix is not None else self.embedder.dimension
+            return np.zeros((len(texts), dimension), dtype=np.float32)
+            
+    def _ensure_capacity(self, rows: int, dimension: int):
+        """Grow the arena (doubling its capacity) so that `rows` rows fit"""
+        if self._matrix is None:
+            capacity = max(self.initial_capacity, rows)
+            self._matrix = np.zeros((capacity, dimension), dtype=np.float32)
+            self._alive = np.zeros(capacity, dtype=bool)
+            return
+        capacity = self._matrix.shape[0]
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        matrix = np.zeros((capacity, self._matrix.shape[1]), dtype=np.float32)
+        matrix[:self._count] = self._matrix[:self._count]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._count] = self._alive[:self._count]
+        self._matrix, self._alive = matrix, alive
+        
+    def _append_rows(self, vectors: np.ndarray, documents: List[str], doc_ids: List[Optional[str]]):
+        """Copy encoded vectors into the arena and record their documents and IDs"""
+        with self._lock:
+            self._append_rows_locked(vectors, documents, doc_ids)
+            
+    def _append_rows_locked(self, vectors: np.ndarray, documents: List[str], doc_ids: List[Optional[str]]):
+        """Append rows for new IDs and replace the rows of IDs already in the arena
+        
+        Raises:
+            ValueError: If the vectors do not match the dimension of the arena
         """
-        # Simple word frequency vectors as fallback
-        vectors = []
-        for text in texts:
-            # Create a simple word frequency vector
-            words = simple_tokenize(text.lower())
-            unique_words = set(words)
-            # Very simple vector: just a count for each unique word
-            vector = np.zeros(len(unique_words) or 1)
-            for i, word in enumerate(unique_words):
-                vector[i] = words.count(word)
-            # Normalize
-            norm = np.linalg.norm(vector)
-            if norm > 0:
-                vector = vector / norm
-            vectors.append(vector)
-        
-        # Ensure consistent dimensions by padding
-        max_len = max(v.shape[0] for v in vectors)
-        padded_vectors = []
-        for v in vectors:
-            padded = np.zeros(max_len)
-            padded[:v.shape[0]] = v
-            padded_vectors.append(padded)
-            
-        return np.array(padded_vectors)
-        
-    def add_document(self, document: str, doc_id: str = None):
+        if self._matrix is not None and vectors.shape[1] != self._matrix.shape[1]:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match "
+                             f"index dimension {self._matrix.shape[1]}")
+        # Positions to append, with a repeated new ID keeping only its last document
+        appended = {}
+        for i, doc_id in enumerate(doc_ids):
+            row = self.id_to_row.get(doc_id) if doc_id else None
+            if row is not None:
+                self._replace_row_locked(row, vectors[i], documents[i])
+            else:
+                appended.pop(doc_id, None)
+                appended[doc_id or i] = i
+        if not appended:
+            return
+        positions = list(appended.values())
+        start = self._count
+        end = start + len(positions)
+        self._ensure_capacity(end, vectors.shape[1])
+        self._matrix[start:end] = vectors[positions]
+        self._normalize(self._matrix[start:end])
+        self._alive[start:end] = True
+        for offset, i in enumerate(positions):
+            self.documents.append(documents[i])
+            self.row_ids.append(doc_ids[i])
+            if doc_ids[i]:
+                self.id_to_row[doc_ids[i]] = start + offset
+        self._count = end
+        self.index.add(np.arange(start, end), self._matrix[start:end], all_vectors=self._matrix[:end])
+        
+    def _replace_row_locked(self, row: int, vector: np.ndarray, document: str):
+        """Overwrite the vector and document of an existing row in place"""
+        self.documents[row] = document
+        self._matrix[row] = vector
+        self._normalize(self._matrix[row])
+        self.index.update(row, self._matrix[row])
+        
+    def add_document(self, document: str, doc_id: str = None, embedding: Optional[np.ndarray] = None):
         """Add a document to the retriever.
         
         Args:
             document: Text content to add
             doc_id: Optional document ID to track
+            embedding: Optional precomputed embedding of the document
+            
+        Raises:
+            ValueError: If the embedding does not match the dimension of the index
+        """
+        vectors = self._encode([document]) if embedding is None else np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        self._append_rows(vectors, [document], [doc_id])
+        
+    def add_documents(self, documents: List[str], doc_ids: List[str], embeddings: Optional[np.ndarray] = None):
+        """Add several documents with a single batched encode.
+        
+        Documents whose ID is already indexed replace it in place, as with
+        add_document() and upsert_document().
+        
+        Args:
+            documents: Text content to add
+            doc_ids: Document ID for each document
+            embeddings: Optional precomputed embeddings, one row per document
+            
+        Raises:
+            ValueError: If the embeddings do not match the dimension of the index
+        """
+        if not documents:
+            return
+        vectors = self._encode(documents) if embeddings is None else np.asarray(embeddings, dtype=np.float32)
+        self._append_rows(vectors, documents, doc_ids)
+        
+    def upsert_document(self, document: str, doc_id: str, embedding: Optional[np.ndarray] = None):
+        """Replace the document stored under doc_id, or add it if it is new.
+        
+        Args:
+            document: Text content to store
+            doc_id: Document ID to update
+            embedding: Optional precomputed embedding of the document
+            
+        Raises:
+            ValueError: If the embedding does not match the dimension of the index
+        """
+        vector = self._encode([document])[0] if embedding is None else np.asarray(embedding, dtype=np.float32).reshape(-1)
+        self._append_rows(vector.reshape(1, -1), [document], [doc_id])
+        
+    def delete_document(self, doc_id: str) -> bool:
+        """Tombstone the document stored under doc_id.
+        
+        Args:
+            doc_id: Document ID to delete
+            
+        Returns:
+            bool: True if the document was found
+        """
+        with self._lock:
+            row = self.id_to_row.pop(doc_id, None)
+            if row is None:
+                return False
+            self._alive[row] = False
+            self.documents[row] = None
+            self.row_ids[row] = None
+            self._deleted += 1
+            
+            # Reclaim space once tombstones make up most of the arena
+            if self._deleted > max(self.initial_capacity, self._count // 2):
+                self.compact()
+            return True
+        
+    def compact(self):
+        """Drop tombstoned rows and renumber the remaining ones"""
+        with self._lock:
+            if self._deleted == 0:
+                return
+            live_rows = np.flatnonzero(self._alive[:self._count])
+            mapping = np.full(self._count, -1, dtype=np.int64)
+            mapping[live_rows] = np.arange(len(live_rows))
+            matrix = self._matrix[live_rows]
+            documents = [self.documents[row] for row in live_rows]
+            row_ids = [self.row_ids[row] for row in live_rows]
+        
+            self._matrix = None
+            self.documents, self.row_ids, self.id_to_row = [], [], {}
+            self._count = self._deleted = 0
+            if len(live_rows):
+                self._ensure_capacity(len(live_rows), matrix.shape[1])
+                self._matrix[:len(live_rows)] = matrix
+                self._alive[:len(live_rows)] = True
+                self.documents, self.row_ids = documents, row_ids
+                self.id_to_row = {doc_id: row for row, doc_id in enumerate(row_ids) if doc_id}
+                self._count = len(live_rows)
+            self.index.remap(mapping)
+            
+    def save(self, path: str) -> int:
+        """Write the live rows, their IDs and document hashes to an .npz file
+        
+        The file is written to a temporary path, fsynced and renamed into
+        place. Rows without an ID and zero rows (failed encodes) are left
+        out, and nothing is written while the model is unavailable, so
+        fallback vectors are never reused once the model loads again.
+        
+        Args:
+            path: Destination file
+            
+        Returns:
+            int: Number of rows written
         """
-        doc_index = len(self.documents)
-        self.documents.append(document)
+        if self.embedder.model is None and self.embedder.model_name != HASHING_MODEL:
+            return 0
+        with self._lock:
+            if self._matrix is None:
+                return 0
+            rows = [row for row in np.flatnonzero(self._alive[:self._count]) if self.row_ids[row]]
+            vectors = self._matrix[rows]
+            ids = [self.row_ids[row] for row in rows]
+            documents = [self.documents[row] for row in rows]
+        keep = np.flatnonzero(vectors.any(axis=1))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f,
+                     model=np.array(self.embedder.model_name),
+                     ids=np.array([ids[i] for i in keep], dtype=str),
+                     hashes=np.array([text_hash(documents[i]) for i in keep], dtype=str),
+                     vectors=vectors[keep])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return len(keep)
         
-        if doc_id:
-            self.embedding_to_id_map[doc_index] = doc_id
+    def load_vectors(self, path: str, documents: Dict[str, str]) -> List[str]:
+        """Add the saved vectors of documents that are unchanged since save()
+        
+        Args:
+            path: File written by save()
+            documents: Document text per ID for every document to index
             
-        # Update embeddings
+        Returns:
+            List[str]: IDs whose documents were not added (missing from the
+            file, edited since, or the file is unusable); the caller encodes these
+        """
+        if not os.path.exists(path):
+            return list(documents)
         try:
-            if self.model:
-                if len(self.documents) == 1:
-                    self.embeddings = self.model.encode([document])
-                else:
-                    new_embedding = self.model.encode([document])
-                    self.embeddings = np.vstack([self.embeddings, new_embedding])
-            else:
-                # Use fallback encoding
-                if len(self.documents) == 1:
-                    self.embeddings = self._fallback_encode([document])
-                else:
-                    # We need to recalculate all embeddings because dimensions might change
-                    self.embeddings = self._fallback_encode(self.documents)
+            with np.load(path, allow_pickle=False) as data:
+                model = str(data["model"])
+                ids, hashes, vectors = data["ids"].tolist(), data["hashes"].tolist(), data["vectors"]
         except Exception as e:
-            logger.error(f"Error encoding document: {e}")
-            # If encoding fails, ensure dimensions match existing embeddings
-            if self.embeddings is not None:
-                embedding_dim = self.embeddings.shape[1]
-                # Add a zero vector of the same dimension
-                new_embedding = np.zeros((1, embedding_dim))
-                self.embeddings = np.vstack([self.embeddings, new_embedding])
+            logger.warning(f"Ignoring unreadable saved embeddings {path}: {e}")
+            return list(documents)
+        if model != self.embedder.model_name or (len(ids) and vectors.shape[1] != self.embedder.dimension):
+            logger.info(f"Ignoring saved embeddings of model {model} in {path}")
+            return list(documents)
+        
+        saved = {doc_id: (row, digest) for row, (doc_id, digest) in enumerate(zip(ids, hashes))}
+        rows, reused, missing = [], [], []
+        for doc_id, document in documents.items():
+            entry = saved.get(doc_id)
+            if entry is not None and entry[1] == text_hash(document):
+                rows.append(entry[0])
+                reused.append(doc_id)
             else:
-                # First document, create a simple one-dimensional embedding
-                self.embeddings = np.array([[0.0]])
-            
+                missing.append(doc_id)
+        if reused:
+            self.add_documents([documents[doc_id] for doc_id in reused], reused, embeddings=vectors[rows])
+        return missing
+        
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k highest scores, best first, without a full sort"""
+        if k >= len(scores):
+            return np.argsort(-scores, kind="stable")
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top], kind="stable")]
+        
+    def _result(self, row: int, score: float) -> Dict[str, Any]:
+        result = {
+            'content': self.documents[row],
+            'score': float(score)
+        }
+        
+        # Add document ID if available
+        if self.row_ids[row]:
+            result['id'] = self.row_ids[row]
+        return result
+        
     def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """Search for similar documents.
         
@@ -175,50 +406,293 @@ class SimpleEmbeddingRetriever:
         Returns:
             List of dictionaries containing document content and similarity score
         """
-        if not self.documents:
+        return self.search_many([query], top_k)[0]
+        
+    def search_many(self, queries: List[str], top_k: int = 5,
+                    query_embeddings: Optional[np.ndarray] = None,
+                    allowed_ids: Optional[Iterable[str]] = None) -> List[List[Dict[str, Any]]]:
+        """Search for several queries at once.
+        
+        The queries are encoded in one batch. With exact search (or before the
+        IVF index is trained) all of them are scored with a single matrix
+        product; otherwise each query scores its own index candidates. When
+        `allowed_ids` is given, only those documents are scored, exactly.
+        
+        Args:
+            queries: Search queries
+            top_k: Number of results to return per query
+            query_embeddings: Optional precomputed query embeddings, one row per query
+            allowed_ids: Optional IDs to restrict the search to (a metadata pre-filter)
+            
+        Returns:
+            One result list per query, as returned by search()
+        """
+        if not queries:
             return []
+        if len(self) == 0 or top_k <= 0:
+            return [[] for _ in queries]
             
         try:
-            # Get query embedding
-            if self.model:
-                query_embedding = self.model.encode([query])
-            else:
-                query_embedding = self._fallback_encode([query])
-            
-            # Calculate cosine similarities
-            similarities = cosine_similarity(query_embedding, self.embeddings)[0]
-            
-            # Get top k results
-            top_indices = np.argsort(similarities)[-top_k:][::-1]
+            # Get query embeddings
+            if query_embeddings is None:
+                query_embeddings = self._encode(queries)
+            query_embeddings = self._normalize(np.array(query_embeddings, dtype=np.float32).reshape(len(queries), -1))
             
-            results = []
-            for idx in top_indices:
-                result = {
-                    'content': self.documents[idx],
-                    'score': float(similarities[idx])
-                }
-                
-                # Add document ID if available
-                if idx in self.embedding_to_id_map:
-                    result['id'] = self.embedding_to_id_map[idx]
+            with self._lock:
+                if len(self) == 0:
+                    return [[] for _ in queries]
                     
-                results.append(result)
-                
-            return results
+                if allowed_ids is not None:
+                    # Pre-filtered: score the allowed rows for every query in one product
+                    rows = np.fromiter((self.id_to_row[doc_id] for doc_id in allowed_ids if doc_id in self.id_to_row),
+                                       dtype=np.int64)
+                    if len(rows) == 0:
+                        return [[] for _ in queries]
+                    scores = self._matrix[rows] @ query_embeddings.T
+                    k = min(top_k, len(rows))
+                    return [
+                        [self._result(rows[j], scores[j, i]) for j in self._top_k(scores[:, i], k)]
+                        for i in range(len(queries))
+                    ]
+                    
+                candidates = [self.index.candidates(q) for q in query_embeddings]
+                if all(c is None for c in candidates):
+                    # Score every query against every row in one BLAS call
+                    scores = self.embeddings @ query_embeddings.T
+                    scores[~self._alive[:self._count]] = -np.inf
+                    k = min(top_k, len(self))
+                    return [
+                        [self._result(row, scores[row, i]) for row in self._top_k(scores[:, i], k)]
+                        for i in range(len(queries))
+                    ]
+                    
+                results = []
+                for query_embedding, rows in zip(query_embeddings, candidates):
+                    if rows is None:
+                        rows = np.flatnonzero(self._alive[:self._count])
+                    else:
+                        rows = rows[self._alive[rows]]
+                    if len(rows) == 0:
+                        results.append([])
+                        continue
+                    scores = self._matrix[rows] @ query_embedding
+                    top = self._top_k(scores, min(top_k, len(rows)))
+                    results.append([self._result(rows[i], scores[i]) for i in top])
+                return results
         except Exception as e:
             logger.error(f"Error in search: {e}")
+            return [[] for _ in queries]
+
+_BM25_TOKEN_PATTERN = re.compile(r"\w+")
+
+def bm25_tokenize(text: str) -> List[str]:
+    """Lowercased word tokens for the lexical index.
+    
+    A plain regex rather than simple_tokenize: it needs no NLTK data, is fast
+    enough to run on every write, and keeps identifiers such as snake_case
+    names and version numbers as single tokens.
+    """
+    return _BM25_TOKEN_PATTERN.findall(text.lower())
+
+class BM25Retriever:
+    """Lexical retriever backed by an incrementally maintained BM25 inverted index
+    
+    Each term maps to a postings dict of {row: term frequency}, and document
+    lengths live in a growable array, so adding, replacing or deleting a
+    document only touches the postings of its own terms instead of rebuilding
+    the whole index. Rows freed by deletes are reused by later inserts.
+    
+    Queries score only the postings of their terms. Postings are turned into
+    arrays on first use and cached per term until a write touches that term,
+    so repeated queries over a large, mostly stable store avoid per-posting
+    Python work.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75, initial_capacity: int = 1024):
+        """Initialize an empty index
+        
+        Args:
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+            initial_capacity: Number of document rows to preallocate
+        """
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}  # term -> {row: term frequency}
+        self.row_ids = []  # Document ID per row (None for free rows)
+        self.row_terms = []  # Distinct terms of each row, to unindex it without re-tokenizing
+        self.id_to_row = {}
+        self._lengths = np.zeros(max(1, initial_capacity), dtype=np.float32)
+        self._free_rows = []
+        self._total_length = 0
+        self._term_arrays: Dict[str, tuple] = {}  # term -> (rows, frequencies) cache
+        self._lock = threading.RLock()
+        
+    def __len__(self) -> int:
+        """Number of indexed documents"""
+        return len(self.id_to_row)
+        
+    def _index_locked(self, document: str, doc_id: str):
+        tokens = bm25_tokenize(document)
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+            
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self.row_ids[row] = doc_id
+            self.row_terms[row] = tuple(counts)
+        else:
+            row = len(self.row_ids)
+            self.row_ids.append(doc_id)
+            self.row_terms.append(tuple(counts))
+            if row >= len(self._lengths):
+                lengths = np.zeros(2 * len(self._lengths), dtype=np.float32)
+                lengths[:row] = self._lengths[:row]
+                self._lengths = lengths
+        self.id_to_row[doc_id] = row
+        self._lengths[row] = len(tokens)
+        self._total_length += len(tokens)
+        
+        for term, count in counts.items():
+            self.postings.setdefault(term, {})[row] = count
+            self._term_arrays.pop(term, None)
+            
+    def _unindex_locked(self, doc_id: str) -> bool:
+        row = self.id_to_row.pop(doc_id, None)
+        if row is None:
+            return False
+        for term in self.row_terms[row]:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(row, None)
+                if not postings:
+                    del self.postings[term]
+            self._term_arrays.pop(term, None)
+        self._total_length -= int(self._lengths[row])
+        self._lengths[row] = 0
+        self.row_ids[row] = None
+        self.row_terms[row] = ()
+        self._free_rows.append(row)
+        return True
+        
+    def add_document(self, document: str, doc_id: str):
+        """Index a document, replacing any document stored under the same ID
+        
+        Args:
+            document: Text to index
+            doc_id: Document ID
+        """
+        with self._lock:
+            self._unindex_locked(doc_id)
+            self._index_locked(document, doc_id)
+            
+    def add_documents(self, documents: List[str], doc_ids: List[str]):
+        """Index several documents
+        
+        Args:
+            documents: Text to index
+            doc_ids: Document ID for each document
+        """
+        with self._lock:
+            for document, doc_id in zip(documents, doc_ids):
+                self._unindex_locked(doc_id)
+                self._index_locked(document, doc_id)
+                
+    def upsert_document(self, document: str, doc_id: str):
+        """Replace the document stored under doc_id, or add it if it is new"""
+        self.add_document(document, doc_id)
+        
+    def delete_document(self, doc_id: str) -> bool:
+        """Remove a document from the index
+        
+        Args:
+            doc_id: Document ID to delete
+            
+        Returns:
+            bool: True if the document was found
+        """
+        with self._lock:
+            return self._unindex_locked(doc_id)
+            
+    def _term_postings(self, term: str) -> Optional[tuple]:
+        """Rows and frequencies of a term as arrays, cached until the term changes"""
+        arrays = self._term_arrays.get(term)
+        if arrays is None:
+            postings = self.postings.get(term)
+            if not postings:
+                return None
+            rows = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            frequencies = np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+            arrays = (rows, frequencies)
+            self._term_arrays[term] = arrays
+        return arrays
+        
+    def search(self, query: str, top_k: int = 5, allowed_ids: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Rank documents by BM25 score for the query
+        
+        Args:
+            query: Query text
+            top_k: Number of results to return
+            allowed_ids: Optional IDs to restrict the search to (a metadata pre-filter)
+            
+        Returns:
+            List[Dict[str, Any]]: Results with 'id' and 'score', best first
+        """
+        terms = list(dict.fromkeys(bm25_tokenize(query)))
+        if not terms or top_k <= 0:
             return []
+        with self._lock:
+            n = len(self.id_to_row)
+            if n == 0:
+                return []
+            avg_length = self._total_length / n or 1.0
+            all_rows, all_scores = [], []
+            for term in terms:
+                arrays = self._term_postings(term)
+                if arrays is None:
+                    continue
+                rows, frequencies = arrays
+                df = len(rows)
+                idf = np.log((n - df + 0.5) / (df + 0.5) + 1.0)
+                norm = self.k1 * (1.0 - self.b + self.b * self._lengths[rows] / avg_length)
+                all_rows.append(rows)
+                all_scores.append(idf * frequencies * (self.k1 + 1.0) / (frequencies + norm))
+            if not all_rows:
+                return []
+            
+            # Sum the per-term contributions of each matching row
+            rows, inverse = np.unique(np.concatenate(all_rows), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(all_scores))
+            if allowed_ids is not None:
+                allowed_rows = np.fromiter((self.id_to_row[doc_id] for doc_id in allowed_ids if doc_id in self.id_to_row),
+                                           dtype=np.int64)
+                keep = np.isin(rows, allowed_rows)
+                rows, scores = rows[keep], scores[keep]
+                if len(rows) == 0:
+                    return []
+            top = SimpleEmbeddingRetriever._top_k(scores, top_k)
+            return [
+                {'id': self.row_ids[rows[i]], 'score': float(scores[i])}
+                for i in top[:top_k]
+            ]
+            
+    def search_many(self, queries: List[str], top_k: int = 5,
+                    allowed_ids: Optional[Iterable[str]] = None) -> List[List[Dict[str, Any]]]:
+        """Run search() for each query"""
+        return [self.search(query, top_k, allowed_ids) for query in queries]
 
 class ChromaRetriever:
     """Vector database retrieval using ChromaDB"""
-    def __init__(self, collection_name: str = "memories", max_retries: int = 3):
+    def __init__(self, collection_name: str = "memories", max_retries: int = 3, model_name: str = 'all-MiniLM-L6-v2'):
         """Initialize ChromaDB retriever.
         
         Args:
             collection_name: Name of the ChromaDB collection
             max_retries: Maximum number of retries for initialization
+            model_name: Sentence transformer model used to embed documents and queries
         """
         self.collection_name = collection_name
+        self.model_name = model_name
         self.client = None
         self.collection = None
         
@@ -237,7 +711,7 @@ class ChromaRetriever:
                 logger.info(f"Initializing ChromaDB (attempt {attempt+1}/{max_retries})")
                 
                 # Create custom embedding function that uses local cache
-                embedding_function = LocalCacheEmbeddingFunction()
+                embedding_function = LocalCacheEmbeddingFunction(model_name=model_name, device=None)
                 
                 # First try using the new PersistentClient method
                 try:
@@ -284,7 +758,7 @@ class ChromaRetriever:
                     # Create an in-memory fallback collection
                     try:
                         self.client = chromadb.Client()
-                        embedding_function = LocalCacheEmbeddingFunction()
+                        embedding_function = LocalCacheEmbeddingFunction(model_name=model_name, device=None)
                         self.collection = self.client.get_or_create_collection(
                             name=collection_name,
                             embedding_function=embedding_function
@@ -294,13 +768,14 @@ class ChromaRetriever:
                         logger.error(f"Even fallback collection creation failed: {fallback_error}")
                         logger.error("ChromaRetriever will be non-functional")
         
-    def add_document(self, document: str, metadata: Dict, doc_id: str):
+    def add_document(self, document: str, metadata: Dict, doc_id: str, embedding: Optional[np.ndarray] = None):
         """Add a document to ChromaDB.
         
         Args:
             document: Text content to add
             metadata: Dictionary of metadata
             doc_id: Unique identifier for the document
+            embedding: Optional precomputed embedding; if None ChromaDB embeds the document
             
         Returns:
             bool: True if operation succeeded, False otherwise
@@ -310,23 +785,126 @@ class ChromaRetriever:
             return False
             
         try:
-            # Convert lists to strings in metadata to comply with ChromaDB requirements
-            processed_metadata = {}
-            for key, value in metadata.items():
-                if isinstance(value, list):
-                    processed_metadata[key] = ", ".join(value)
-                else:
-                    processed_metadata[key] = value
-                    
-            self.collection.add(
-                documents=[document],
-                metadatas=[processed_metadata],
-                ids=[doc_id]
-            )
+            with CHROMA_WRITE_SECONDS.labels("add").time():
+                self.collection.add(
+                    documents=[document],
+                    metadatas=[self._process_metadata(metadata)],
+                    ids=[doc_id],
+                    **self._embedding_kwargs(None if embedding is None else [embedding])
+                )
             return True
         except Exception as e:
             logger.error(f"Error adding document to ChromaDB: {e}")
             return False
+            
+    def add_documents(self, documents: List[str], metadatas: List[Dict], doc_ids: List[str],
+                      embeddings: Optional[np.ndarray] = None):
+        """Add several documents to ChromaDB in a single call.
+        
+        Args:
+            documents: Text content for each document
+            metadatas: Metadata dictionary for each document
+            doc_ids: Unique identifier for each document
+            embeddings: Optional precomputed embeddings, one row per document
+            
+        Returns:
+            bool: True if operation succeeded, False otherwise
+        """
+        if self.collection is None:
+            logger.error("Cannot add documents: ChromaDB collection not initialized")
+            return False
+        if not doc_ids:
+            return True
+            
+        try:
+            with CHROMA_WRITE_SECONDS.labels("add").time():
+                self.collection.add(
+                    documents=documents,
+                    metadatas=[self._process_metadata(metadata) for metadata in metadatas],
+                    ids=doc_ids,
+                    **self._embedding_kwargs(embeddings)
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Error adding documents to ChromaDB: {e}")
+            return False
+            
+    @staticmethod
+    def _embedding_kwargs(embeddings) -> Dict:
+        """Build the embeddings argument for ChromaDB calls, omitted when not precomputed"""
+        if embeddings is None:
+            return {}
+        return {"embeddings": np.asarray(embeddings, dtype=np.float32).tolist()}
+        
+    @staticmethod
+    def _process_metadata(metadata: Dict) -> Dict:
+        """Convert lists to strings in metadata to comply with ChromaDB requirements"""
+        processed_metadata = {}
+        for key, value in metadata.items():
+            if isinstance(value, (list, tuple)):
+                processed_metadata[key] = ", ".join(value)
+            else:
+                processed_metadata[key] = value
+        return processed_metadata
+        
+    def upsert_documents(self, documents: List[str], metadatas: List[Dict], doc_ids: List[str],
+                         embeddings: Optional[np.ndarray] = None):
+        """Insert or replace several documents in a single ChromaDB call.
+        
+        Args:
+            documents: Text content for each document
+            metadatas: Metadata dictionary for each document
+            doc_ids: Unique identifier for each document
+            embeddings: Optional precomputed embeddings, one row per document
+            
+        Returns:
+            bool: True if operation succeeded, False otherwise
+        """
+        if self.collection is None:
+            logger.error("Cannot upsert documents: ChromaDB collection not initialized")
+            return False
+        if not doc_ids:
+            return True
+            
+        try:
+            with CHROMA_WRITE_SECONDS.labels("upsert").time():
+                self.collection.upsert(
+                    documents=documents,
+                    metadatas=[self._process_metadata(metadata) for metadata in metadatas],
+                    ids=doc_ids,
+                    **self._embedding_kwargs(embeddings)
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Error upserting documents to ChromaDB: {e}")
+            return False
+        
+    def update_metadatas(self, metadatas: List[Dict], doc_ids: List[str]):
+        """Replace the metadata of existing documents without re-embedding them.
+        
+        Args:
+            metadatas: Metadata dictionary for each document
+            doc_ids: ID of each document
+            
+        Returns:
+            bool: True if operation succeeded, False otherwise
+        """
+        if self.collection is None:
+            logger.error("Cannot update metadata: ChromaDB collection not initialized")
+            return False
+        if not doc_ids:
+            return True
+            
+        try:
+            with CHROMA_WRITE_SECONDS.labels("update").time():
+                self.collection.update(
+                    ids=doc_ids,
+                    metadatas=[self._process_metadata(metadata) for metadata in metadatas]
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Error updating metadata in ChromaDB: {e}")
+            return False
         
     def delete_document(self, doc_id: str):
         """Delete a document from ChromaDB.
@@ -358,27 +936,50 @@ class ChromaRetriever:
         Returns:
             Dict: ChromaDB query results with documents, ids, distances, and metadatas
         """
+        return self.search_many([query], k)
+        
+    def search_many(self, queries: List[str], k: int = 5, query_embeddings: Optional[np.ndarray] = None):
+        """Search for several queries with a single ChromaDB query call.
+        
+        Args:
+            queries: Query texts
+            k: Number of results to return per query
+            query_embeddings: Optional precomputed query embeddings, one row per
+                query, so ChromaDB does not encode the queries again
+            
+        Returns:
+            Dict: ChromaDB query results with one inner list per query
+        """
+        empty = {'ids': [[] for _ in queries], 'distances': [[] for _ in queries],
+                 'metadatas': [[] for _ in queries], 'documents': [[] for _ in queries]}
         if self.collection is None:
             logger.error("Cannot search: ChromaDB collection not initialized")
-            return {'ids': [[]], 'distances': [[]], 'metadatas': [[]], 'documents': [[]]}
+            return empty
             
         try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=k
-            )
+            if query_embeddings is not None:
+                results = self.collection.query(
+                    query_embeddings=np.asarray(query_embeddings, dtype=np.float32).tolist(),
+                    n_results=k
+                )
+            else:
+                results = self.collection.query(
+                    query_texts=queries,
+                    n_results=k
+                )
             
             # Convert string metadata back to lists where appropriate
             if 'metadatas' in results and results['metadatas']:
-                for metadata in results['metadatas']:
-                    for key in ['keywords', 'tags']:
-                        if key in metadata and isinstance(metadata[key], str):
-                            metadata[key] = [item.strip() for item in metadata[key].split(',')]
+                for query_metadatas in results['metadatas']:
+                    for metadata in query_metadatas or []:
+                        for key in ['keywords', 'tags']:
+                            if metadata and key in metadata and isinstance(metadata[key], str):
+                                metadata[key] = [item.strip() for item in metadata[key].split(',')]
                             
             return results
         except Exception as e:
             logger.error(f"Error searching in ChromaDB: {e}")
-            return {'ids': [[]], 'distances': [[]], 'metadatas': [[]], 'documents': [[]]}
+            return empty
             
     def get_collection_stats(self):
         """Get statistics about the collection.
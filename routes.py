@@ -1,36 +1,67 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Path
-from typing import Optional, List
-from memory_system import AgenticMemorySystem, MemoryNote
+from typing import Optional, List, TYPE_CHECKING
+from functools import partial
+from anyio import CapacityLimiter, to_thread
 from models import (
     MemoryCreateRequest, 
+    MemoryBatchCreateRequest,
+    MemoryBatchCreateResponse,
     MemoryUpdateRequest, 
     MemoryResponse, 
+    MemoryNeighborsResponse,
     MemorySearchResponse,
     MemorySearchResult,
     DeleteResponse
 )
 from utils import memory_note_to_dict, handle_not_found, handle_search_results
+from rank_fusion import FUSION_METHODS
+from metadata_index import parse_time_bound
+from warmup import Warmup, WarmupError
+from metrics import REGISTRY, stats_samples
 from config import settings
 
+if TYPE_CHECKING:
+    # memory_system imports the embedding model, ChromaDB and LiteLLM, so it is
+    # only imported by the warm-up thread
+    from memory_system import AgenticMemorySystem
+
 router = APIRouter(tags=["memories"])
 
+# Memory system calls block on the LLM, the embedding model and ChromaDB, so they
+# run in worker threads and never stall the event loop. Writes and reads have
+# separate limiters, so writes waiting on the LLM cannot starve searches.
+write_limiter = CapacityLimiter(settings.MAX_CONCURRENT_WRITES)
+read_limiter = CapacityLimiter(settings.MAX_CONCURRENT_READS)
+
+async def run_blocking(limiter: CapacityLimiter, func, *args, **kwargs):
+    """Run a blocking call in a worker thread, bounded by `limiter`"""
+    return await to_thread.run_sync(partial(func, *args, **kwargs), limiter=limiter)
+
 # Dependency to get the memory system
-def get_memory_system():
-    # This would normally be initialized once at server startup
-    # For demonstration, we're initializing it here
+async def get_memory_system():
+    """The memory system, waiting up to STARTUP_TIMEOUT seconds while it warms up"""
+    memory_system = warmup.value
+    if memory_system is None:
+        try:
+            memory_system = await to_thread.run_sync(warmup.wait, settings.STARTUP_TIMEOUT)
+        except TimeoutError:
+            raise HTTPException(status_code=503, detail="Memory system is still warming up",
+                                headers={"Retry-After": "5"})
+        except WarmupError as e:
+            raise HTTPException(status_code=503, detail=str(e))
     yield memory_system
 
 @router.post("/memories", response_model=MemoryResponse, status_code=201)
 async def create_memory(
     request: MemoryCreateRequest,
-    memory_system: AgenticMemorySystem = Depends(get_memory_system)
+    memory_system: "AgenticMemorySystem" = Depends(get_memory_system)
 ):
     """Create a new memory"""
     # Prepare kwargs for memory creation
     kwargs = request.model_dump(exclude_unset=True)
     
     # Create memory note
-    memory_id = memory_system.create(**kwargs)
+    memory_id = await run_blocking(write_limiter, memory_system.create, **kwargs)
     
     # Retrieve the created memory
     memory = memory_system.read(memory_id)
@@ -38,10 +69,31 @@ async def create_memory(
     # Convert memory to response format
     return memory_note_to_dict(memory)
 
+@router.post("/memories:batch", response_model=MemoryBatchCreateResponse, status_code=201)
+async def create_memories(
+    request: MemoryBatchCreateRequest,
+    memory_system: "AgenticMemorySystem" = Depends(get_memory_system)
+):
+    """Create several memories in one batch"""
+    contents = []
+    metadata = []
+    for item in request.memories:
+        kwargs = item.model_dump(exclude_unset=True)
+        contents.append(kwargs.pop("content"))
+        metadata.append(kwargs)
+    
+    # Create memory notes with batched analysis, embedding and indexing
+    memory_ids = await run_blocking(
+        write_limiter, memory_system.create_many, contents, metadata=metadata, evolve=request.evolve
+    )
+    
+    # Convert memories to response format
+    return {"memories": [memory_note_to_dict(memory_system.read(memory_id)) for memory_id in memory_ids]}
+
 @router.get("/memories/{memory_id}", response_model=MemoryResponse)
 async def get_memory(
     memory_id: str = Path(..., description="The ID of the memory to retrieve"),
-    memory_system: AgenticMemorySystem = Depends(get_memory_system)
+    memory_system: "AgenticMemorySystem" = Depends(get_memory_system)
 ):
     """Retrieve a memory by ID"""
     memory = memory_system.read(memory_id)
@@ -51,11 +103,28 @@ async def get_memory(
         
     return memory_note_to_dict(memory)
 
+@router.get("/memories/{memory_id}/neighbors", response_model=MemoryNeighborsResponse)
+async def get_memory_neighbors(
+    memory_id: str = Path(..., description="The ID of the memory to start from"),
+    hops: int = Query(1, ge=1, le=5, description="Maximum number of links to follow"),
+    direction: str = Query("both", description="'out' (links of the memory), 'in' (memories linking to it) or 'both'"),
+    memory_system: "AgenticMemorySystem" = Depends(get_memory_system)
+):
+    """Retrieve the memories linked to a memory"""
+    if direction not in ("out", "in", "both"):
+        raise HTTPException(status_code=400, detail="direction must be one of: out, in, both")
+    neighbors = memory_system.neighbors(memory_id, hops, direction)
+    
+    if neighbors is None:
+        handle_not_found(memory_id)
+        
+    return {"id": memory_id, "neighbors": [memory_note_to_dict(memory) for memory in neighbors]}
+
 @router.put("/memories/{memory_id}", response_model=MemoryResponse)
 async def update_memory(
     request: MemoryUpdateRequest,
     memory_id: str = Path(..., description="The ID of the memory to update"),
-    memory_system: AgenticMemorySystem = Depends(get_memory_system)
+    memory_system: "AgenticMemorySystem" = Depends(get_memory_system)
 ):
     """Update an existing memory"""
     # Check if memory exists
@@ -68,7 +137,7 @@ async def update_memory(
     kwargs["memory_id"] = memory_id
     
     # Update memory
-    success = memory_system.update(**kwargs)
+    success = await run_blocking(write_limiter, memory_system.update, **kwargs)
     
     if not success:
         raise HTTPException(
@@ -83,10 +152,10 @@ async def update_memory(
 @router.delete("/memories/{memory_id}", response_model=DeleteResponse)
 async def delete_memory(
     memory_id: str = Path(..., description="The ID of the memory to delete"),
-    memory_system: AgenticMemorySystem = Depends(get_memory_system)
+    memory_system: "AgenticMemorySystem" = Depends(get_memory_system)
 ):
     """Delete a memory by ID"""
-    success = memory_system.delete(memory_id)
+    success = await run_blocking(write_limiter, memory_system.delete, memory_id)
     
     if not success:
         handle_not_found(memory_id)
@@ -97,25 +166,119 @@ async def delete_memory(
 async def search_memories(
     query: str = Query(..., description="Search query text"),
     k: Optional[int] = Query(settings.DEFAULT_K, description="Maximum number of results to return"),
-    memory_system: AgenticMemorySystem = Depends(get_memory_system)
+    fusion: Optional[str] = Query(None, description="Result fusion: 'rrf' or 'weighted' (default from SEARCH_FUSION)"),
+    timings: bool = Query(False, description="Include per-retriever timings in the response"),
+    tags: Optional[List[str]] = Query(None, description="Only return memories carrying all of these tags (repeat the parameter)"),
+    category: Optional[str] = Query(None, description="Only return memories in this category"),
+    since: Optional[str] = Query(None, description="Only return memories created at or after this time (YYYYMMDD[HHMM])"),
+    until: Optional[str] = Query(None, description="Only return memories created at or before this time (YYYYMMDD[HHMM])"),
+    expand_links: int = Query(0, ge=0, le=3, description="Add memories linked to the hits, following up to this many links"),
+    memory_system: "AgenticMemorySystem" = Depends(get_memory_system)
 ):
     """Search for memories"""
+    if fusion is not None and fusion not in FUSION_METHODS:
+        raise HTTPException(status_code=400, detail=f"fusion must be one of: {', '.join(FUSION_METHODS)}")
+    for name, value, upper in (("since", since, False), ("until", until, True)):
+        try:
+            parse_time_bound(value, upper=upper)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"{name} is {e}")
+    
     # Perform search
-    results = memory_system.search(query, k)
+    detailed = await run_blocking(read_limiter, memory_system.search_detailed, query, k, fusion,
+                                  tags=tags, category=category, since=since, until=until,
+                                  expand_links=expand_links)
     
     # Process results
-    processed_results = handle_search_results(results)
+    processed_results = handle_search_results(detailed["results"])
     
     # Create response
     search_results = [MemorySearchResult(**result) for result in processed_results]
+    if timings:
+        return {"results": search_results, "timings": detailed["timings"]}
     return {"results": search_results}
 
-# Initialize memory system
-memory_system = AgenticMemorySystem(
-    model_name=settings.MODEL_NAME,
-    llm_backend=settings.LLM_BACKEND,
-    llm_model=settings.LLM_MODEL,
-    evo_threshold=settings.EVO_THRESHOLD,
-    api_key=settings.API_KEY,
-    api_base=settings.API_URL  # Pass API URL to the memory system
-)
+@router.get("/stats")
+async def get_stats(
+    memory_system: "AgenticMemorySystem" = Depends(get_memory_system)
+):
+    """Operational counters (memory count, embedding cache hits and misses)"""
+    return memory_system.stats()
+
+def build_memory_system() -> "AgenticMemorySystem":
+    """Create the memory system from settings (runs on the warm-up thread)"""
+    from memory_system import AgenticMemorySystem
+    from llm_cache import LLMResponseCache
+    from vector_index import make_index
+    
+    llm_cache = None
+    if settings.LLM_CACHE_PATH:
+        llm_cache = LLMResponseCache(
+            settings.LLM_CACHE_PATH,
+            ttl_seconds=settings.LLM_CACHE_TTL,
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+            cache_nonzero_temperature=settings.LLM_CACHE_NONZERO_TEMPERATURE
+        )
+    
+    return AgenticMemorySystem(
+        model_name=settings.MODEL_NAME,
+        llm_backend=settings.LLM_BACKEND,
+        llm_model=settings.LLM_MODEL,
+        evo_threshold=settings.EVO_THRESHOLD,
+        api_key=settings.API_KEY,
+        api_base=settings.API_URL,  # Pass API URL to the memory system
+        persist_dir=settings.MEMORY_STORE_DIR or None,
+        snapshot_interval=settings.MEMORY_SNAPSHOT_INTERVAL,
+        async_evolution=settings.ASYNC_EVOLUTION,
+        evolution_workers=settings.EVOLUTION_WORKERS,
+        llm_cache=llm_cache,
+        vector_index=make_index(settings.VECTOR_INDEX, nprobe=settings.IVF_NPROBE),
+        fusion=settings.SEARCH_FUSION,
+        # Re-indexing the stored notes dominates startup for large stores; show it on /ready
+        restore_progress=lambda done, total: warmup.report_progress("restore_indexes", done, total)
+    )
+
+def _warm_nltk(memory_system):
+    """Make sure the punkt tokenizer data is available"""
+    import nltk
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        nltk.download('punkt', quiet=True)
+
+def _warm_embeddings(memory_system):
+    """Run the embedding model once, so the first request does not pay for lazy initialization"""
+    if memory_system.embedder is not None:
+        memory_system.embedder.encode(["warm-up"])
+
+def _warm_chromadb(memory_system):
+    """Query ChromaDB once, so its collection index is loaded before the first search"""
+    if memory_system.chroma_retriever is not None:
+        memory_system.chroma_retriever.search_many(["warm-up"], 1)
+
+# The memory system is built by start_warmup() (called on server startup) or by
+# the first request that needs it
+warmup = Warmup(build_memory_system, stages=[
+    ("nltk", _warm_nltk),
+    ("embedding_model", _warm_embeddings),
+    ("chromadb", _warm_chromadb),
+])
+
+def _memory_system_samples():
+    """Gauges for /metrics: readiness plus the memory system's stats() counters"""
+    samples = [("amem_ready", "1 once warm-up has finished", 1.0 if warmup.ready else 0.0)]
+    if warmup.value is not None:
+        samples.extend(stats_samples(warmup.value.stats()))
+    return samples
+
+REGISTRY.register_collector(_memory_system_samples)
+
+def start_warmup():
+    """Start building the memory system, in the background if LAZY_STARTUP is set"""
+    warmup.start(background=settings.LAZY_STARTUP)
+
+def __getattr__(name):
+    # `routes.memory_system` keeps working for scripts that import it; it waits for warm-up
+    if name == "memory_system":
+        return warmup.wait()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,22 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi import Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
 import json
 import os
 from config import settings
-from routes import router
-import nltk
+from routes import router, warmup, start_warmup
+from metrics import REGISTRY
+import tracing
 
 def create_app() -> FastAPI:
-    """Create and configure the FastAPI application"""
+    """Create and configure the FastAPI application
     
-    # Download necessary NLTK data
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt')
+    The memory system (models, ChromaDB, NLTK data) is built by the warm-up in
+    routes.py, so the app can serve /health before it is ready
+    """
     
     # Create FastAPI app
     app = FastAPI(
@@ -36,6 +36,23 @@ def create_app() -> FastAPI:
         allow_headers=["*"],  # Allow all headers
     )
     
+    # Trace a sample of requests; the trace ID comes from the X-Trace-Id header if given
+    tracing.configure(settings.TRACE_SAMPLE_RATE, settings.TRACE_FILE or None)
+    
+    @app.middleware("http")
+    async def trace_requests(request: Request, call_next):
+        """Run each request in a trace and return its trace ID in X-Trace-Id"""
+        sampled = request.headers.get(tracing.SAMPLED_HEADER)
+        with tracing.trace(
+            f"{request.method} {request.url.path}",
+            trace_id=request.headers.get(tracing.TRACE_HEADER),
+            sampled=None if sampled is None else sampled.lower() in ("1", "true")
+        ) as trace:
+            response = await call_next(request)
+            trace.set(status_code=response.status_code)
+        response.headers[tracing.TRACE_HEADER] = trace.trace_id
+        return response
+    
     # Add routes
     app.include_router(router, prefix="/api/v1")
     
@@ -51,8 +68,30 @@ def create_app() -> FastAPI:
     
     @app.get("/health")
     async def health_check():
-        """Health check endpoint"""
-        return {"status": "healthy"}
+        """Health check endpoint (the server is up; see /ready for the memory system)"""
+        return {"status": "healthy", "warmup": warmup.status()}
+    
+    @app.get("/ready")
+    async def readiness_check():
+        """Readiness endpoint: 200 once warm-up has finished, 503 until then"""
+        status = warmup.status()
+        return JSONResponse(status_code=200 if warmup.ready else 503, content=status)
+    
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        """Operation latencies, counters and queue sizes in the Prometheus text format"""
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+    
+    @app.on_event("startup")
+    async def startup():
+        """Start building the memory system"""
+        start_warmup()
+    
+    @app.on_event("shutdown")
+    async def shutdown():
+        """Finish queued memory evolution and close the note store"""
+        if warmup.value is not None:
+            warmup.value.close()
     
     @app.get("/mcp-schema")
     async def mcp_schema():
@@ -8,6 +8,7 @@ import socket
 import logging
 import traceback
 from dotenv import load_dotenv
+from tracing import mcp_trace_headers
 
 # Configure logging
 logging.basicConfig(
@@ -113,11 +114,13 @@ def handle_mcp():
                 logger.info("Handling create_memory request")
                 
                 params = request.get("params", {})
+                trace_headers = mcp_trace_headers(params)
                 
                 try:
                     # Call the API
                     api_response = requests.post(
                         f"{base_url}/memories",
+                        headers=trace_headers,
                         json={
                             "content": params.get("content", ""),
                             "tags": params.get("tags", []),
@@ -159,11 +162,65 @@ def handle_mcp():
                 sys.stdout.flush()
                 logger.info("Sent create_memory response")
                 
+            elif method == "create_memories":
+                # Handle create_memories (batch) method
+                logger.info("Handling create_memories request")
+                
+                params = request.get("params", {})
+                trace_headers = mcp_trace_headers(params)
+                items = params.get("memories", [])
+                
+                try:
+                    # Call the API once for the whole batch
+                    api_response = requests.post(
+                        f"{base_url}/memories:batch",
+                        headers=trace_headers,
+                        json={
+                            "memories": [
+                                {
+                                    "content": item.get("content", ""),
+                                    "tags": item.get("tags", []),
+                                    "category": item.get("category", "General")
+                                }
+                                for item in items
+                            ],
+                            "evolve": params.get("evolve", True)
+                        }
+                    )
+                    
+                    if api_response.status_code == 200 or api_response.status_code == 201:
+                        batch_data = api_response.json()
+                        response = {
+                            "jsonrpc": "2.0",
+                            "id": request_id,
+                            "result": batch_data
+                        }
+                    else:
+                        raise Exception(f"API error: {api_response.status_code}")
+                        
+                except Exception as e:
+                    logger.error(f"Error in create_memories: {e}")
+                    
+                    # Report the failure instead of inventing IDs for a whole batch
+                    response = {
+                        "jsonrpc": "2.0",
+                        "id": request_id,
+                        "error": {
+                            "code": -32603,
+                            "message": f"Batch creation failed: {str(e)}"
+                        }
+                    }
+                
+                sys.stdout.write(json.dumps(response) + "\n")
+                sys.stdout.flush()
+                logger.info("Sent create_memories response")
+                
             elif method == "search_memories":
                 # Handle search_memories method
                 logger.info("Handling search_memories request")
                 
                 params = request.get("params", {})
+                trace_headers = mcp_trace_headers(params)
                 query = params.get("query", "")
                 k = params.get("k", 5)
                 
@@ -171,6 +228,7 @@ def handle_mcp():
                     # Call the API
                     api_response = requests.get(
                         f"{base_url}/search",
+                        headers=trace_headers,
                         params={"query": query, "k": k}
                     )
                     
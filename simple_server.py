@@ -33,7 +33,9 @@ try:
                 llm_model=settings.LLM_MODEL,
                 evo_threshold=settings.EVO_THRESHOLD,
                 api_key=settings.API_KEY,
-                api_base=settings.API_URL
+                api_base=settings.API_URL,
+                persist_dir=settings.MEMORY_STORE_DIR or None,
+                snapshot_interval=settings.MEMORY_SNAPSHOT_INTERVAL
             )
             print("Memory system initialized successfully!", file=sys.stderr)
         
@@ -296,6 +298,88 @@ async def create_memory(request: Request):
                 content={"error": f"Internal server error: {str(e)}"}
             )
 
+@api_router.post("/memories:batch")
+async def create_memories(request: Request):
+    """Create several memories in one batch"""
+    try:
+        body = await request.json()
+        items = body.get("memories", [])
+        evolve = body.get("evolve", True)
+        print(f"Received batch create request with {len(items)} memories", file=sys.stderr)
+        
+        if not items or any(not item.get("content") for item in items):
+            print("Error: Content is required for every memory", file=sys.stderr)
+            return JSONResponse(
+                status_code=400,
+                content={"error": "Content is required for every memory"}
+            )
+        
+        # Try the memory system first
+        if memory_system is not None:
+            try:
+                metadata = [
+                    {key: item[key] for key in ("tags", "category", "timestamp") if key in item}
+                    for item in items
+                ]
+                memory_ids = memory_system.create_many(
+                    [item["content"] for item in items],
+                    metadata=metadata,
+                    evolve=evolve
+                )
+                print(f"Successfully created {len(memory_ids)} memories", file=sys.stderr)
+                
+                memories = []
+                for memory_id in memory_ids:
+                    memory = memory_system.read(memory_id)
+                    memories.append({
+                        "id": memory.id,
+                        "content": memory.content,
+                        "tags": memory.tags,
+                        "category": memory.category,
+                        "context": memory.context,
+                        "keywords": memory.keywords,
+                        "timestamp": memory.timestamp,
+                        "last_accessed": memory.last_accessed,
+                        "retrieval_count": memory.retrieval_count,
+                        "links": memory.links
+                    })
+                return JSONResponse(status_code=201, content={"memories": memories})
+            except Exception as e:
+                print(f"Error using memory system for batch creation: {e}", file=sys.stderr)
+                traceback.print_exc(file=sys.stderr)
+                # Fall back to simple implementation
+        
+        # Fallback implementation
+        print("Using fallback memory implementation for batch creation", file=sys.stderr)
+        import time
+        import uuid
+        memories = []
+        for item in items:
+            memory_id = str(uuid.uuid4())
+            new_memory = {
+                "id": memory_id,
+                "content": item["content"],
+                "tags": item.get("tags", []) or [],
+                "category": item.get("category", "General"),
+                "context": "Auto-generated context",
+                "keywords": ["auto", "generated"],
+                "timestamp": time.strftime("%Y%m%d%H%M"),
+                "last_accessed": time.strftime("%Y%m%d%H%M"),
+                "retrieval_count": 0,
+                "links": []
+            }
+            memories_db[memory_id] = new_memory
+            memories.append(new_memory)
+        
+        return JSONResponse(status_code=201, content={"memories": memories})
+    except Exception as e:
+        print(f"Error in create_memories: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Internal server error: {str(e)}"}
+        )
+
 @api_router.get("/memories/{memory_id}")
 async def get_memory(memory_id: str):
     """Get a memory by ID"""
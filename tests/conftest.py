@@ -0,0 +1,90 @@
+"""Shared fixtures for the test suite."""
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from test_utils import MockLLMController
+
+
+class EmptyChroma:
+    """ChromaRetriever stand-in that accepts writes and finds nothing, leaving ranking to BM25"""
+
+    def search_many(self, queries, k=5, query_embeddings=None):
+        return {"ids": [[] for _ in queries], "distances": [[] for _ in queries],
+                "metadatas": [[] for _ in queries], "documents": [[] for _ in queries]}
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: True
+
+
+@pytest.fixture
+def make_memory_system(monkeypatch):
+    """Factory for memory systems without ChromaDB, embedding models or LLM calls.
+
+    Content analysis uses the built-in fallback, so the tests exercise the
+    note map, the durable store and the in-process indexes only.
+    """
+    monkeypatch.setenv("DISABLE_CHROMADB", "true")
+    monkeypatch.setenv("DISABLE_LLM", "true")
+    from memory_system import AgenticMemorySystem
+
+    systems = []
+
+    def make(**kwargs):
+        kwargs.setdefault("llm_controller", types.SimpleNamespace(llm=MockLLMController()))
+        system = AgenticMemorySystem(**kwargs)
+        systems.append(system)
+        return system
+
+    yield make
+    for system in systems:
+        system.close()
+
+
+@pytest.fixture
+def make_lexical_system(make_memory_system, monkeypatch):
+    """Factory for memory systems whose search ranks with the BM25 retriever only.
+
+    Notes must be created after construction: the lexical index is attached
+    once the system is built, so loaded notes are not indexed in it.
+    """
+    from retrievers import BM25Retriever
+
+    def make(**kwargs):
+        monkeypatch.setenv("DISABLE_CHROMADB", "true")
+        system = make_memory_system(**kwargs)
+        system.lexical_retriever = BM25Retriever()
+        system.chroma_retriever = EmptyChroma()
+        monkeypatch.setenv("DISABLE_CHROMADB", "false")
+        return system
+
+    return make
+
+
+@pytest.fixture
+def make_vector_system(make_memory_system, monkeypatch, tmp_path):
+    """Factory for memory systems with all three retrievers and no model download.
+
+    ChromaDB persists to a temporary directory shared by every system the
+    factory builds, so a second system sees the first one's collection as
+    after a restart. Vectors come from the deterministic hashing encoder.
+    """
+    import retrievers
+    from embedding_service import HASHING_MODEL
+
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    monkeypatch.setattr(retrievers, "CACHE_DIR", str(cache_dir))
+    monkeypatch.setenv("DISABLE_CHROMADB", "false")
+
+    def make(**kwargs):
+        kwargs.setdefault("model_name", HASHING_MODEL)
+        system = make_memory_system(**kwargs)
+        assert system.chroma_retriever is not None and system.retriever is not None
+        return system
+
+    return make
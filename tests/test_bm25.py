@@ -0,0 +1,75 @@
+"""BM25Retriever against a direct implementation of the BM25 formula"""
+import math
+import random
+
+import pytest
+
+from retrievers import BM25Retriever, bm25_tokenize
+
+WORDS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta", "iota", "kappa"]
+
+
+def reference_scores(documents, query, k1=1.5, b=0.75):
+    """BM25 score of every document containing a query term, recomputed from scratch"""
+    tokens = {doc_id: bm25_tokenize(text) for doc_id, text in documents.items()}
+    n = len(tokens)
+    avg_length = sum(len(terms) for terms in tokens.values()) / n
+    scores = {}
+    for term in dict.fromkeys(bm25_tokenize(query)):
+        df = sum(1 for terms in tokens.values() if term in terms)
+        if df == 0:
+            continue
+        idf = math.log((n - df + 0.5) / (df + 0.5) + 1.0)
+        for doc_id, terms in tokens.items():
+            tf = terms.count(term)
+            if tf:
+                norm = k1 * (1.0 - b + b * len(terms) / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1.0) / (tf + norm)
+    return scores
+
+
+def check(retriever, documents, query):
+    expected = reference_scores(documents, query)
+    results = retriever.search(query, top_k=len(documents) + 1)
+    assert {result["id"]: result["score"] for result in results} == pytest.approx(expected, rel=1e-5)
+    scores = [result["score"] for result in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def random_document(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12)))
+
+
+def test_scores_match_reference_through_writes():
+    rng = random.Random(0)
+    retriever = BM25Retriever(initial_capacity=4)
+    documents = {}
+    for step in range(300):
+        doc_id = f"doc{rng.randrange(60)}"
+        if doc_id in documents and rng.random() < 0.3:
+            assert retriever.delete_document(doc_id)
+            del documents[doc_id]
+        else:
+            documents[doc_id] = random_document(rng)
+            retriever.add_document(documents[doc_id], doc_id)
+        if step % 25 == 0 and documents:
+            check(retriever, documents, " ".join(rng.sample(WORDS, 3)))
+    assert len(retriever) == len(documents)
+    for word in WORDS:
+        check(retriever, documents, word)
+
+
+def test_allowed_ids_restrict_results():
+    retriever = BM25Retriever()
+    retriever.add_documents(["alpha beta", "alpha", "beta gamma"], ["a", "b", "c"])
+    assert [result["id"] for result in retriever.search("alpha", 5, allowed_ids=["b", "c"])] == ["b"]
+    assert retriever.search("alpha", 5, allowed_ids=[]) == []
+    assert retriever.search("missing", 5) == []
+    assert not retriever.delete_document("missing")
+
+
+def test_results_carry_only_id_and_score():
+    retriever = BM25Retriever()
+    retriever.add_document("alpha beta", "a")
+    [result] = retriever.search("alpha")
+    assert set(result) == {"id", "score"}
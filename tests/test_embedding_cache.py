@@ -0,0 +1,70 @@
+"""Tests for the two-tier embedding cache."""
+import os
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache, _DiskTier
+
+
+def vectors(count, dimension=4, offset=0):
+    return np.arange(offset, offset + count * dimension, dtype=np.float32).reshape(count, dimension)
+
+
+def test_memory_and_disk_hits(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_memory_entries=1)
+    cache.put_many("model", True, ["a", "b"], vectors(2))
+    # "a" was evicted from the one-entry LRU and comes from disk
+    b, a, c = cache.get_many("model", True, 4, ["b", "a", "c"])
+    np.testing.assert_array_equal(a, vectors(2)[0])
+    np.testing.assert_array_equal(b, vectors(2)[1])
+    assert c is None
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
+    cache.close()
+
+    reopened = EmbeddingCache(str(tmp_path), max_memory_entries=0)
+    np.testing.assert_array_equal(reopened.get_many("model", True, 4, ["b"])[0], vectors(2)[1])
+    # Namespaces are separate per normalization
+    assert reopened.get_many("model", False, 4, ["b"]) == [None]
+
+
+def test_disk_tier_keeps_intact_keys_file_and_drops_torn_tail(tmp_path):
+    tier = _DiskTier(str(tmp_path), 4)
+    tier.put_many(["a", "b"], vectors(2))
+    tier.close()
+    modified = os.stat(tier.keys_path).st_mtime_ns
+
+    reopened = _DiskTier(str(tmp_path), 4)
+    assert set(reopened.rows) == {"a", "b"}
+    reopened.close()
+    assert os.stat(tier.keys_path).st_mtime_ns == modified
+
+    with open(tier.keys_path, "a", encoding="utf-8") as f:
+        f.write("tor")
+    reopened = _DiskTier(str(tmp_path), 4)
+    assert set(reopened.rows) == {"a", "b"}
+    reopened.put_many(["c"], vectors(1, offset=100))
+    np.testing.assert_array_equal(reopened.get("c"), vectors(1, offset=100)[0])
+    reopened.close()
+    with open(tier.keys_path, encoding="utf-8") as f:
+        assert f.read() == "a\nb\nc\n"
+
+
+def test_disk_tier_compacts_to_most_recently_used(tmp_path):
+    tier = _DiskTier(str(tmp_path), 4, max_rows=8)
+    keys = [f"k{i}" for i in range(8)]
+    tier.put_many(keys, vectors(8))
+    tier.get("k0")  # Recently used, so it survives compaction
+
+    tier.put_many(["new"], vectors(1, offset=500))
+    assert len(tier.rows) == 6
+    assert "k0" in tier.rows and "new" in tier.rows
+    assert "k1" not in tier.rows
+    np.testing.assert_array_equal(tier.get("k0"), vectors(8)[0])
+    np.testing.assert_array_equal(tier.get("k7"), vectors(8)[7])
+    tier.close()
+
+    reopened = _DiskTier(str(tmp_path), 4, max_rows=8)
+    assert set(reopened.rows) == set(tier.rows)
+    np.testing.assert_array_equal(reopened.get("new"), vectors(1, offset=500)[0])
+    reopened.close()
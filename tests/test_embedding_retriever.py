@@ -0,0 +1,105 @@
+"""SimpleEmbeddingRetriever arena, ID mapping and saved vectors."""
+import numpy as np
+import pytest
+
+from embedding_service import EmbeddingService, HASHING_MODEL
+from retrievers import SimpleEmbeddingRetriever
+
+
+@pytest.fixture
+def make_retriever(tmp_path, monkeypatch):
+    import retrievers
+
+    monkeypatch.setattr(retrievers, "CACHE_DIR", str(tmp_path))
+
+    def make(**kwargs):
+        kwargs.setdefault("index", "exact")
+        return SimpleEmbeddingRetriever(HASHING_MODEL, **kwargs)
+
+    return make
+
+
+def test_saved_vectors_are_reused_only_for_unchanged_documents(make_retriever, tmp_path):
+    path = str(tmp_path / "embeddings.npz")
+    retriever = make_retriever()
+    retriever.add_documents(["alpha beta", "gamma", "delta"], ["a", "b", "c"])
+    retriever.add_document("unsaved zero row", "z", embedding=np.zeros(retriever.embeddings.shape[1]))
+    retriever.delete_document("c")
+    assert retriever.save(path) == 2
+
+    restored = make_retriever()
+    missing = restored.load_vectors(path, {"a": "alpha beta", "b": "gamma edited", "d": "new", "z": "unsaved zero row"})
+    assert sorted(missing) == ["b", "d", "z"]
+    assert len(restored) == 1
+    np.testing.assert_array_equal(restored.embeddings[restored.id_to_row["a"]],
+                                  retriever.embeddings[retriever.id_to_row["a"]])
+    assert restored.search("alpha", 1)[0]["id"] == "a"
+
+
+def test_unusable_saved_vectors_are_ignored(make_retriever, tmp_path):
+    path = tmp_path / "embeddings.npz"
+    assert make_retriever().load_vectors(str(path), {"a": "alpha"}) == ["a"]
+    path.write_bytes(b"not an npz file")
+    assert make_retriever().load_vectors(str(path), {"a": "alpha"}) == ["a"]
+
+    retriever = make_retriever()
+    retriever.add_document("alpha", "a")
+    retriever.save(str(path))
+    other_model = make_retriever()
+    other_model.embedder = EmbeddingService(HASHING_MODEL)
+    other_model.embedder.model_name = "other-model"
+    assert other_model.load_vectors(str(path), {"a": "alpha"}) == ["a"]
+    assert len(other_model) == 0
+
+
+def unit(dimension, *hot):
+    vector = np.zeros(dimension, dtype=np.float32)
+    vector[list(hot)] = 1.0
+    return vector
+
+
+def test_add_documents_replaces_existing_ids(make_retriever):
+    retriever = make_retriever(initial_capacity=2)
+    dimension = retriever.embedder.dimension
+    retriever.add_documents(["a", "b"], ["a", "b"], embeddings=np.stack([unit(dimension, 0), unit(dimension, 1)]))
+    retriever.add_documents(["a2", "c", "c2"], ["a", "c", "c"],
+                            embeddings=np.stack([unit(dimension, 2), unit(dimension, 3), unit(dimension, 4)]))
+    assert len(retriever) == 3
+    assert retriever.embeddings.shape[0] == 3
+    assert retriever.documents == ["a2", "b", "c2"]
+    assert [result["id"] for result in retriever.search_many(["x"], 1, query_embeddings=[unit(dimension, 2)])[0]] == ["a"]
+    assert retriever.search_many(["x"], 1, query_embeddings=[unit(dimension, 0)])[0][0]["score"] == 0.0
+
+
+def test_arena_grows_and_compacts(make_retriever):
+    retriever = make_retriever(initial_capacity=2)
+    dimension = retriever.embedder.dimension
+    ids = [f"doc{i}" for i in range(10)]
+    retriever.add_documents(ids[:2], ids[:2], embeddings=np.stack([unit(dimension, i) for i in range(2)]))
+    retriever.add_documents(ids[2:], ids[2:], embeddings=np.stack([unit(dimension, i) for i in range(2, 10)]))
+    # Capacity doubles from 2 until the rows fit
+    assert retriever._matrix.shape[0] == 16
+    for doc_id in ids[:6]:
+        assert retriever.delete_document(doc_id)
+    assert not retriever.delete_document(ids[0])
+    retriever.compact()
+    assert len(retriever) == retriever.embeddings.shape[0] == 4
+    assert sorted(retriever.id_to_row) == ids[6:]
+    for doc_id in ids[6:]:
+        row = retriever.id_to_row[doc_id]
+        assert retriever.row_ids[row] == doc_id
+        np.testing.assert_array_equal(retriever.embeddings[row], unit(dimension, int(doc_id[3:])))
+    assert retriever.search_many(["x"], 1, query_embeddings=[unit(dimension, 7)])[0][0]["id"] == "doc7"
+
+
+def test_dimension_mismatch_is_rejected(make_retriever):
+    retriever = make_retriever()
+    retriever.add_document("a", "a")
+    with pytest.raises(ValueError):
+        retriever.add_document("b", "b", embedding=np.ones(3))
+    with pytest.raises(ValueError):
+        retriever.upsert_document("a", "a", embedding=np.ones(3))
+    with pytest.raises(ValueError):
+        retriever.add_documents(["c"], ["c"], embeddings=np.ones((1, 3)))
+    assert len(retriever) == 1
+    assert retriever.embeddings[0].any()
@@ -0,0 +1,76 @@
+"""The shared embedding service, and the retrievers built on it across restarts."""
+import numpy as np
+
+import embedding_service
+from embedding_cache import EmbeddingCache
+from embedding_service import EmbeddingService, FALLBACK_DIMENSION, HASHING_MODEL
+
+
+class CountingModel:
+    """SentenceTransformer stand-in recording the texts it encodes"""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, normalize_embeddings=True):
+        self.encoded.append(list(texts))
+        return EmbeddingService.fallback_encode(texts)
+
+
+def make_service(tmp_path):
+    service = EmbeddingService(HASHING_MODEL, cache=EmbeddingCache(str(tmp_path), max_memory_entries=10))
+    service.model = CountingModel()
+    service.model_name = "counting"
+    return service
+
+
+def test_encodes_each_missing_text_once(tmp_path):
+    service = make_service(tmp_path)
+    first = service.encode(["alpha", "beta", "alpha"])
+    assert service.model.encoded == [["alpha", "beta"]]
+    np.testing.assert_array_equal(first[0], first[2])
+
+    second = service.encode(["beta", "gamma"])
+    assert service.model.encoded[1:] == [["gamma"]]
+    np.testing.assert_array_equal(second[0], first[1])
+    assert second.dtype == np.float32 and second.shape == (2, FALLBACK_DIMENSION)
+
+
+def test_hashing_encoder_is_deterministic_and_uncached(tmp_path):
+    service = EmbeddingService(HASHING_MODEL, cache=EmbeddingCache(str(tmp_path), max_memory_entries=10))
+    vectors = service.encode(["Zebra herds", "zebra HERDS", ""])
+    np.testing.assert_allclose(vectors[0], vectors[1])
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    assert not vectors[2].any()
+    assert service.cache.stats()["misses"] == 0
+    assert service.encode([]).shape == (0, FALLBACK_DIMENSION)
+
+
+def test_one_service_per_model(make_vector_system, monkeypatch):
+    from custom_embedding import LocalCacheEmbeddingFunction
+
+    monkeypatch.setattr(embedding_service, "_services", {})
+    service = embedding_service.get_embedding_service(HASHING_MODEL)
+    assert embedding_service.get_embedding_service(HASHING_MODEL) is service
+    # The memory system and ChromaDB's embedding function encode with the same instance
+    assert make_vector_system().embedder is service
+    assert LocalCacheEmbeddingFunction(model_name=HASHING_MODEL, device=None).service is service
+
+
+def test_create_update_delete_restart_search(make_vector_system, tmp_path):
+    persist_dir = str(tmp_path / "notes")
+    system = make_vector_system(persist_dir=persist_dir)
+    kept = system.create("Zebra herds cross the river at dawn")
+    changed = system.create("Kettle descaling schedule for the office")
+    deleted = system.create("Zebra crossing outside the school")
+    assert system.update(changed, content="Lighthouse keeper logbook entries")
+    assert system.delete(deleted)
+    system.close()
+
+    restarted = make_vector_system(persist_dir=persist_dir)
+    assert restarted.chroma_retriever.collection.count() == 2
+    assert len(restarted.retriever) == len(restarted.lexical_retriever) == 2
+    results = restarted.search("zebra crossing", k=5)
+    assert [result["id"] for result in results] == [kept, changed]
+    assert results[1]["content"] == "Lighthouse keeper logbook entries"
+    assert restarted.search("lighthouse logbook", k=1)[0]["id"] == changed
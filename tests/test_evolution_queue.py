@@ -0,0 +1,153 @@
+"""EvolutionQueue workers and StripedLock, alone and behind create()"""
+import contextvars
+import threading
+
+import pytest
+
+from evolution_queue import EvolutionQueue, StripedLock
+
+REQUEST = contextvars.ContextVar("request", default=None)
+
+
+def test_join_waits_for_every_item_and_counts_failures():
+    seen = []
+
+    def handler(memory_id):
+        if memory_id == "bad":
+            raise ValueError("boom")
+        seen.append(memory_id)
+
+    evolution = EvolutionQueue(handler, workers=3)
+    for memory_id in ["a", "bad", "b", "c"]:
+        evolution.submit(memory_id)
+    assert evolution.join(timeout=5)
+    assert sorted(seen) == ["a", "b", "c"]
+    stats = evolution.stats()
+    assert stats["processed"] == 4 and stats["failed"] == 1
+    assert stats["depth"] == 0 and stats["in_flight"] == 0
+    assert stats["workers"] == 3
+    assert stats["max_lag_seconds"] >= stats["avg_lag_seconds"] >= 0
+    evolution.close()
+
+
+def test_join_times_out_while_work_is_pending():
+    release = threading.Event()
+    started = threading.Event()
+
+    def handler(memory_id):
+        started.set()
+        release.wait(5)
+
+    evolution = EvolutionQueue(handler, workers=1)
+    evolution.submit("a")
+    evolution.submit("b")
+    assert started.wait(5)
+    assert not evolution.join(timeout=0.05)
+    stats = evolution.stats()
+    assert stats["in_flight"] == 1 and stats["depth"] == 1
+    release.set()
+    assert evolution.join(timeout=5)
+    evolution.close()
+
+
+def test_close_drains_the_queue_then_rejects_work():
+    release = threading.Event()
+    seen = []
+
+    def handler(memory_id):
+        release.wait(5)
+        seen.append(memory_id)
+
+    evolution = EvolutionQueue(handler, workers=1)
+    for memory_id in ["a", "b", "c"]:
+        evolution.submit(memory_id)
+    release.set()
+    evolution.close(timeout=5)
+    assert seen == ["a", "b", "c"]
+    with pytest.raises(RuntimeError):
+        evolution.submit("d")
+    evolution.close()  # A second close is a no-op
+
+
+def test_handler_runs_in_the_submitters_context():
+    seen = []
+    evolution = EvolutionQueue(lambda memory_id: seen.append((memory_id, REQUEST.get())), workers=2)
+    token = REQUEST.set("request-1")
+    evolution.submit("a")
+    REQUEST.reset(token)
+    evolution.submit("b")
+    assert evolution.join(timeout=5)
+    assert sorted(seen) == [("a", "request-1"), ("b", None)]
+    evolution.close()
+
+
+def test_striped_lock_excludes_other_threads_and_is_reentrant():
+    locks = StripedLock(stripes=8)
+    inside = threading.Event()
+    release = threading.Event()
+    acquired = []
+
+    def holder():
+        with locks.hold(["x"]):
+            inside.set()
+            release.wait(5)
+
+    def contender():
+        with locks.hold(["y", "x"]):
+            acquired.append(True)
+
+    first = threading.Thread(target=holder)
+    first.start()
+    assert inside.wait(5)
+    second = threading.Thread(target=contender)
+    second.start()
+    second.join(0.05)
+    assert acquired == []
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert acquired == [True]
+
+    with locks.hold(["x", ""]):
+        with locks.hold(["x"]):
+            pass
+
+
+def test_striped_lock_overlapping_sets_do_not_deadlock():
+    locks = StripedLock(stripes=4)
+    keys = [f"note-{i}" for i in range(16)]
+    done = []
+
+    def worker(order):
+        for _ in range(200):
+            with locks.hold(order):
+                pass
+        done.append(True)
+
+    threads = [threading.Thread(target=worker, args=(keys if i % 2 else keys[::-1],)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert len(done) == 4
+
+
+def test_create_returns_before_queued_evolution(make_memory_system, monkeypatch):
+    release = threading.Event()
+    evolved = []
+    system = make_memory_system(async_evolution=True, evolution_workers=1)
+
+    def process(note):
+        release.wait(5)
+        evolved.append(note.id)
+        return False
+
+    monkeypatch.setattr(system, "_process_memory_evolution", process)
+    first = system.create("A note evolved in the background")
+    second = system.create("A second note queued behind it")
+    assert evolved == []
+    assert not system.wait_for_evolution(timeout=0.05)
+    release.set()
+    assert system.wait_for_evolution(timeout=5)
+    assert evolved == [first, second]
+    assert system.stats()["evolution_queue"]["processed"] == 2
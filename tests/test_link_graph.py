@@ -0,0 +1,123 @@
+"""LinkGraph against a plain adjacency model, and link expansion in search"""
+import random
+
+import pytest
+
+from link_graph import LinkGraph
+
+
+@pytest.mark.parametrize("rebuild_threshold", [1, 7, 100000])
+def test_matches_adjacency_model(rebuild_threshold):
+    rng = random.Random(rebuild_threshold)
+    ids = [f"m{i}" for i in range(30)]
+    graph = LinkGraph(rebuild_threshold=rebuild_threshold)
+    links = {}
+    alive = set()
+    removed = set()
+    for _ in range(400):
+        source = rng.choice(ids)
+        action = rng.random()
+        removed.discard(source)
+        # Links to removed notes are ignored
+        targets = [target for target in rng.sample(ids, rng.randint(0, 4))
+                   if target != source and target not in removed]
+        if action < 0.45:
+            graph.set_links(source, targets)
+            links[source] = set(targets)
+            alive.update([source], targets)
+        elif action < 0.8:
+            graph.add_links(source, targets)
+            links.setdefault(source, set()).update(targets)
+            alive.update([source], targets)
+        else:
+            graph.remove(source)
+            links.pop(source, None)
+            for linked in links.values():
+                linked.discard(source)
+            alive.discard(source)
+            removed.add(source)
+
+    edges = {(source, target) for source, targets in links.items() for target in targets
+             if source in alive and target in alive}
+    assert len(graph) == len(alive)
+    assert graph.stats()["edges"] == len(edges)
+    for memory_id in ids:
+        out = {target for source, target in edges if source == memory_id}
+        into = {source for source, target in edges if target == memory_id}
+        assert set(graph.neighbors(memory_id, "out")) == out
+        assert set(graph.neighbors(memory_id, "in")) == into
+        assert set(graph.neighbors(memory_id)) == out | into
+    graph.rebuild()
+    assert graph.stats() == {"nodes": len(alive), "edges": len(edges), "pending_changes": 0}
+
+
+def test_expand_records_hops_and_seeds():
+    graph = LinkGraph()
+    graph.set_links("a", ["b"])
+    graph.set_links("b", ["c"])
+    graph.set_links("x", ["a"])
+    assert graph.expand(["a"], hops=1, direction="out") == {"b": (1, "a")}
+    assert graph.expand(["a"], hops=2, direction="out") == {"b": (1, "a"), "c": (2, "a")}
+    assert graph.expand(["a"], hops=1) == {"b": (1, "a"), "x": (1, "a")}
+    assert graph.expand(["missing"], hops=3) == {}
+    with pytest.raises(ValueError):
+        graph.neighbors("a", "sideways")
+
+
+def test_links_to_a_removed_note_do_not_revive_it():
+    graph = LinkGraph()
+    graph.set_links("a", ["b"])
+    graph.remove("b")
+    graph.set_links("a", ["b", "c"])
+    graph.add_links("d", ["b"])
+    assert graph.neighbors("a", "out") == ["c"]
+    assert graph.neighbors("b") == []
+    assert graph.expand(["d"], hops=2) == {}
+    assert graph.stats()["nodes"] == 3
+    # A removed note that is indexed again takes links once more
+    graph.set_links("b", [])
+    graph.add_links("d", ["b"])
+    assert graph.neighbors("b", "in") == ["d"]
+
+
+def test_search_expands_links_from_hits(make_lexical_system):
+    system = make_lexical_system()
+    target = system.create("Notes on the heron migration", category="birds")
+    hit = system.create("Zebra crossing survey")
+    system.update(hit, links=[target])
+    two_hops = system.create("Wetland water levels")
+    system.update(target, links=[two_hops])
+
+    [result] = system.search("zebra", k=5)
+    assert result["id"] == hit
+    results = system.search("zebra", k=5, expand_links=1)
+    assert [memory["id"] for memory in results] == [hit, target]
+    assert results[1]["linked_from"] == hit
+    assert results[1]["score"] == pytest.approx(result["score"] * 0.5)
+    results = system.search("zebra", k=5, expand_links=2)
+    assert [memory["id"] for memory in results] == [hit, target, two_hops]
+    # Filters apply to linked notes as well
+    results = system.search("zebra", k=5, expand_links=2, category="birds")
+    assert results == []
+
+
+def test_links_to_deleted_notes_get_no_edges(make_memory_system, tmp_path):
+    system = make_memory_system(persist_dir=str(tmp_path))
+    a = system.create("First note")
+    b = system.create("Second note")
+    system.update(a, links=[b])
+    assert system.delete(b)
+    assert system.neighbors(a) == []
+
+    c = system.create("Third note")
+    system.update(c, links=[b, a])
+    # The stale link is kept on the note, but the deleted note is not revived
+    assert system.read(c).links == (b, a)
+    assert [note.id for note in system.neighbors(c)] == [a]
+    assert system.link_graph.stats()["nodes"] == 2
+    system.close()
+
+    restarted = make_memory_system(persist_dir=str(tmp_path))
+    assert [note.id for note in restarted.neighbors(c)] == [a]
+    assert restarted.link_graph.stats()["nodes"] == 2
+    assert restarted.link_graph.stats()["edges"] == 1
@@ -0,0 +1,115 @@
+"""LLMResponseCache and the caching controller"""
+import asyncio
+
+from llm_cache import LLMResponseCache, CachingLLMController
+from metrics import LLM_SECONDS, llm_purpose
+from test_utils import MockLLMController
+
+
+class CountingLLM(MockLLMController):
+    def __init__(self):
+        super().__init__()
+        self.mock_response = '{"keywords": ["a"]}'
+        self.calls = 0
+
+    def get_completion(self, prompt: str, response_format: dict = None, temperature: float = 0.7) -> str:
+        self.calls += 1
+        return self.mock_response
+
+
+def make_controller(tmp_path, **kwargs):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"), **kwargs)
+    return CachingLLMController(CountingLLM(), cache, "openai", "gpt-4"), cache
+
+
+def request_count(purpose: str) -> int:
+    return LLM_SECONDS.labels(purpose).count
+
+
+def test_only_misses_are_timed_as_llm_requests(tmp_path):
+    controller, cache = make_controller(tmp_path)
+    before = request_count("test-sync")
+    with llm_purpose("test-sync"):
+        for _ in range(3):
+            controller.get_completion_with_timeout("prompt", None, 0.0, timeout=5.0)
+    assert controller.llm.calls == 1
+    assert request_count("test-sync") == before + 1
+    assert cache.stats()["hits"] == 2
+    cache.close()
+
+
+def test_async_completion_uses_the_cache(tmp_path):
+    controller, cache = make_controller(tmp_path)
+    before = request_count("test-async")
+
+    async def run():
+        with llm_purpose("test-async"):
+            return [await controller.aget_completion("prompt", None, 0.0, timeout=5.0) for _ in range(3)]
+
+    assert asyncio.run(run()) == [controller.llm.mock_response] * 3
+    assert controller.llm.calls == 1
+    assert request_count("test-async") == before + 1
+    cache.close()
+
+
+def test_nonzero_temperature_and_error_responses_are_not_cached(tmp_path):
+    controller, cache = make_controller(tmp_path)
+    controller.get_completion("prompt", None, 0.7)
+    controller.get_completion("prompt", None, 0.7)
+    assert controller.llm.calls == 2
+
+    controller.llm.mock_response = "{}"
+    controller.get_completion("other", None, 0.0)
+    controller.get_completion("other", None, 0.0)
+    assert controller.llm.calls == 4
+    assert cache.stats()["entries"] == 0
+    cache.close()
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    import llm_cache
+
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"), ttl_seconds=10)
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    key = cache.make_key("openai", "gpt-4", "prompt", 0.0, None)
+    cache.put(key, "response")
+    now[0] += 5
+    assert cache.get(key) == "response"
+    now[0] += 10
+    assert cache.get(key) is None
+    assert cache.stats()["entries"] == 0
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    import llm_cache
+
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"), max_entries=3)
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    keys = [cache.make_key("openai", "gpt-4", f"prompt {i}", 0.0, None) for i in range(4)]
+    for key in keys[:3]:
+        now[0] += 1
+        cache.put(key, "response")
+    now[0] += 1
+    assert cache.get(keys[0]) == "response"  # Now the most recently used
+    now[0] += 1
+    cache.put(keys[3], "response")
+    assert cache.stats()["entries"] <= 3
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "response"
+    assert cache.get(keys[3]) == "response"
+    cache.close()
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+    cache = LLMResponseCache(path)
+    key = cache.make_key("ollama", "llama2", "prompt", 0.0, {"type": "json_object"})
+    cache.put(key, "response")
+    cache.close()
+    reopened = LLMResponseCache(path)
+    assert reopened.get(key) == "response"
+    assert reopened.stats()["entries"] == 1
+    reopened.close()
@@ -0,0 +1,115 @@
+"""Concurrency cap, deadline and timeout handling of the OpenAI controller"""
+import time
+import types
+import threading
+
+import pytest
+
+from llm_controller import OpenAIController
+
+
+class StubCompletions:
+    """Stands in for client.chat.completions, recording timeouts and concurrency"""
+
+    def __init__(self, delay: float = 0.0, fail_first: bool = False):
+        self.delay = delay
+        self.fail_first = fail_first
+        self.timeouts = []
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.timeouts.append(kwargs.get("timeout"))
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            fail = self.fail_first and len(self.timeouts) == 1
+        try:
+            time.sleep(self.delay)
+            if fail:
+                raise RuntimeError("response_format not supported")
+            message = types.SimpleNamespace(content='{"ok": true}')
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def make_controller(completions: StubCompletions, max_concurrency: int = 8, api_base=None) -> OpenAIController:
+    controller = OpenAIController("gpt-4", api_key="test-key", api_base=api_base, max_concurrency=max_concurrency)
+    controller.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+    return controller
+
+
+def test_client_retries_are_disabled():
+    controller = make_controller(StubCompletions())
+    assert controller._client_kwargs["max_retries"] == 0
+
+
+def test_blocking_calls_are_capped():
+    completions = StubCompletions(delay=0.05)
+    controller = make_controller(completions, max_concurrency=2)
+    threads = [threading.Thread(target=controller.get_completion_with_timeout, args=("prompt", None, 0.7, 5.0))
+               for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(completions.timeouts) == 6
+    assert completions.peak == 2
+
+
+def test_waiting_for_a_slot_counts_against_the_timeout():
+    controller = make_controller(StubCompletions(), max_concurrency=1)
+    controller._blocking_slots().acquire()
+    try:
+        with pytest.raises(TimeoutError):
+            controller.get_completion_with_timeout("prompt", None, 0.7, 0.05)
+    finally:
+        controller._blocking_slots().release()
+
+
+def test_retry_without_response_format_shares_the_deadline():
+    completions = StubCompletions(delay=0.1, fail_first=True)
+    controller = make_controller(completions, api_base="http://localhost:1234/v1")
+    assert controller.get_completion_with_timeout("prompt", None, 0.7, 1.0) == '{"ok": true}'
+    first, retry = completions.timeouts
+    assert first <= 1.0
+    assert retry <= first - 0.1
+
+
+class TimingOutCompletions(StubCompletions):
+    """client.chat.completions whose every request times out"""
+
+    def create(self, **kwargs):
+        import httpx
+        import openai
+
+        self.timeouts.append(kwargs.get("timeout"))
+        raise openai.APITimeoutError(request=httpx.Request("POST", "http://localhost:1234/v1/chat/completions"))
+
+
+def test_request_timeout_is_raised_without_a_retry():
+    completions = TimingOutCompletions()
+    controller = make_controller(completions, api_base="http://localhost:1234/v1")
+    with pytest.raises(TimeoutError):
+        controller.get_completion_with_timeout("prompt", None, 0.7, 1.0)
+    assert len(completions.timeouts) == 1
+
+
+def test_async_request_timeout_is_raised_without_a_retry():
+    import asyncio
+
+    completions = TimingOutCompletions()
+    controller = make_controller(completions, api_base="http://localhost:1234/v1")
+
+    class AsyncCompletions:
+        async def create(self, **kwargs):
+            return completions.create(**kwargs)
+
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=AsyncCompletions()))
+    controller._async_client = lambda: client
+    with pytest.raises(TimeoutError):
+        asyncio.run(controller.aget_completion("prompt", None, 0.7))
+    assert len(completions.timeouts) == 1
@@ -0,0 +1,44 @@
+"""MemoryNote field storage"""
+import pytest
+
+import memory_system
+from memory_system import MemoryNote
+
+
+def test_context_is_not_interned():
+    before = len(memory_system._TERMS)
+    notes = [MemoryNote(content=f"note {i}", context=f"A unique context sentence number {i}",
+                        category="shared", tags=["t"], keywords=["k"]) for i in range(100)]
+    assert len(memory_system._TERMS) - before <= 3
+    assert notes[42].context == "A unique context sentence number 42"
+
+
+def test_fields_round_trip_through_dict():
+    note = MemoryNote(content="content", keywords=["a", "b"], links=["x"], context="ctx",
+                      category="cat", tags=["t"], timestamp="202401010000")
+    restored = MemoryNote.from_dict(note.to_dict())
+    assert restored.to_dict() == note.to_dict()
+    assert restored.context == "ctx" and restored.category == "cat"
+    assert restored.keywords == ("a", "b") and restored.links == ("x",)
+
+
+def test_list_fields_read_back_immutable():
+    note = MemoryNote(content="content", keywords=["k"], links=["x"], tags=["t"],
+                      evolution_history=[{"change": 1}])
+    with pytest.raises(AttributeError):
+        note.tags.append("lost")
+    with pytest.raises(AttributeError):
+        note.links.append("y")
+    note.tags = note.tags + ("kept",)
+    assert note.tags == ("t", "kept")
+    assert note.evolution_history == ({"change": 1},)
+    assert note.to_dict()["tags"] == ["t", "kept"]
+
+
+def test_non_string_links_are_rejected():
+    with pytest.raises(TypeError):
+        MemoryNote(content="content", links=["x", 42])
+    note = MemoryNote(content="content", links=["x"])
+    with pytest.raises(TypeError):
+        note.links = [None]
+    assert note.links == ("x",)
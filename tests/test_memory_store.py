@@ -0,0 +1,141 @@
+"""Tests for the durable note store."""
+import json
+import os
+import threading
+
+import pytest
+
+from memory_store import CorruptLogError, MemoryStore
+
+
+def note(memory_id, content="content"):
+    return {"id": memory_id, "content": content}
+
+
+def test_replays_log_after_restart(tmp_path):
+    store = MemoryStore(str(tmp_path))
+    assert store.load() == {}
+    store.record_create(note("a"))
+    store.record_create_many([note("b"), note("c")])
+    store.record_update(note("a", "updated"))
+    store.record_delete("b")
+    store.record_evolution([note("c", "evolved")])
+    store.close()
+
+    notes = MemoryStore(str(tmp_path)).load()
+    assert notes == {"a": note("a", "updated"), "c": note("c", "evolved")}
+
+
+def test_discards_torn_tail(tmp_path):
+    store = MemoryStore(str(tmp_path))
+    store.load()
+    store.record_create(note("a"))
+    store.close()
+    with open(store.log_path, "a", encoding="utf-8") as f:
+        f.write('{"op": "create", "note": {"id": "b"')
+
+    reopened = MemoryStore(str(tmp_path))
+    assert reopened.load() == {"a": note("a")}
+    # The torn bytes are truncated, so new records follow a complete line
+    reopened.record_create(note("c"))
+    reopened.close()
+    assert set(MemoryStore(str(tmp_path)).load()) == {"a", "c"}
+
+
+def test_refuses_to_load_past_corrupt_record_in_the_middle(tmp_path):
+    store = MemoryStore(str(tmp_path))
+    store.load()
+    store.record_create(note("a"))
+    store.close()
+    with open(store.log_path, "a", encoding="utf-8") as f:
+        f.write("not json\n")
+        f.write(json.dumps({"op": "create", "note": note("b"), "seq": 2}) + "\n")
+    size = os.path.getsize(store.log_path)
+
+    with pytest.raises(CorruptLogError):
+        MemoryStore(str(tmp_path)).load()
+    # The log is left as it was for inspection
+    assert os.path.getsize(store.log_path) == size
+
+
+def test_snapshot_rotates_log_and_survives_restart(tmp_path):
+    store = MemoryStore(str(tmp_path), snapshot_interval=2)
+    store.load()
+    store.record_create(note("a"))
+    assert not store.snapshot_due()
+    store.record_create(note("b"))
+    assert store.snapshot_due()
+    store.snapshot([note("a"), note("b")])
+    assert not store.snapshot_due()
+    # The rotated log is deleted once the snapshot covering it is in place
+    assert sorted(os.listdir(tmp_path)) == ["notes.log", "snapshot.jsonl"]
+    with open(store.log_path, encoding="utf-8") as f:
+        assert f.read() == ""
+
+    store.record_update(note("b", "after snapshot"))
+    store.close()
+
+    notes = MemoryStore(str(tmp_path), snapshot_interval=2).load()
+    assert notes == {"a": note("a"), "b": note("b", "after snapshot")}
+
+
+def test_background_snapshot_does_not_block_appends(tmp_path):
+    store = MemoryStore(str(tmp_path), snapshot_interval=1)
+    store.load()
+    store.record_create(note("a"))
+    consumed = threading.Event()
+    release = threading.Event()
+
+    def slow_notes():
+        yield note("a")
+        consumed.set()
+        release.wait(5)
+
+    store.snapshot(slow_notes(), background=True)
+    assert consumed.wait(5)
+    # Appends go to the fresh log while the snapshot is still being written
+    store.record_create(note("b"))
+    assert not store.snapshot_due()
+    assert os.path.exists(store.log_path + ".1")
+    release.set()
+    store.close()
+
+    assert sorted(os.listdir(tmp_path)) == ["notes.log", "snapshot.jsonl"]
+    assert MemoryStore(str(tmp_path)).load() == {"a": note("a"), "b": note("b")}
+
+
+def test_replays_rotated_log_when_snapshot_did_not_complete(tmp_path):
+    store = MemoryStore(str(tmp_path))
+    store.load()
+    store.record_create(note("a"))
+    store.snapshot([note("a")])
+    store.record_create(note("b"))
+
+    def failing_notes():
+        yield note("a")
+        raise OSError("disk full")
+
+    # The snapshot fails after the log was rotated: notes.log.2 holds "b"
+    store.snapshot(failing_notes())
+    store.record_delete("a")
+    store.close()
+    assert os.path.exists(store.log_path + ".2")
+
+    assert MemoryStore(str(tmp_path)).load() == {"b": note("b")}
+
+
+def test_records_covered_by_snapshot_are_not_replayed(tmp_path):
+    store = MemoryStore(str(tmp_path))
+    store.load()
+    store.record_create(note("a"))
+    store.record_delete("a")
+    # Simulate a crash after writing the snapshot but before deleting the rotated log
+    with open(store.log_path, encoding="utf-8") as f:
+        log = f.read()
+    store.snapshot([])
+    store.close()
+    with open(store.log_path + ".2", "w", encoding="utf-8") as f:
+        f.write(log)
+
+    assert MemoryStore(str(tmp_path)).load() == {}
+    assert not os.path.exists(store.log_path + ".2")
@@ -0,0 +1,58 @@
+"""MetadataIndex filters and time bounds"""
+from datetime import datetime
+
+import pytest
+
+from metadata_index import MetadataIndex, parse_time_bound
+
+
+@pytest.fixture
+def index():
+    index = MetadataIndex()
+    index.add("a", ["x", "y"], "work", "202401010930")
+    index.add("b", ["x"], "home", "202401150000")
+    index.add("c", ["y"], "work", "202402011200")
+    index.add("d", [], None, "not a timestamp")
+    return index
+
+
+def test_no_filter_returns_none(index):
+    assert index.filter() is None
+
+
+def test_tags_and_category_intersect(index):
+    assert index.filter(tags=["x"]) == {"a", "b"}
+    assert index.filter(tags=["x", "y"]) == {"a"}
+    assert index.filter(tags=["y"], category="work") == {"a", "c"}
+    assert index.filter(tags=["missing"]) == set()
+
+
+def test_time_bounds_are_inclusive_and_padded(index):
+    assert index.filter(since="20240115") == {"b", "c"}
+    assert index.filter(until="20240115") == {"a", "b"}
+    assert index.filter(since=datetime(2024, 1, 1, 9, 30), until="2024-01-31") == {"a", "b"}
+    assert index.filter(tags=["x"], since="20240102") == {"b"}
+
+
+def test_replacing_and_removing_entries(index):
+    index.add("a", ["z"], "home", "202403010000")
+    assert index.filter(tags=["x"]) == {"b"}
+    assert index.filter(category="home", since="20240301") == {"a"}
+    assert index.remove("a")
+    assert not index.remove("a")
+    assert index.filter(tags=["z"]) == set()
+
+
+@pytest.mark.parametrize("bound", ["yesterday", "2024", "", "20241301", "2024013125"])
+def test_malformed_bounds_raise(index, bound):
+    with pytest.raises(ValueError):
+        index.filter(since=bound)
+    with pytest.raises(ValueError):
+        index.filter(until=bound)
+
+
+def test_parse_time_bound():
+    assert parse_time_bound(None) is None
+    assert parse_time_bound("20240131") == 202401310000
+    assert parse_time_bound("20240131", upper=True) == 202401312359
+    assert parse_time_bound(202401311015) == 202401311015
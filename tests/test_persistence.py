@@ -0,0 +1,161 @@
+"""Restart tests for notes kept in a durable store."""
+import pytest
+
+
+def test_update_survives_snapshot_and_restart(make_memory_system, tmp_path):
+    system = make_memory_system(persist_dir=str(tmp_path), snapshot_interval=1)
+    memory_id = system.create("A note about durable storage", category="c")
+
+    assert system.update(memory_id, category="NEW")
+    assert system.read(memory_id).category == "NEW"
+    system.close()
+
+    restarted = make_memory_system(persist_dir=str(tmp_path), snapshot_interval=1)
+    assert restarted.read(memory_id).category == "NEW"
+
+
+def test_update_many_survives_restart(make_memory_system, tmp_path):
+    system = make_memory_system(persist_dir=str(tmp_path), snapshot_interval=3)
+    ids = [system.create(f"Note number {i} about restarts") for i in range(5)]
+
+    found = system.update_many({memory_id: {"tags": ["bulk"], "context": f"Context {i}"}
+                                for i, memory_id in enumerate(ids)})
+    assert found == ids
+    system.close()
+
+    restarted = make_memory_system(persist_dir=str(tmp_path), snapshot_interval=3)
+    for i, memory_id in enumerate(ids):
+        note = restarted.read(memory_id)
+        assert note.tags == ("bulk",)
+        assert note.context == f"Context {i}"
+    assert restarted.metadata_index.filter(tags=["bulk"]) == set(ids)
+
+
+
+def test_create_many_survives_restart(make_memory_system, tmp_path):
+    system = make_memory_system(persist_dir=str(tmp_path), snapshot_interval=100)
+    with pytest.raises(ValueError):
+        system.create_many(["one", "two"], metadata=[{}])
+    ids = system.create_many([f"Imported transcript {i}" for i in range(4)],
+                             metadata=[{"tags": ["import"], "category": f"c{i}"} for i in range(4)],
+                             max_workers=2, evolve=False)
+    assert len(set(ids)) == 4
+    system.close()
+
+    restarted = make_memory_system(persist_dir=str(tmp_path), snapshot_interval=100)
+    assert [restarted.read(memory_id).content for memory_id in ids] == [f"Imported transcript {i}" for i in range(4)]
+    assert [restarted.read(memory_id).category for memory_id in ids] == ["c0", "c1", "c2", "c3"]
+    assert restarted.metadata_index.filter(tags=["import"]) == set(ids)
+
+def test_evolution_patch_survives_snapshot_and_restart(make_memory_system, tmp_path):
+    system = make_memory_system(persist_dir=str(tmp_path), snapshot_interval=1)
+    new_id = system.create("A new note about evolution")
+    neighbor_id = system.create("A neighboring note about evolution")
+
+    decision = {
+        "actions": ["strengthen", "update_neighbor"],
+        "suggested_connections": [neighbor_id, "made-up-id"],
+        "tags_to_update": ["evolved"],
+        "new_context_neighborhood": ["Rewritten context"],
+        "new_tags_neighborhood": [["neighbor"]],
+    }
+    patch = system._build_evolution_patch(new_id, decision, [neighbor_id])
+    updated = system._apply_evolution_patch(patch)
+    assert {note.id for note in updated} == {new_id, neighbor_id}
+    system.close()
+
+    restarted = make_memory_system(persist_dir=str(tmp_path), snapshot_interval=1)
+    new_note, neighbor = restarted.read(new_id), restarted.read(neighbor_id)
+    assert new_note.links == (neighbor_id,)
+    assert new_note.tags == ("evolved",)
+    assert neighbor.context == "Rewritten context"
+    assert neighbor.tags == ("neighbor",)
+    assert restarted.neighbors(new_id, direction="out")[0].id == neighbor_id
+
+
+def test_concurrent_writers_survive_snapshots_and_restart(make_memory_system, tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    system = make_memory_system(persist_dir=str(tmp_path), snapshot_interval=2)
+    ids = [system.create(f"Note number {i} about concurrency") for i in range(20)]
+
+    def rewrite(index):
+        for round_number in range(5):
+            system.update(ids[index], context=f"Context {index}.{round_number}")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(rewrite, range(len(ids))))
+    expected = {memory_id: system.read(memory_id).to_dict() for memory_id in ids}
+    system.close()
+
+    restarted = make_memory_system(persist_dir=str(tmp_path), snapshot_interval=2)
+    assert {memory_id: restarted.read(memory_id).to_dict() for memory_id in ids} == expected
+
+
+def test_restore_reports_progress_per_batch(make_memory_system, tmp_path):
+    from retrievers import BM25Retriever
+
+    system = make_memory_system(persist_dir=str(tmp_path))
+    ids = [system.create(f"Restored note {i} about warm-up") for i in range(5)]
+    system.lexical_retriever = BM25Retriever()
+    reports = []
+    system._restore_indexes(batch_size=2, progress=lambda done, total: reports.append((done, total)))
+
+    assert reports == [(0, 5), (2, 5), (4, 5), (5, 5)]
+    assert {result["id"] for result in system.lexical_retriever.search("restored warm-up", 10)} == set(ids)
+
+
+def count_encoded_texts(monkeypatch):
+    from embedding_service import EmbeddingService
+
+    encoded = []
+    encode = EmbeddingService.encode
+
+    def counting_encode(self, texts, normalize=True):
+        encoded.extend(texts)
+        return encode(self, texts, normalize)
+
+    monkeypatch.setattr(EmbeddingService, "encode", counting_encode)
+    return encoded
+
+
+def test_restart_reuses_saved_embeddings(make_vector_system, tmp_path, monkeypatch):
+    persist_dir = str(tmp_path / "notes")
+    system = make_vector_system(persist_dir=persist_dir)
+    ids = [system.create(f"Note number {i} about saved embeddings") for i in range(4)]
+    system.close()
+
+    encoded = count_encoded_texts(monkeypatch)
+    restarted = make_vector_system(persist_dir=persist_dir)
+    assert encoded == []
+    assert len(restarted.retriever) == 4
+    assert restarted.search("number 2 embeddings", k=1)[0]["id"] == ids[2]
+
+
+def test_restart_encodes_notes_changed_after_the_save(make_vector_system, tmp_path, monkeypatch):
+    persist_dir = str(tmp_path / "notes")
+    system = make_vector_system(persist_dir=persist_dir)
+    ids = [system.create(f"Note number {i} about saved embeddings") for i in range(4)]
+    system.retriever.save(system._embeddings_path)
+    system.update(ids[1], content="Rewritten after the save")
+    added = system.create("Created after the save")
+    # Simulate a crash: the note store is durable, the saved vectors are stale
+    system.store.close()
+
+    encoded = count_encoded_texts(monkeypatch)
+    restarted = make_vector_system(persist_dir=persist_dir)
+    assert sorted(encoded) == sorted(restarted._index_document(restarted.read(memory_id))
+                                     for memory_id in (ids[1], added))
+    assert len(restarted.retriever) == 5
+    assert restarted.search("rewritten", k=1)[0]["id"] == ids[1]
+
+
+def test_snapshot_saves_embeddings(make_vector_system, tmp_path):
+    import os
+
+    persist_dir = str(tmp_path / "notes")
+    system = make_vector_system(persist_dir=persist_dir, snapshot_interval=2)
+    system.create("First note")
+    system.create("Second note")
+    system.store.wait_for_snapshot()
+    assert os.path.exists(system._embeddings_path)
@@ -0,0 +1,81 @@
+"""Reciprocal rank and weighted score fusion, and fused search through AgenticMemorySystem"""
+import numpy as np
+import pytest
+
+from memory_system import SEARCH_CANDIDATE_FACTOR
+from rank_fusion import fuse, reciprocal_rank_fusion, weighted_score_fusion
+
+
+def test_rrf_sums_reciprocal_ranks():
+    fused = reciprocal_rank_fusion([[("a", 0.9), ("b", 0.5)], [("b", 10.0), ("c", 3.0)]], rrf_k=60)
+    assert dict(fused) == pytest.approx({"a": 1 / 61, "b": 1 / 62 + 1 / 61, "c": 1 / 62})
+    assert [doc_id for doc_id, _ in fused] == ["b", "a", "c"]
+
+
+def test_rrf_weights_and_top_k():
+    fused = reciprocal_rank_fusion([[("a", 1.0)], [("b", 1.0)]], weights=[1.0, 2.0], top_k=1)
+    assert fused == [("b", pytest.approx(2 / 61))]
+
+
+def test_ties_keep_first_seen_order():
+    assert [doc_id for doc_id, _ in reciprocal_rank_fusion([[("a", 1.0)], [("b", 1.0)]])] == ["a", "b"]
+
+
+def test_weighted_fusion_normalizes_and_flips_distances():
+    fused = weighted_score_fusion(
+        [[("a", 0.1), ("b", 0.3), ("c", 0.5)], [("c", 8.0), ("a", 4.0)]],
+        higher_is_better=[False, True]
+    )
+    assert dict(fused) == pytest.approx({"a": 1.0, "b": 0.5, "c": 1.0})
+    assert [doc_id for doc_id, _ in fused] == ["a", "c", "b"]
+
+
+def test_weighted_fusion_with_equal_scores_and_empty_lists():
+    assert weighted_score_fusion([[("a", 2.0), ("b", 2.0)], []]) == [("a", 1.0), ("b", 1.0)]
+    assert fuse([[], []], method="weighted") == []
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        fuse([[("a", 1.0)]], method="max")
+
+
+def test_vector_retrievers_index_different_documents(make_vector_system):
+    from embedding_service import EmbeddingService
+
+    system = make_vector_system()
+    memory_id = system.create("Zebra herds cross the river at dawn", tags=["wildlife", "migration"])
+    note = system.read(memory_id)
+    stored = system.chroma_retriever.collection.get(ids=[memory_id], include=["embeddings"])
+    # ChromaDB embeds the content it stores; the embedding retriever the metadata-enhanced document
+    content_vector = EmbeddingService.fallback_encode([note.content])[0]
+    index_vector = EmbeddingService.fallback_encode([system._index_document(note)])[0]
+    assert np.allclose(stored["embeddings"][0], content_vector)
+    row = system.retriever.id_to_row[memory_id]
+    assert np.allclose(system.retriever.embeddings[row], index_vector)
+    assert not np.allclose(content_vector, index_vector)
+
+
+@pytest.mark.parametrize("method", ["rrf", "weighted"])
+def test_search_detailed_fuses_each_retriever_once(make_vector_system, method):
+    system = make_vector_system(fusion=method, fusion_weights={"chroma": 0.5})
+    system.create_many([
+        {"content": "Zebra herds cross the river at dawn"},
+        {"content": "Notes from the savanna trip", "tags": ["zebra"]},
+        {"content": "Grocery list: apples, bread, zebra cakes"},
+        {"content": "Quarterly planning for the platform team"},
+    ], evolve=False)
+    query, k = "zebra river", 3
+    pool = k * SEARCH_CANDIDATE_FACTOR
+    chroma = system._chroma_ranked_lists(system.chroma_retriever.search_many([query], pool), 1)[0]
+    embedding = [(r["id"], r["score"]) for r in system.retriever.search(query, pool)]
+    lexical = [(r["id"], r["score"]) for r in system.lexical_retriever.search(query, pool)]
+    expected = fuse([chroma, embedding, lexical], method=method, weights=[0.5, 1.0, 1.0],
+                    higher_is_better=[False, True, True], top_k=k)
+
+    detailed = system.search_detailed(query, k=k)
+    assert [(r["id"], r["score"]) for r in detailed["results"]] == [
+        (doc_id, pytest.approx(score)) for doc_id, score in expected]
+    assert len(detailed["results"]) == k
+    for stage in ("embed_ms", "chroma_ms", "embedding_ms", "lexical_ms", "fusion_ms", "total_ms"):
+        assert detailed["timings"][stage] >= 0.0
@@ -0,0 +1,58 @@
+"""Retrying ChromaDB re-index failures through the dirty set."""
+
+
+class FlakyChroma:
+    """ChromaRetriever stand-in that reports failures by returning False, like the real one"""
+
+    def __init__(self):
+        self.ok = False
+        self.upserted = []
+        self.updated = []
+
+    def upsert_documents(self, documents, metadatas, doc_ids, embeddings=None):
+        if self.ok:
+            self.upserted.extend(doc_ids)
+        return self.ok
+
+    def update_metadatas(self, metadatas, doc_ids):
+        if self.ok:
+            self.updated.extend(doc_ids)
+        return self.ok
+
+
+def make_system(make_memory_system):
+    system = make_memory_system()
+    ids = [system.create(f"Note number {i} about re-indexing") for i in range(3)]
+    system.chroma_retriever = FlakyChroma()
+    return system, ids
+
+
+def test_failed_update_reindex_is_retried_by_consolidation(make_memory_system):
+    system, ids = make_system(make_memory_system)
+
+    system.update(ids[0], content="Rewritten content")
+    system.update(ids[1], category="Work")
+    assert system._dirty_ids == {ids[0], ids[1]}
+
+    system.consolidate_memories()
+    assert system._dirty_ids == {ids[0], ids[1]}
+
+    system.chroma_retriever.ok = True
+    system.consolidate_memories()
+    assert system._dirty_ids == set()
+    assert sorted(system.chroma_retriever.upserted) == sorted([ids[0], ids[1]])
+
+
+def test_failed_evolution_reindex_is_retried_by_consolidation(make_memory_system):
+    system, ids = make_system(make_memory_system)
+
+    patch = system._build_evolution_patch(ids[0], {"actions": ["strengthen"],
+                                                   "suggested_connections": [ids[1]],
+                                                   "tags_to_update": ["linked"]}, [ids[1]])
+    assert system._apply_evolution_patch(patch)
+    assert system._dirty_ids == {ids[0]}
+
+    system.chroma_retriever.ok = True
+    system.consolidate_memories()
+    assert system._dirty_ids == set()
+    assert system.chroma_retriever.upserted == [ids[0]]
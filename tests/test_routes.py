@@ -0,0 +1,107 @@
+"""HTTP routes against a memory system without external services"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes
+from warmup import Warmup
+
+
+@pytest.fixture
+def client(make_lexical_system):
+    system = make_lexical_system()
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api/v1")
+
+    async def memory_system():
+        yield system
+
+    app.dependency_overrides[routes.get_memory_system] = memory_system
+    with TestClient(app) as client:
+        client.memory_system = system
+        yield client
+
+
+@pytest.mark.parametrize("params", [{"since": "last week"}, {"until": "20241340"}, {"fusion": "max"}])
+def test_search_rejects_bad_parameters(client, params):
+    response = client.get("/api/v1/search", params={"query": "anything", **params})
+    assert response.status_code == 400
+
+
+def test_search_accepts_valid_bounds(client):
+    response = client.get("/api/v1/search", params={"query": "anything", "since": "20240101", "until": "2024-12-31"})
+    assert response.status_code == 200
+    assert response.json()["results"] == []
+
+
+def test_batch_create(client):
+    response = client.post("/api/v1/memories:batch", json={"evolve": False, "memories": [
+        {"content": "Quarterly planning notes for the zebra project", "tags": ["planning"], "category": "work"},
+        {"content": "Zebra sightings on the weekend trip", "tags": ["travel"], "timestamp": "202301150900"},
+    ]})
+    assert response.status_code == 201
+    memories = response.json()["memories"]
+    assert [memory["tags"] for memory in memories] == [["planning"], ["travel"]]
+    assert memories[0]["category"] == "work"
+    assert memories[1]["timestamp"] == "202301150900"
+    for memory in memories:
+        assert client.get(f"/api/v1/memories/{memory['id']}").json()["content"] == memory["content"]
+
+
+def test_search_filters(client):
+    created = client.post("/api/v1/memories:batch", json={"evolve": False, "memories": [
+        {"content": "zebra alpha", "tags": ["x"], "category": "work", "timestamp": "202401010000"},
+        {"content": "zebra beta", "tags": ["x", "y"], "category": "home", "timestamp": "202402010000"},
+        {"content": "zebra gamma", "tags": ["y"], "category": "work", "timestamp": "202403010000"},
+    ]}).json()["memories"]
+    a, b, c = (memory["id"] for memory in created)
+
+    def search(**params):
+        response = client.get("/api/v1/search", params={"query": "zebra", "k": 10, **params})
+        assert response.status_code == 200
+        return {result["id"] for result in response.json()["results"]}
+
+    assert search() == {a, b, c}
+    assert search(tags=["x"]) == {a, b}
+    assert search(tags=["x", "y"]) == {b}
+    assert search(category="work") == {a, c}
+    assert search(since="20240201") == {b, c}
+    assert search(until="20240201", category="work") == {a}
+    assert search(tags=["missing"]) == set()
+
+
+@pytest.fixture
+def server_client(make_memory_system, monkeypatch):
+    """Client for the full app, with a warm-up that has not started yet"""
+    import server
+
+    system = make_memory_system()
+    warmup = Warmup(lambda: system)
+    monkeypatch.setattr(server, "warmup", warmup)
+    monkeypatch.setattr(routes, "warmup", warmup)
+    client = TestClient(server.create_app())  # Not entered, so the real warm-up never starts
+    client.warmup = warmup
+    return client
+
+
+def test_ready_reports_warmup(server_client):
+    pending = server_client.get("/ready")
+    assert pending.status_code == 503
+    assert pending.json()["status"] == "pending"
+    assert server_client.get("/health").status_code == 200
+
+    server_client.warmup.start(background=False)
+    ready = server_client.get("/ready")
+    assert ready.status_code == 200
+    assert ready.json()["status"] == "ready"
+
+
+def test_metrics_exposition(server_client):
+    assert "amem_ready 0" in server_client.get("/metrics").text
+
+    server_client.warmup.start(background=False)
+    metrics = server_client.get("/metrics")
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert "amem_ready 1" in metrics.text
+    assert "amem_memories 0" in metrics.text
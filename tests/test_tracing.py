@@ -0,0 +1,131 @@
+"""Span tracing: sampling, JSON lines export and trace ID propagation"""
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import routes
+import tracing
+from tracing import JsonLinesExporter, Tracer
+
+
+def read_traces(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def traced_to(tmp_path):
+    """Record every trace of the process-wide tracer to a file, restoring it afterwards"""
+    path = tmp_path / "traces.jsonl"
+    tracing.configure(1.0, str(path))
+    yield path
+    tracing.configure(0.0, None)
+
+
+def test_unsampled_traces_keep_an_id_and_record_nothing(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(sample_rate=0.0, exporter=JsonLinesExporter(str(path)))
+    with tracer.trace("request", trace_id="abc") as trace:
+        assert trace.trace_id == "abc" and not trace.sampled
+        with tracer.span("stage") as span:
+            assert span is None
+    with tracer.trace("forced", sampled=True):
+        pass
+    tracer.exporter.close()
+    assert [trace["name"] for trace in read_traces(path)] == ["forced"]
+
+
+def test_sampled_trace_is_exported_as_one_json_line(tmp_path):
+    path = tmp_path / "nested" / "traces.jsonl"
+    tracer = Tracer(sample_rate=1.0, exporter=JsonLinesExporter(str(path)))
+    with pytest.raises(ValueError):
+        with tracer.trace("request", user="u1") as trace:
+            with tracer.span("outer", size=2) as outer:
+                outer.set(hits=1)
+                with tracer.span("inner"):
+                    pass
+            with tracer.span("failing"):
+                raise ValueError("boom")
+    with tracer.trace("skipped", sampled=False):
+        pass
+    tracer.exporter.close()
+
+    [exported] = read_traces(path)
+    assert exported["trace_id"] == trace.trace_id
+    assert exported["duration_ms"] >= 0
+    spans = {span["name"]: span for span in exported["spans"]}
+    assert set(spans) == {"request", "outer", "inner", "failing"}
+    assert spans["request"]["parent_id"] is None
+    assert spans["request"]["attributes"] == {"user": "u1"}
+    assert "boom" in spans["request"]["error"]
+    assert spans["outer"]["parent_id"] == spans["request"]["span_id"]
+    assert spans["inner"]["parent_id"] == spans["outer"]["span_id"]
+    assert spans["outer"]["attributes"] == {"size": 2, "hits": 1}
+    assert "boom" in spans["failing"]["error"] and spans["inner"]["error"] is None
+
+
+def test_continue_trace_keeps_the_id_and_sampling_decision():
+    tracer = Tracer(sample_rate=1.0)
+    with tracer.trace("request", sampled=False) as request:
+        with tracer.continue_trace("queued") as queued:
+            assert queued.trace_id == request.trace_id
+            assert not queued.sampled
+    with tracer.continue_trace("standalone") as standalone:
+        assert standalone.sampled and standalone.trace_id != request.trace_id
+
+
+def test_propagated_trace_ids_are_truncated():
+    with Tracer().trace("request", trace_id="x" * 500) as trace:
+        assert trace.trace_id == "x" * 64
+
+
+def test_mcp_trace_headers():
+    assert tracing.mcp_trace_headers({"_meta": {"trace_id": "t-1"}}) == {tracing.TRACE_HEADER: "t-1"}
+    generated = tracing.mcp_trace_headers(None)[tracing.TRACE_HEADER]
+    assert generated and generated != tracing.mcp_trace_headers({})[tracing.TRACE_HEADER]
+
+
+def test_create_records_its_stages(make_memory_system, traced_to):
+    system = make_memory_system()
+    with tracing.trace("create") as trace:
+        system.create("A traced note about deployment")
+    tracing.tracer.exporter.close()
+
+    [exported] = read_traces(traced_to)
+    assert exported["trace_id"] == trace.trace_id
+    names = [span["name"] for span in exported["spans"]]
+    assert {"create", "analyze", "persist"} <= set(names)
+
+
+def test_http_trace_id_is_propagated(make_memory_system, monkeypatch, tmp_path):
+    import server
+
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(server.settings, "TRACE_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(server.settings, "TRACE_FILE", str(path))
+    system = make_memory_system()
+    app = server.create_app()
+
+    async def memory_system():
+        yield system
+
+    app.dependency_overrides[routes.get_memory_system] = memory_system
+    try:
+        client = TestClient(app)  # Not entered, so the real warm-up never starts
+        response = client.post("/api/v1/memories", json={"content": "A note created over HTTP"},
+                               headers={tracing.TRACE_HEADER: "request-42", tracing.SAMPLED_HEADER: "1"})
+        assert response.status_code in (200, 201)
+        assert response.headers[tracing.TRACE_HEADER] == "request-42"
+
+        unsampled = client.get("/health")
+        assert unsampled.headers[tracing.TRACE_HEADER]
+        tracing.tracer.exporter.close()
+    finally:
+        tracing.configure(0.0, None)
+
+    [exported] = read_traces(path)
+    assert exported["trace_id"] == "request-42"
+    assert exported["name"] == "POST /api/v1/memories"
+    names = {span["name"] for span in exported["spans"]}
+    assert {"analyze", "persist"} <= names
@@ -0,0 +1,108 @@
+"""IVFIndex bucketing, background training and recall against exact search"""
+import threading
+
+import numpy as np
+
+from retrievers import SimpleEmbeddingRetriever
+from vector_index import IVFIndex
+
+
+def clustered(n: int, d: int = 32, clusters: int = 50, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, d)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, n)] + 0.3 * rng.normal(size=(n, d))
+    queries = centers[rng.integers(0, clusters, 50)] + 0.3 * rng.normal(size=(50, d))
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+
+def check_buckets(index: IVFIndex, rows: int):
+    """Every row sits in exactly its assigned bucket at its recorded position"""
+    seen = 0
+    for bucket, members in enumerate(index._lists):
+        for position, row in enumerate(members):
+            assert index._assignment[row] == bucket
+            assert index._position[row] == position
+        seen += len(members)
+    assert seen == rows == int((index._assignment >= 0).sum())
+
+
+class GatedIVFIndex(IVFIndex):
+    """IVFIndex whose training blocks until the test releases it"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.release = threading.Event()
+
+    def _fit(self, vectors):
+        self.release.wait(10)
+        return super()._fit(vectors)
+
+
+def test_background_training_keeps_rows_added_meanwhile():
+    vectors, _ = clustered(3000)
+    index = GatedIVFIndex(train_threshold=1000, seed=1)
+    index.add(np.arange(1000), vectors[:1000], all_vectors=vectors[:1000])
+    assert index.training and not index.trained
+    assert index.candidates(vectors[0]) is None  # Exact search until the swap
+
+    index.add(np.arange(1000, 3000), vectors[1000:3000], all_vectors=vectors[:3000])
+    index.update(5, vectors[2999])
+    index.release.set()
+    assert index.wait_for_training(10)
+    assert index.trained
+    check_buckets(index, 3000)
+    assert index._assignment[5] == index._assignment[2999]
+
+
+def test_remap_during_training_discards_the_result():
+    vectors, _ = clustered(1000)
+    index = GatedIVFIndex(train_threshold=1000)
+    index.add(np.arange(1000), vectors, all_vectors=vectors)
+    mapping = np.arange(1000)
+    mapping[::2] = -1
+    mapping[1::2] = np.arange(500)
+    index.remap(mapping)
+    index.release.set()
+    assert index.wait_for_training(10)
+    assert not index.trained
+
+
+def test_update_moves_rows_between_buckets():
+    vectors, _ = clustered(2000)
+    index = IVFIndex(train_threshold=1000, background=False)
+    index.add(np.arange(2000), vectors, all_vectors=vectors)
+    for row in range(0, 2000, 7):
+        index.update(row, vectors[(row * 13) % 2000])
+    check_buckets(index, 2000)
+
+
+def recall(retriever, exact, queries, k: int = 10) -> float:
+    hits = 0
+    for query in queries:
+        found = {result["id"] for result in retriever.search_many(["q"], k, query_embeddings=query[None])[0]}
+        truth = {result["id"] for result in exact.search_many(["q"], k, query_embeddings=query[None])[0]}
+        hits += len(found & truth)
+    return hits / (k * len(queries))
+
+
+def test_recall_against_exact_through_delete_and_compact():
+    vectors, queries = clustered(4000)
+    ids = [f"id{i}" for i in range(len(vectors))]
+    exact = SimpleEmbeddingRetriever(index="exact")
+    ivf = SimpleEmbeddingRetriever(index=IVFIndex(nprobe=8, train_threshold=2000, background=False))
+    for retriever in (exact, ivf):
+        for start in range(0, len(ids), 500):
+            retriever.add_documents(ids[start:start + 500], ids[start:start + 500],
+                                    embeddings=vectors[start:start + 500])
+    assert ivf.index.trained
+    assert recall(ivf, exact, queries) >= 0.9
+
+    for retriever in (exact, ivf):
+        for doc_id in ids[::3]:
+            retriever.delete_document(doc_id)
+        retriever.compact()
+    check_buckets(ivf.index, len(ivf))
+    assert recall(ivf, exact, queries) >= 0.9
+    deleted = set(ids[::3])
+    for query in queries:
+        assert not deleted & {result["id"] for result in ivf.search_many(["q"], 10, query_embeddings=query[None])[0]}
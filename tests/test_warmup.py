@@ -0,0 +1,10 @@
+"""Warm-up status reporting"""
+from warmup import Warmup
+
+
+def test_progress_is_reported_in_status():
+    warmup = Warmup(lambda: warmup.report_progress("restore_indexes", 3, 4) or "built")
+    warmup.start(background=False)
+    status = warmup.status()
+    assert warmup.ready
+    assert status["progress"] == {"restore_indexes": {"done": 3, "total": 4}}
@@ -0,0 +1,293 @@
+"""
+Lightweight span tracing for memory operations.
+
+A trace is started per HTTP request (or per queued evolution) and spans
+are opened around the stages of create() and search(): content analysis,
+the LLM call, JSON extraction, ChromaDB and embedding index writes, and the
+evolution search, LLM call and apply. The current trace lives in a
+contextvar, so spans nest across function calls and follow requests into
+worker threads started with anyio or contextvars.copy_context().
+
+Sampling is decided once per trace (head-based): an unsampled trace keeps
+its trace ID for propagation but records nothing, and span() costs a
+single contextvar lookup. Finished sampled traces are written as one JSON
+line each to a local file.
+"""
+import contextlib
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# HTTP headers carrying the trace ID and an optional sampling decision ("1" or "0")
+TRACE_HEADER = "X-Trace-Id"
+SAMPLED_HEADER = "X-Trace-Sampled"
+
+
+class Span:
+    """A timed stage within a trace"""
+
+    __slots__ = ("span_id", "parent_id", "name", "start", "end", "attributes", "error")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes):
+        """Attach attributes to the span"""
+        self.attributes.update(attributes)
+
+
+class Trace:
+    """The spans recorded under one trace ID"""
+
+    __slots__ = ("trace_id", "sampled", "name", "started_at", "root", "spans", "_lock")
+
+    def __init__(self, name: str, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.name = name
+        self.started_at = time.time()
+        self.root: Optional[Span] = None
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def set(self, **attributes):
+        """Attach attributes to the root span (no-op for unsampled traces)"""
+        if self.root is not None:
+            self.root.set(**attributes)
+
+    def _add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> Dict[str, Any]:
+        origin = self.root.start if self.root is not None else 0.0
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "timestamp": self.started_at,
+            "duration_ms": _milliseconds(self.root),
+            "spans": [{
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "start_ms": round((span.start - origin) * 1000, 3),
+                "duration_ms": _milliseconds(span),
+                "attributes": span.attributes,
+                "error": span.error,
+            } for span in spans],
+        }
+
+
+def _milliseconds(span: Optional[Span]) -> Optional[float]:
+    if span is None or span.end is None:
+        return None
+    return round((span.end - span.start) * 1000, 3)
+
+
+class JsonLinesExporter:
+    """Appends each finished trace as one JSON line to a file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace):
+        line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+# (trace, current span) of the running code; span is None for unsampled traces
+_current: ContextVar[Optional[Tuple[Trace, Optional[Span]]]] = ContextVar("amem_trace", default=None)
+
+_NOOP = contextlib.nullcontext()
+
+
+class Tracer:
+    """Starts traces, opens spans and exports finished sampled traces"""
+
+    def __init__(self, sample_rate: float = 0.0, exporter: Optional[JsonLinesExporter] = None):
+        """Initialize the tracer.
+
+        Args:
+            sample_rate: Fraction of new traces that are recorded (0 to 1)
+            exporter: Destination of finished traces; traces are dropped if None
+        """
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    @contextlib.contextmanager
+    def trace(self, name: str, trace_id: Optional[str] = None, sampled: Optional[bool] = None,
+              **attributes) -> Iterator[Trace]:
+        """Start a new trace with a root span for the enclosed block.
+
+        Args:
+            name: Name of the root span, e.g. "POST /api/v1/memories"
+            trace_id: Trace ID propagated from the caller, or None for a new one
+            sampled: Sampling decision propagated from the caller, or None to
+                sample at `sample_rate`
+            **attributes: Attributes of the root span
+
+        Yields:
+            Trace: The trace; its trace_id is set even when it is not sampled
+        """
+        if sampled is None:
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        # Propagated IDs come from request headers; keep them to a sane length
+        trace = Trace(name, str(trace_id)[:64] if trace_id else uuid.uuid4().hex, sampled)
+        if not sampled:
+            token = _current.set((trace, None))
+            try:
+                yield trace
+            finally:
+                _current.reset(token)
+            return
+
+        root = Span(name, None, dict(attributes))
+        trace.root = root
+        trace._add(root)
+        token = _current.set((trace, root))
+        try:
+            yield trace
+        except BaseException as e:
+            root.error = repr(e)
+            raise
+        finally:
+            root.end = time.perf_counter()
+            _current.reset(token)
+            self._export(trace)
+
+    def continue_trace(self, name: str, **attributes):
+        """Start a new root span under the current trace ID and sampling decision.
+
+        Used for work queued by a traced request (such as background evolution)
+        that runs after the request's own trace has been exported.
+        """
+        current = _current.get()
+        if current is None:
+            return self.trace(name, **attributes)
+        return self.trace(name, trace_id=current[0].trace_id, sampled=current[0].sampled, **attributes)
+
+    def span(self, name: str, **attributes):
+        """Context manager timing a stage of the current trace.
+
+        Yields the Span, or None when there is no sampled trace (the block then
+        runs with no tracing overhead beyond this call).
+        """
+        current = _current.get()
+        if current is None or current[1] is None:
+            return _NOOP
+        return self._span(current[0], current[1], name, attributes)
+
+    @contextlib.contextmanager
+    def _span(self, trace: Trace, parent: Span, name: str, attributes: Dict[str, Any]) -> Iterator[Span]:
+        span = Span(name, parent.span_id, attributes)
+        trace._add(span)
+        token = _current.set((trace, span))
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            span.end = time.perf_counter()
+            _current.reset(token)
+
+    def _export(self, trace: Trace):
+        if self.exporter is None:
+            return
+        try:
+            self.exporter.export(trace)
+        except Exception as e:
+            logger.warning(f"Failed to export trace {trace.trace_id}: {e}")
+
+
+tracer = Tracer()
+
+
+def configure(sample_rate: float, path: Optional[str]):
+    """Set the process-wide sampling rate and JSON lines output file.
+
+    Args:
+        sample_rate: Fraction of traces recorded (0 disables recording)
+        path: File the finished traces are appended to, or None/empty to drop them
+    """
+    if tracer.exporter is not None:
+        tracer.exporter.close()
+    tracer.exporter = JsonLinesExporter(path) if path else None
+    tracer.sample_rate = max(0.0, min(1.0, sample_rate))
+
+
+def trace(name: str, trace_id: Optional[str] = None, sampled: Optional[bool] = None, **attributes):
+    """Start a trace on the process-wide tracer (see Tracer.trace)"""
+    return tracer.trace(name, trace_id=trace_id, sampled=sampled, **attributes)
+
+
+def continue_trace(name: str, **attributes):
+    """Continue the current trace ID in a new root span (see Tracer.continue_trace)"""
+    return tracer.continue_trace(name, **attributes)
+
+
+def span(name: str, **attributes):
+    """Time a stage of the current trace (see Tracer.span)"""
+    return tracer.span(name, **attributes)
+
+
+def traced(name: str):
+    """Decorator running each call of a function in a span of the current trace"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def annotate(**attributes):
+    """Attach attributes to the current span, if the running code is being traced"""
+    current = _current.get()
+    if current is not None and current[1] is not None:
+        current[1].set(**attributes)
+
+
+def current_trace_id() -> Optional[str]:
+    """Trace ID of the running code, or None outside a trace"""
+    current = _current.get()
+    return current[0].trace_id if current is not None else None
+
+
+def mcp_trace_headers(params: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """HTTP headers propagating a trace ID from an MCP request to the server.
+
+    Uses params["_meta"]["trace_id"] when the MCP client supplies one, and a
+    new trace ID otherwise.
+    """
+    meta = (params or {}).get("_meta") or {}
+    trace_id = meta.get("trace_id") if isinstance(meta, dict) else None
+    return {TRACE_HEADER: str(trace_id or uuid.uuid4().hex)}
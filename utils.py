@@ -1,13 +1,15 @@
 from fastapi import HTTPException
-from typing import Dict, Any, List
+from typing import Dict, Any, List, TYPE_CHECKING
 from datetime import datetime
-from memory_system import MemoryNote
+
+if TYPE_CHECKING:
+    from memory_system import MemoryNote
 
 def format_datetime() -> str:
     """Get current datetime in the format used by A-MEM (YYYYMMDDHHMM)"""
     return datetime.now().strftime("%Y%m%d%H%M")
 
-def memory_note_to_dict(memory: MemoryNote) -> Dict[str, Any]:
+def memory_note_to_dict(memory: "MemoryNote") -> Dict[str, Any]:
     """Convert a MemoryNote object to a dictionary"""
     if not memory:
         return None
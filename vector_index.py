@@ -0,0 +1,298 @@
+"""
+In-process vector indexes for SimpleEmbeddingRetriever.
+
+The retriever keeps embeddings in its own arena and scores rows itself; an
+index only decides which rows are worth scoring for a query:
+
+- ExactIndex scores every row (brute force), kept for small stores and for
+  verifying approximate results
+- IVFIndex is an inverted file index: rows are bucketed by their nearest
+  k-means centroid, and a query only scores the rows in its `nprobe`
+  nearest buckets, so search cost stays roughly flat as the store grows
+
+Indexes address rows by arena row number. Deleted rows are filtered by the
+retriever's alive mask, and remap() renumbers rows after the arena compacts.
+"""
+import logging
+import threading
+from typing import List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows, leaving zero rows as zeros"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class ExactIndex:
+    """Brute-force index: every row is a candidate"""
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray, all_vectors: Optional[np.ndarray] = None):
+        pass
+
+    def update(self, row: int, vector: np.ndarray):
+        pass
+
+    def remap(self, mapping: np.ndarray):
+        pass
+
+    def candidates(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """Rows to score for `query`, or None to score every row"""
+        return None
+
+    def wait_for_training(self, timeout: Optional[float] = None) -> bool:
+        return True
+
+
+class IVFIndex:
+    """Inverted file index over k-means buckets with incremental insert.
+
+    Until `train_threshold` vectors have been added the index behaves like
+    ExactIndex. It then trains `nlist` centroids on a sample of the stored
+    vectors, and new vectors are assigned to their nearest centroid as they
+    arrive. Centroids are retrained once the store has grown by
+    `retrain_factor` since the last training.
+
+    Training runs on a background thread by default, so the insert that
+    triggers it does not wait. Queries keep using the previous buckets (or
+    exact search before the first training) until the new centroids and
+    buckets are swapped in under the index lock, together with the rows
+    added or updated while training ran.
+    """
+
+    # Rows assigned per matrix product while training, bounding its memory
+    ASSIGN_CHUNK = 65536
+
+    def __init__(self,
+                 nlist: Optional[int] = None,
+                 nprobe: int = 8,
+                 train_threshold: int = 20000,
+                 retrain_factor: float = 4.0,
+                 kmeans_iterations: int = 8,
+                 seed: int = 0,
+                 background: bool = True):
+        """Initialize the index.
+
+        Args:
+            nlist: Number of buckets, or None for about sqrt(N) at training time
+            nprobe: Number of nearest buckets scored per query (higher is more
+                accurate and slower)
+            train_threshold: Number of vectors before the index starts bucketing
+            retrain_factor: Retrain once the store is this many times larger than
+                at the last training
+            kmeans_iterations: Lloyd iterations per training
+            seed: Random seed for centroid initialization and sampling
+            background: Train on a background thread; False trains inside the
+                add() that triggers it
+        """
+        self.nlist = nlist
+        self.nprobe = max(1, nprobe)
+        self.train_threshold = max(1, train_threshold)
+        self.retrain_factor = max(1.5, retrain_factor)
+        self.kmeans_iterations = max(1, kmeans_iterations)
+        self.background = background
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.RLock()  # Guards the buckets against the training thread's swap
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._assignment = np.full(0, -1, dtype=np.int64)  # Bucket of each row, -1 if unassigned
+        self._position = np.full(0, -1, dtype=np.int64)  # Index of each row within its bucket
+        self._size = 0  # Arena rows seen by the index, including deleted ones
+        self._trained_size = 0
+        self._training = False
+        self._trainer: Optional[threading.Thread] = None
+        self._backlog: List[Tuple[np.ndarray, np.ndarray]] = []  # (rows, vectors) placed while training runs
+        self._generation = 0  # Bumped by remap() so a training over old row numbers is discarded
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def training(self) -> bool:
+        return self._training
+
+    def wait_for_training(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a background training to finish; True if none is running"""
+        trainer = self._trainer
+        if trainer is not None:
+            trainer.join(timeout)
+        return not self._training
+
+    def _grow(self, rows: int):
+        if rows > len(self._assignment):
+            capacity = max(rows, 2 * len(self._assignment), 1024)
+            assignment = np.full(capacity, -1, dtype=np.int64)
+            assignment[:len(self._assignment)] = self._assignment
+            position = np.full(capacity, -1, dtype=np.int64)
+            position[:len(self._position)] = self._position
+            self._assignment, self._position = assignment, position
+
+    def _unlink(self, row: int):
+        """Take a row out of its bucket by moving the bucket's last row into its slot"""
+        members = self._lists[self._assignment[row]]
+        position = int(self._position[row])
+        last = members.pop()
+        if last != row:
+            members[position] = last
+            self._position[last] = position
+        self._assignment[row] = -1
+        self._position[row] = -1
+
+    def _place(self, rows: np.ndarray, vectors: np.ndarray):
+        """Put rows into the bucket of their nearest centroid, moving rows that already have one"""
+        rows = np.asarray(rows, dtype=np.int64)
+        self._grow(int(rows.max()) + 1)
+        for row in rows[self._assignment[rows] >= 0].tolist():
+            self._unlink(row)
+        buckets = np.argmax(_normalize(vectors) @ self.centroids.T, axis=1)
+        order = np.argsort(buckets, kind="stable")
+        rows, buckets = rows[order], buckets[order]
+        splits = np.flatnonzero(np.diff(buckets)) + 1
+        for group, bucket in zip(np.split(rows, splits), buckets[np.r_[0, splits]].tolist()):
+            members = self._lists[bucket]
+            self._position[group] = np.arange(len(members), len(members) + len(group))
+            members.extend(group.tolist())
+        self._assignment[rows] = buckets
+
+    @staticmethod
+    def _build(assignment: np.ndarray, nlist: int) -> Tuple[List[List[int]], np.ndarray]:
+        """Bucket lists and in-bucket positions for a row -> bucket assignment"""
+        rows = np.flatnonzero(assignment >= 0)
+        order = rows[np.argsort(assignment[rows], kind="stable")]
+        counts = np.bincount(assignment[rows], minlength=nlist)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        position = np.full(len(assignment), -1, dtype=np.int64)
+        position[order] = np.arange(len(order)) - np.repeat(starts, counts)
+        return [members.tolist() for members in np.split(order, starts[1:])], position
+
+    def _fit(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Run k-means on a sample of `vectors`; the centroids and the bucket of every row"""
+        n = len(vectors)
+        nlist = self.nlist or int(np.clip(np.sqrt(n), 16, 4096))
+        nlist = min(nlist, n)
+        sample_size = min(n, 32 * nlist)
+        sample = _normalize(np.asarray(vectors[np.sort(self._rng.choice(n, sample_size, replace=False))],
+                                       dtype=np.float32))
+        centroids = sample[self._rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+            # Empty buckets keep their previous centroid
+            filled = counts > 0
+            centroids[filled] = _normalize(sums[filled])
+        centroids = centroids.astype(np.float32)
+        assignment = np.empty(n, dtype=np.int64)
+        for start in range(0, n, self.ASSIGN_CHUNK):
+            chunk = _normalize(np.asarray(vectors[start:start + self.ASSIGN_CHUNK], dtype=np.float32))
+            assignment[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+        logger.info(f"Trained IVF index with {nlist} buckets on {sample_size} of {n} vectors")
+        return centroids, assignment
+
+    def _train(self, vectors: np.ndarray, generation: int):
+        """Train on `vectors` and swap the result in, unless remap() renumbered the rows meanwhile.
+
+        Outside the lock `vectors` is only read. Rows the caller rewrites in
+        place while this runs are passed to update(), which records them in
+        the backlog, so the swap reassigns them from their new vectors.
+        """
+        try:
+            centroids, assignment = self._fit(vectors)
+            lists, position = self._build(assignment, len(centroids))
+        except Exception as e:
+            logger.error(f"IVF training failed: {e}")
+            centroids = None
+        with self._lock:
+            if centroids is not None and generation == self._generation:
+                self.centroids = centroids
+                self._assignment, self._position, self._lists = assignment, position, lists
+                self._trained_size = len(vectors)
+                for rows, row_vectors in self._backlog:
+                    self._place(rows, row_vectors)
+            self._backlog = []
+            self._training = False
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray, all_vectors: Optional[np.ndarray] = None):
+        """Index new rows.
+
+        Args:
+            rows: Arena row numbers of the new vectors
+            vectors: The new vectors, one per row
+            all_vectors: Every stored row, used when this insert triggers (re)training;
+                rows already in it must only be rewritten through update()
+        """
+        if not len(rows):
+            return
+        with self._lock:
+            self._size = max(self._size, int(rows.max()) + 1)
+            if self.trained:
+                self._place(rows, vectors)
+            if self._training:
+                self._backlog.append((np.array(rows, dtype=np.int64), np.array(vectors, dtype=np.float32)))
+                return
+            due = (not self.trained and self._size >= self.train_threshold) or \
+                  (self.trained and self._size >= self.retrain_factor * self._trained_size)
+            if not due or all_vectors is None:
+                return
+            self._training = True
+            generation = self._generation
+            if not self.background:
+                self._train(all_vectors, generation)
+                return
+            self._trainer = threading.Thread(target=self._train, args=(all_vectors, generation),
+                                             name="ivf-train", daemon=True)
+            self._trainer.start()
+
+    def update(self, row: int, vector: np.ndarray):
+        """Move a row whose vector changed to its new bucket"""
+        with self._lock:
+            if self._training:
+                self._backlog.append((np.array([row], dtype=np.int64), np.array(vector, dtype=np.float32).reshape(1, -1)))
+            if self.trained:
+                self._place(np.array([row]), vector.reshape(1, -1))
+
+    def remap(self, mapping: np.ndarray):
+        """Renumber rows after compaction; mapping[old] is the new row or -1 if dropped"""
+        with self._lock:
+            live = int((mapping >= 0).sum())
+            if self._training:
+                # The running training addresses the old rows; drop its result
+                self._generation += 1
+                self._backlog = []
+            self._size = live
+            if not self.trained:
+                return
+            old = self._assignment[:len(mapping)]
+            kept = np.flatnonzero((mapping[:len(old)] >= 0) & (old >= 0))
+            assignment = np.full(live, -1, dtype=np.int64)
+            assignment[mapping[kept]] = old[kept]
+            self._lists, self._position = self._build(assignment, len(self.centroids))
+            self._assignment = assignment
+
+    def candidates(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """Rows in the `nprobe` buckets nearest to `query`, or None before training"""
+        with self._lock:
+            if not self.trained:
+                return None
+            scores = self.centroids @ query
+            nprobe = min(self.nprobe, len(self.centroids))
+            probes = np.argpartition(-scores, nprobe - 1)[:nprobe]
+            rows = [self._lists[bucket] for bucket in probes if self._lists[bucket]]
+            if not rows:
+                return np.zeros(0, dtype=np.int64)
+            return np.fromiter((row for bucket in rows for row in bucket), dtype=np.int64)
+
+
+def make_index(kind: str = "ivf", **kwargs):
+    """Create an index by name ("exact" or "ivf"); kwargs are IVFIndex parameters"""
+    if kind == "exact":
+        return ExactIndex()
+    if kind == "ivf":
+        return IVFIndex(**kwargs)
+    raise ValueError("Vector index must be one of: 'exact', 'ivf'")
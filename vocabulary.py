@@ -0,0 +1,53 @@
+"""
+Interned string vocabularies for compact note storage.
+
+Keywords, tags, categories and memory IDs repeat across many notes. A
+Vocabulary stores each distinct string once and hands out a small integer
+for it, so a note can hold a tuple of shared integers instead of its own
+list of string copies. Entries are never removed, so a vocabulary grows
+with every distinct string it has ever seen in the process: free text
+that is mostly unique per note does not belong in one.
+"""
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+
+class Vocabulary:
+    """Append-only bidirectional mapping between strings and integer IDs"""
+
+    def __init__(self):
+        self._index: Dict[str, int] = {}
+        self._values: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def intern(self, value: str) -> int:
+        """Integer ID of a string, adding it on first use"""
+        index = self._index.get(value)
+        if index is None:
+            with self._lock:
+                index = self._index.get(value)
+                if index is None:
+                    index = len(self._values)
+                    self._values.append(value)
+                    self._index[value] = index
+        return index
+
+    def intern_many(self, values: Iterable[str]) -> Tuple[int, ...]:
+        """Integer IDs of several strings, as a tuple"""
+        return tuple(self.intern(value) for value in values)
+
+    def canonical(self, value: str) -> str:
+        """The stored copy of a string, so equal strings share one object"""
+        return self._values[self.intern(value)]
+
+    def value(self, index: int) -> str:
+        """String for an integer ID"""
+        return self._values[index]
+
+    def values(self, indices: Iterable[int]) -> Tuple[str, ...]:
+        """Strings for several integer IDs, as a tuple"""
+        values = self._values
+        return tuple(values[index] for index in indices)
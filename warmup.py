@@ -0,0 +1,161 @@
+"""
+Background construction of the memory system for fast server startup.
+
+Building AgenticMemorySystem imports sentence_transformers, chromadb,
+nltk and litellm and loads the embedding model, which takes far longer
+than starting the HTTP server. Warmup runs the build and a list of
+warm-up stages on a background thread, so the server answers /health
+immediately and reports readiness once every stage has finished.
+Requests that need the memory system wait for it with a timeout.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+
+class WarmupError(RuntimeError):
+    """The memory system could not be built"""
+
+
+class Warmup:
+    """Builds a value once in the background and records the time of each stage"""
+
+    def __init__(self,
+                 build: Callable[[], Any],
+                 stages: Optional[List[Tuple[str, Callable[[Any], Any]]]] = None,
+                 name: str = "memory_system"):
+        """Initialize the warm-up.
+
+        Args:
+            build: Creates the value (imports included)
+            stages: Optional (name, function) pairs run on the built value in
+                order; a failing stage is logged and does not block readiness
+            name: Name of the build stage in status()
+        """
+        self._build = build
+        self._stages = list(stages or [])
+        self._name = name
+        self._value = None
+        self._status = PENDING
+        self._stage = None
+        self._error: Optional[str] = None
+        self._timings: Dict[str, float] = {}
+        self._progress: Dict[str, Dict[str, int]] = {}
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._status == READY
+
+    @property
+    def value(self) -> Any:
+        """The built value, or None until the build stage has finished"""
+        return self._value
+
+    def start(self, background: bool = True):
+        """Start warming up; later calls are no-ops.
+
+        Args:
+            background: Run on a daemon thread and return at once, or run in
+                the calling thread and return when warm-up has finished
+        """
+        with self._lock:
+            if self._status != PENDING:
+                return
+            self._status = WARMING
+            self._started_at = time.perf_counter()
+            if background:
+                self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+                self._thread.start()
+                return
+        self._run()
+
+    def _run(self):
+        try:
+            self._stage = self._name
+            start = time.perf_counter()
+            value = self._build()
+            self._timings[self._name] = time.perf_counter() - start
+            self._value = value
+        except Exception as e:
+            logger.error(f"Warm-up failed while building {self._name}: {e}", exc_info=True)
+            self._error = str(e)
+            self._finish(FAILED)
+            return
+
+        for stage, func in self._stages:
+            self._stage = stage
+            start = time.perf_counter()
+            try:
+                func(value)
+            except Exception as e:
+                logger.warning(f"Warm-up stage {stage} failed: {e}")
+            self._timings[stage] = time.perf_counter() - start
+        self._finish(READY)
+
+    def _finish(self, status: str):
+        self._stage = None
+        self._finished_at = time.perf_counter()
+        self._status = status
+        self._done.set()
+        if status == READY:
+            logger.info(f"Warm-up finished in {self._finished_at - self._started_at:.2f}s: {self._timings}")
+
+    def report_progress(self, step: str, done: int, total: int):
+        """Record how far a long-running step of the build or a stage has got, for status()"""
+        self._progress[step] = {"done": done, "total": total}
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """Start warm-up if needed and block until the value is built.
+
+        Only the build stage is awaited; requests do not wait for the
+        remaining warm-up stages.
+
+        Args:
+            timeout: Seconds to wait, or None to wait indefinitely
+
+        Returns:
+            The built value
+
+        Raises:
+            TimeoutError: If the value is not built within `timeout`
+            WarmupError: If the build failed
+        """
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._value is None:
+            if self._status == FAILED:
+                raise WarmupError(f"Failed to initialize {self._name}: {self._error}")
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError(f"{self._name} is still warming up")
+            # Wake up periodically, since the value is set before the remaining stages finish
+            self._done.wait(0.05 if remaining is None else min(0.05, remaining))
+        return self._value
+
+    def status(self) -> Dict[str, Any]:
+        """Warm-up state: status, current stage, error, seconds per finished stage and reported progress"""
+        if self._started_at is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self._finished_at or time.perf_counter()) - self._started_at
+        return {
+            "status": self._status,
+            "stage": self._stage,
+            "error": self._error,
+            "elapsed_seconds": round(elapsed, 3),
+            "stages": {stage: round(seconds, 3) for stage, seconds in self._timings.items()},
+            "progress": {step: dict(counts) for step, counts in list(self._progress.items())},
+        }